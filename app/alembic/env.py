@@ -27,6 +27,11 @@ from app.models.users import User
 from app.models.portfolios import Portfolio
 from app.models.trades import Trade
 from app.models.cash_actions import CashAction
+from app.models.prices import DailyPrice
+from app.models.lots import OpenLot, RealizedLot
+from app.models.snapshots import PositionSnapshot
+from app.models.statistics import DailyTradeStatistics
+from app.models.leases import JobLease
 
 target_metadata = Base.metadata
 
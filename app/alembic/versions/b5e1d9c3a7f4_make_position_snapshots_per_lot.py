@@ -0,0 +1,54 @@
+"""make position snapshots per lot
+
+Revision ID: b5e1d9c3a7f4
+Revises: 1d6b8f3a9c27
+Create Date: 2026-10-17 21:08:52.614730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1d9c3a7f4'
+down_revision: Union[str, None] = '1d6b8f3a9c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-ticker snapshots can't be split into lots: drop them and let the
+    # snapshot job fill the new table from the trades
+    op.drop_table('position_snapshots')
+    op.create_table('position_snapshots',
+    sa.Column('portfolio_id', mysql.CHAR(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('ticker', sa.String(length=10), nullable=False),
+    sa.Column('trade_id', mysql.CHAR(length=36), nullable=False),
+    sa.Column('opened_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('price', sa.Numeric(precision=20, scale=10), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=20, scale=10), nullable=False),
+    sa.Column('close_price', sa.Numeric(precision=20, scale=10), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+    sa.PrimaryKeyConstraint('portfolio_id', 'date', 'ticker', 'trade_id')
+    )
+    op.execute('UPDATE portfolios SET snapshots_through = NULL')
+
+
+def downgrade() -> None:
+    op.drop_table('position_snapshots')
+    op.create_table('position_snapshots',
+    sa.Column('portfolio_id', mysql.CHAR(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('ticker', sa.String(length=10), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=20, scale=10), nullable=False),
+    sa.Column('cost_basis', sa.Numeric(precision=20, scale=10), nullable=False),
+    sa.Column('entry_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('close_price', sa.Numeric(precision=20, scale=10), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+    sa.PrimaryKeyConstraint('portfolio_id', 'date', 'ticker')
+    )
+    op.execute('UPDATE portfolios SET snapshots_through = NULL')
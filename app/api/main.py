@@ -1,7 +1,13 @@
 from fastapi import APIRouter
 
 from app.api.routes import login, users, portfolios, trades, cash_actions
-from app.api.routes.metrics import overview, positions, statistics
+from app.api.routes.metrics import (
+    overview,
+    performance,
+    positions,
+    realized,
+    statistics,
+)
 
 api_router = APIRouter()
 
@@ -27,11 +33,21 @@ api_router.include_router(
     prefix="/portfolios/{portfolio_id}/metrics/positions",
     tags=["metrics"],
 )
+api_router.include_router(
+    realized.router,
+    prefix="/portfolios/{portfolio_id}/metrics/realized",
+    tags=["metrics"],
+)
 api_router.include_router(
     statistics.router,
     prefix="/portfolios/{portfolio_id}/metrics/statistics",
     tags=["metrics"],
 )
+api_router.include_router(
+    performance.router,
+    prefix="/portfolios/{portfolio_id}/metrics/performance",
+    tags=["metrics"],
+)
 
 # Superuser routes
 api_router.include_router(login.superuser_router, prefix="/admin", tags=["admin"])
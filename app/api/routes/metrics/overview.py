@@ -1,7 +1,8 @@
 import uuid
-from typing import Any
+from datetime import date, datetime, time
+from typing import Any, Optional
 
-from fastapi import APIRouter, HTTPException, status, Path
+from fastapi import APIRouter, HTTPException, status, Path, Query
 from sqlalchemy.orm import Session
 
 from app.api.deps import SessionDep, CurrentUser
@@ -14,11 +15,29 @@ router = APIRouter()
 
 
 def calculate_portfolio_overview(
-    session: Session, portfolio_id: uuid.UUID
+    session: Session, portfolio_id: uuid.UUID, as_of: Optional[date] = None
 ) -> PortfolioOverview:
-    cash_balance = calculate_cash_balance(session=session, portfolio_id=portfolio_id)
-    positions = get_open_positions(session=session, portfolio_id=portfolio_id)
-    total_open_positions_value = sum(position.current_value for position in positions)
+    """
+    Summarize the cash and open positions of a portfolio, now or at the end of
+    a past day.
+    """
+    cash_balance = calculate_cash_balance(
+        session=session,
+        portfolio_id=portfolio_id,
+        as_of=datetime.combine(as_of, time.max) if as_of else None,
+    )
+    positions = get_open_positions(
+        session=session, portfolio_id=portfolio_id, as_of=as_of
+    )
+    # Positions without a quote are valued at cost until one becomes available
+    total_open_positions_value = sum(
+        (
+            position.current_value
+            if position.current_value is not None
+            else position.entry_price * position.quantity
+        )
+        for position in positions
+    )
     cost_basis = sum(position.entry_price * position.quantity for position in positions)
     unrealized_returns_absolute = total_open_positions_value - cost_basis
     unrealized_returns_percentage = (
@@ -44,8 +63,11 @@ def get_current_portfolio_overview(
     session: SessionDep,
     current_user: CurrentUser,
     portfolio_id: uuid.UUID = Path(...),
+    as_of: Optional[date] = Query(
+        None, description="Overview at the end of this day (YYYY-MM-DD)"
+    ),
 ) -> Any:
-    """Get overview of all current open portfolio positions."""
+    """Get overview of all current open portfolio positions, or of a past day."""
     portfolio = get_portfolio_by_id(session=session, portfolio_id=portfolio_id)
     if not portfolio:
         raise HTTPException(
@@ -57,5 +79,7 @@ def get_current_portfolio_overview(
             detail="Not authorized to add trades to this portfolio",
         )
 
-    overview = calculate_portfolio_overview(session=session, portfolio_id=portfolio_id)
+    overview = calculate_portfolio_overview(
+        session=session, portfolio_id=portfolio_id, as_of=as_of
+    )
     return overview
@@ -0,0 +1,51 @@
+import uuid
+
+from fastapi import APIRouter, HTTPException, status, Path, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import SessionDep, CurrentUser
+from app.crud.portfolios import get_portfolio_by_id
+from app.models.portfolios import Portfolio
+from app.schemas.metrics import PerformanceMetrics, Period
+from app.utils.time import get_date_range
+
+router = APIRouter()
+
+
+def calculate_performance_metrics(
+    session: Session, portfolio: Portfolio, period: Period
+) -> PerformanceMetrics:
+    # Loads NumPy and pandas, so only once performance is asked for
+    from app.services.performance import get_performance
+
+    start_date, _ = get_date_range(period)
+    return get_performance(session, portfolio, start_date)
+
+
+@router.get("/", response_model=PerformanceMetrics)
+def get_performance_metrics(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    portfolio_id: uuid.UUID = Path(...),
+    period: Period = Query(
+        Period.ALL,
+        description="Period for metrics (e.g., '1M', '1Y', 'YTD', 'All')",
+    )
+):
+    """
+    Return and risk metrics of the daily value of a portfolio up to the last
+    completed day.
+    """
+    portfolio = get_portfolio_by_id(session=session, portfolio_id=portfolio_id)
+    if not portfolio:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
+        )
+    if portfolio.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to add trades to this portfolio",
+        )
+
+    return calculate_performance_metrics(session, portfolio, period)
@@ -1,146 +1,297 @@
 import uuid
+from datetime import date, datetime, time
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, status, Path, Query
+from fastapi import APIRouter, HTTPException, status, Path, Query, Response
 from sqlalchemy.orm import Session
 
+import app.crud.lots as lots_crud
 import app.crud.trades as trades_crud
 from app.api.deps import SessionDep, CurrentUser
 from app.crud.portfolios import get_portfolio_by_id
-from app.models.trades import Trade, ActionType
-from app.schemas.metrics import Position, HistoricalPosition
+from app.models.lots import RealizedLot
+from app.schemas.metrics import (
+    Position,
+    ConsolidatedPosition,
+    PortfolioPositionShare,
+    HistoricalPosition,
+    CostBasis,
+    HistoricalPositionOrder,
+    SortOrder,
+)
+from app.services import prices as price_service
+from app.services import snapshots as snapshot_service
+from app.utils.pagination import decode_cursor, encode_cursor
 from app.utils import market_data
 
 router = APIRouter()
 
 
-def get_open_positions(session: Session, portfolio_id: uuid.UUID) -> List[Position]:
-    trades = (
-        session.query(Trade)
-        .filter(Trade.portfolio_id == str(portfolio_id))
-        .order_by(Trade.execution_timestamp)
-        .all()
-    )
-    positions = {}
-    for trade in trades:
-        ticker = trade.ticker
-        if ticker not in positions:
-            positions[ticker] = {
+def _fifo_positions(session: Session, portfolio_id: uuid.UUID) -> dict:
+    """Open positions valued at the cost of the lots that are still open."""
+    open_positions = {}
+    for lot in lots_crud.get_open_lots(session, portfolio_id):
+        if lot.ticker not in open_positions:
+            open_positions[lot.ticker] = {
                 "quantity": Decimal(0),
                 "entry_value": Decimal(0),
-                "entry_quantity": Decimal(0),
-                "entry_dates": [],
+                "entry_date": lot.opened_at,
             }
-        quantity = trade.quantity if trade.action == ActionType.BUY else -trade.quantity
-        positions[ticker]["quantity"] += quantity
-        if trade.action == ActionType.BUY:
-            positions[ticker]["entry_value"] += trade.price * trade.quantity
-            positions[ticker]["entry_quantity"] += trade.quantity
-            positions[ticker]["entry_dates"].append(trade.execution_timestamp)
-
-    position_list = []
-    for ticker, data in positions.items():
-        if data["quantity"] != 0:
-            current_price = market_data.get_current_price(ticker)
-            entry_price = (
-                data["entry_value"] / data["entry_quantity"]
-                if data["entry_quantity"] != 0
-                else Decimal(0)
-            )
-            current_value = data["quantity"] * Decimal(current_price)
-            unrealized_pl = (Decimal(current_price) - entry_price) * data["quantity"]
-            position = Position(
-                symbol=ticker,
-                quantity=float(data["quantity"]),
-                entry_price=float(entry_price),
-                current_price=float(current_price),
-                current_value=float(current_value),
-                unrealized_pl=float(unrealized_pl),
-                entry_date=min(data["entry_dates"]) if data["entry_dates"] else None,
-            )
-            position_list.append(position)
-    return position_list
+        open_positions[lot.ticker]["quantity"] += lot.quantity
+        open_positions[lot.ticker]["entry_value"] += lot.price * lot.quantity
+    for data in open_positions.values():
+        data["entry_price"] = data["entry_value"] / data["quantity"]
+    return open_positions
 
 
-def get_historical_positions(
+def _fifo_positions_as_of(
+    session: Session, portfolio_id: uuid.UUID, as_of: date
+) -> dict:
+    """
+    FIFO open positions at the end of a past day: the open lots of the last
+    snapshot up to that day with the trades after it matched against them.
+    """
+    return {
+        position.ticker: {
+            "quantity": position.quantity,
+            "entry_price": position.cost_basis / position.quantity,
+            "entry_date": position.entry_date,
+        }
+        for position in snapshot_service.get_positions_as_of(
+            session, portfolio_id, as_of
+        )
+    }
+
+
+def _average_cost_positions(
+    session: Session, portfolio_id: uuid.UUID, until: Optional[datetime] = None
+) -> dict:
+    """Open positions valued at the average price of every buy of the ticker."""
+    aggregates = trades_crud.get_position_aggregates(session, portfolio_id, until)
+    open_positions = {}
+    for ticker, quantity, buy_value, buy_quantity, first_buy_date in aggregates:
+        if quantity == 0:
+            continue
+        entry_price = (
+            Decimal(str(buy_value)) / Decimal(str(buy_quantity))
+            if buy_quantity
+            else Decimal(0)
+        )
+        open_positions[ticker] = {
+            "quantity": Decimal(str(quantity)),
+            "entry_price": entry_price,
+            "entry_date": first_buy_date,
+        }
+    return open_positions
+
+
+def get_open_positions(
     session: Session,
     portfolio_id: uuid.UUID,
-    order_by: str = "exit_date",
-    sort: str = "desc",
-    limit: int = 100,
-) -> List[HistoricalPosition]:
+    cost_basis: CostBasis = CostBasis.FIFO,
+    as_of: Optional[date] = None,
+) -> List[Position]:
     """
-    Processes trades to identify closed positions and computes realized P/L.
+    Builds the open positions of a portfolio. With the FIFO cost basis they come
+    from the open lots and the entry date is that of the oldest open lot; with
+    the average cost basis from per-ticker trade totals aggregated in the
+    database, dated from the first buy.
+
+    With a past `as_of` date, the positions are those held at the end of that
+    day, valued at that day's closes: FIFO positions are rebuilt from the lots of
+    the daily snapshots and average cost totals only count the trades up to
+    that day.
     """
-    buy_trades = trades_crud.get_buy_trades(session, portfolio_id)
-    sell_trades = trades_crud.get_sell_trades(session, portfolio_id)
+    if as_of is not None and as_of >= datetime.utcnow().date():
+        as_of = None
 
-    historical_positions = []
+    if cost_basis == CostBasis.AVERAGE:
+        until = datetime.combine(as_of, time.max) if as_of else None
+        open_positions = _average_cost_positions(session, portfolio_id, until)
+    elif as_of is not None:
+        open_positions = _fifo_positions_as_of(session, portfolio_id, as_of)
+    else:
+        open_positions = _fifo_positions(session, portfolio_id)
 
-    # Dictionary to track open positions per ticker
-    open_positions = {}
+    if as_of is None:
+        quotes = market_data.get_quotes(open_positions.keys())
+    else:
+        closes = price_service.get_closes_on(session, open_positions.keys(), as_of)
+        quotes = {ticker: market_data.Quote(close) for ticker, close in closes.items()}
 
-    for buy in buy_trades:
-        ticker = buy.ticker
-        if ticker not in open_positions:
-            open_positions[ticker] = []
-        open_positions[ticker].append(
+    return [
+        Position(
+            symbol=ticker,
+            quantity=float(data["quantity"]),
+            entry_price=float(data["entry_price"]),
+            entry_date=data["entry_date"],
+            **_valuation(data, quotes.get(ticker)),
+        )
+        for ticker, data in open_positions.items()
+    ]
+
+
+def _valuation(data: dict, quote: Optional[market_data.Quote]) -> dict:
+    """Current price, value and unrealized P/L of a position at a quote."""
+    # Quotes that could not be fetched in time are reported as unavailable
+    # rather than failing the whole response
+    if quote is None:
+        return {"current_price": None, "current_value": None, "unrealized_pl": None}
+    current_price = Decimal(quote.price)
+    return {
+        "current_price": quote.price,
+        "current_value": float(data["quantity"] * current_price),
+        "unrealized_pl": float(
+            (current_price - data["entry_price"]) * data["quantity"]
+        ),
+        "price_is_stale": quote.stale,
+    }
+
+
+def get_consolidated_positions(
+    session: Session, owner_id: uuid.UUID, breakdown: bool = False
+) -> List[ConsolidatedPosition]:
+    """
+    Builds the net open positions of a user across all of their portfolios,
+    valued at the FIFO cost of the open lots, with one grouped query and one
+    batch of quotes. With `breakdown`, each position lists the part held in
+    every portfolio.
+    """
+    by_ticker = {}
+    for (
+        portfolio_id,
+        ticker,
+        quantity,
+        cost,
+        opened_at,
+    ) in lots_crud.get_open_lot_totals_by_owner(session, owner_id):
+        by_ticker.setdefault(ticker, []).append(
             {
-                "trade_id": buy.id,
-                "quantity": buy.quantity,
-                "price": buy.price,
-                "execution_timestamp": buy.execution_timestamp,
+                "portfolio_id": portfolio_id,
+                "quantity": Decimal(str(quantity)),
+                "cost": Decimal(str(cost)),
+                "entry_date": opened_at,
             }
         )
 
-    for sell in sell_trades:
-        ticker = sell.ticker
-        if ticker not in open_positions or not open_positions[ticker]:
-            # No corresponding buy trade; skip or handle as error
-            continue
+    quotes = market_data.get_quotes(by_ticker.keys())
 
-        sell_quantity = sell.quantity
-        while sell_quantity > 0 and open_positions[ticker]:
-            buy = open_positions[ticker][0]
-            buy_quantity = buy["quantity"]
-
-            if sell_quantity >= buy_quantity:
-                # Entire buy trade is closed
-                realized_quantity = buy_quantity
-                sell_quantity -= buy_quantity
-                open_positions[ticker].pop(0)
-            else:
-                # Partial closure of buy trade
-                realized_quantity = sell_quantity
-                buy["quantity"] -= sell_quantity
-                sell_quantity = 0
-
-            realized_pl = (sell.price - buy["price"]) * Decimal(realized_quantity)
-            holding_period = (
-                sell.execution_timestamp - buy["execution_timestamp"]
-            ).days
-
-            historical_position = HistoricalPosition(
-                trade_id=sell.id,
+    positions = []
+    for ticker, shares in by_ticker.items():
+        quantity = sum(share["quantity"] for share in shares)
+        if quantity == 0:
+            continue
+        data = {
+            "quantity": quantity,
+            "entry_price": sum(share["cost"] for share in shares) / quantity,
+            "entry_date": min(share["entry_date"] for share in shares),
+        }
+        quote = quotes.get(ticker)
+        portfolios = None
+        if breakdown:
+            portfolios = []
+            for share in shares:
+                share["entry_price"] = share["cost"] / share["quantity"]
+                valuation = _valuation(share, quote)
+                portfolios.append(
+                    PortfolioPositionShare(
+                        portfolio_id=share["portfolio_id"],
+                        quantity=float(share["quantity"]),
+                        entry_price=float(share["entry_price"]),
+                        current_value=valuation["current_value"],
+                        unrealized_pl=valuation["unrealized_pl"],
+                        entry_date=share["entry_date"],
+                    )
+                )
+        positions.append(
+            ConsolidatedPosition(
                 symbol=ticker,
-                quantity=float(realized_quantity),
-                entry_price=float(buy["price"]),
-                exit_price=float(sell.price),
-                realized_pl=float(realized_pl),
-                entry_date=buy["execution_timestamp"],
-                exit_date=sell.execution_timestamp,
-                holding_period_days=holding_period,
+                quantity=float(quantity),
+                entry_price=float(data["entry_price"]),
+                entry_date=data["entry_date"],
+                portfolios=portfolios,
+                **_valuation(data, quote),
             )
-            historical_positions.append(historical_position)
+        )
+    return positions
+
+
+# The realized lot column behind each allowed sort field, and how its value is
+# parsed back from a cursor
+_HISTORICAL_SORT_COLUMNS = {
+    HistoricalPositionOrder.SYMBOL: (RealizedLot.ticker, str),
+    HistoricalPositionOrder.QUANTITY: (RealizedLot.quantity, Decimal),
+    HistoricalPositionOrder.ENTRY_PRICE: (RealizedLot.entry_price, Decimal),
+    HistoricalPositionOrder.EXIT_PRICE: (RealizedLot.exit_price, Decimal),
+    HistoricalPositionOrder.REALIZED_PL: (RealizedLot.realized_pl, Decimal),
+    HistoricalPositionOrder.ENTRY_DATE: (RealizedLot.opened_at, datetime.fromisoformat),
+    HistoricalPositionOrder.EXIT_DATE: (RealizedLot.closed_at, datetime.fromisoformat),
+    HistoricalPositionOrder.HOLDING_PERIOD_DAYS: (
+        RealizedLot.holding_period_days,
+        int,
+    ),
+}
+
+
+def get_historical_positions(
+    session: Session,
+    portfolio_id: uuid.UUID,
+    order_by: HistoricalPositionOrder = HistoricalPositionOrder.EXIT_DATE,
+    sort: SortOrder = SortOrder.DESC,
+    limit: int = 100,
+    after: Optional[str] = None,
+) -> Tuple[List[HistoricalPosition], Optional[str]]:
+    """
+    Returns one page of closed positions with their realized P/L, read from the
+    realized lots recorded as trades close open lots, so they match the realized
+    P/L rollups, short lots included.
+
+    The page is read with an indexed ORDER BY and LIMIT, and comes with a cursor
+    for the next page if there may be one. Pass that cursor as `after` to
+    continue; a malformed cursor, or one from a different ordering, raises
+    ValueError.
+    """
+    column, parse_value = _HISTORICAL_SORT_COLUMNS[order_by]
+
+    cursor_key = None
+    if after is not None:
+        cursor = decode_cursor(after)
+        if len(cursor) != 4 or cursor[:2] != [order_by.value, sort.value]:
+            raise ValueError("Cursor does not match the requested ordering")
+        try:
+            cursor_key = (parse_value(cursor[2]), str(cursor[3]))
+        except (TypeError, ArithmeticError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    page = lots_crud.get_realized_lots_page(
+        session, portfolio_id, column, sort == SortOrder.DESC, limit, cursor_key
+    )
 
-    # Sorting
-    reverse = True if sort.lower() == "desc" else False
-    if hasattr(HistoricalPosition, order_by):
-        historical_positions.sort(key=lambda x: getattr(x, order_by), reverse=reverse)
+    historical_positions = [
+        HistoricalPosition(
+            trade_id=lot.close_trade_id,
+            symbol=lot.ticker,
+            quantity=float(lot.quantity),
+            entry_price=float(lot.entry_price),
+            exit_price=float(lot.exit_price),
+            realized_pl=float(lot.realized_pl),
+            entry_date=lot.opened_at,
+            exit_date=lot.closed_at,
+            holding_period_days=lot.holding_period_days,
+        )
+        for lot in page
+    ]
 
-    # Limiting
-    return historical_positions[:limit]
+    next_cursor = None
+    if len(page) == limit:
+        value = getattr(page[-1], column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        next_cursor = encode_cursor(
+            [order_by.value, sort.value, str(value), page[-1].id]
+        )
+    return historical_positions, next_cursor
 
 
 @router.get("/current", response_model=List[Position])
@@ -149,8 +300,15 @@ def get_current_positions(
     session: SessionDep,
     current_user: CurrentUser,
     portfolio_id: uuid.UUID = Path(...),
+    cost_basis: CostBasis = Query(
+        CostBasis.FIFO,
+        description="Entry price of the open lots (fifo) or of every buy (average)",
+    ),
+    as_of: Optional[date] = Query(
+        None, description="Positions held at the end of this day (YYYY-MM-DD)"
+    ),
 ):
-    """Get all current open portfolio positions."""
+    """Get all current open portfolio positions, or those held on a past day."""
     portfolio = get_portfolio_by_id(session=session, portfolio_id=portfolio_id)
     if not portfolio:
         raise HTTPException(
@@ -162,7 +320,9 @@ def get_current_positions(
             detail="Not authorized to add trades to this portfolio",
         )
 
-    positions = get_open_positions(session=session, portfolio_id=portfolio_id)
+    positions = get_open_positions(
+        session=session, portfolio_id=portfolio_id, cost_basis=cost_basis, as_of=as_of
+    )
     return positions
 
 
@@ -171,10 +331,16 @@ def fetch_historical_positions(
     *,
     session: SessionDep,
     current_user: CurrentUser,
+    response: Response,
     portfolio_id: uuid.UUID = Path(...),
-    order_by: Optional[str] = Query("exit_date", description="Field to sort by"),
-    sort: Optional[str] = Query("desc", description="asc or desc"),
-    limit: Optional[int] = Query(100, description="Number of results to return"),
+    order_by: HistoricalPositionOrder = Query(
+        HistoricalPositionOrder.EXIT_DATE, description="Field to sort by"
+    ),
+    sort: SortOrder = Query(SortOrder.DESC, description="asc or desc"),
+    limit: int = Query(100, ge=1, description="Number of results to return"),
+    after: Optional[str] = Query(
+        None, description="Cursor from the X-Next-Cursor header of the previous page"
+    ),
 ):
     portfolio = get_portfolio_by_id(session=session, portfolio_id=portfolio_id)
     if not portfolio:
@@ -187,7 +353,12 @@ def fetch_historical_positions(
             detail="Not authorized to add trades to this portfolio",
         )
 
-    historical_positions = get_historical_positions(
-        session, portfolio_id, order_by, sort, limit
-    )
+    try:
+        historical_positions, next_cursor = get_historical_positions(
+            session, portfolio_id, order_by, sort, limit, after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return historical_positions
@@ -0,0 +1,90 @@
+import uuid
+from datetime import date, datetime, time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, status, Path, Query
+from sqlalchemy.orm import Session
+
+import app.crud.lots as lots_crud
+from app.api.deps import SessionDep, CurrentUser
+from app.crud.portfolios import get_portfolio_by_id
+from app.schemas.metrics import RealizedPL, RealizedPLGrouping
+
+router = APIRouter()
+
+
+def get_realized_pl(
+    session: Session,
+    group_by: RealizedPLGrouping = RealizedPLGrouping.TICKER,
+    portfolio_id: Optional[uuid.UUID] = None,
+    owner_id: Optional[uuid.UUID] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> List[RealizedPL]:
+    """
+    Realized P/L of a portfolio, or of all portfolios of a user, per ticker or
+    per calendar year or month in which the lots were closed. Totals are read
+    from the realized lots recorded as trades close them.
+    """
+    rows = lots_crud.get_realized_totals(
+        session,
+        group_by,
+        portfolio_id=portfolio_id,
+        owner_id=owner_id,
+        start=datetime.combine(start_date, time.min) if start_date else None,
+        end=datetime.combine(end_date, time.max) if end_date else None,
+    )
+    realized = []
+    for *group, realized_pl, quantity, number_of_lots in rows:
+        if group_by == RealizedPLGrouping.TICKER:
+            label = group[0]
+        elif group_by == RealizedPLGrouping.YEAR:
+            label = f"{int(group[0]):04d}"
+        else:
+            label = f"{int(group[0]):04d}-{int(group[1]):02d}"
+        realized.append(
+            RealizedPL(
+                group=label,
+                realized_pl=float(realized_pl),
+                quantity=float(quantity),
+                number_of_lots=number_of_lots,
+            )
+        )
+    return realized
+
+
+@router.get("/", response_model=List[RealizedPL])
+def get_portfolio_realized_pl(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    portfolio_id: uuid.UUID = Path(...),
+    group_by: RealizedPLGrouping = Query(
+        RealizedPLGrouping.TICKER, description="ticker, month or year"
+    ),
+    start_date: Optional[date] = Query(
+        None, description="Only lots closed on or after this day"
+    ),
+    end_date: Optional[date] = Query(
+        None, description="Only lots closed on or before this day"
+    ),
+):
+    """Get the realized P/L of a portfolio per ticker or calendar period."""
+    portfolio = get_portfolio_by_id(session=session, portfolio_id=portfolio_id)
+    if not portfolio:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
+        )
+    if portfolio.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to add trades to this portfolio",
+        )
+
+    return get_realized_pl(
+        session,
+        group_by,
+        portfolio_id=portfolio_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
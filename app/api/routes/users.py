@@ -1,7 +1,8 @@
 import uuid
-from typing import Any
+from datetime import date
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 import app.crud.users as user_crud
 import app.services.users as user_service
@@ -10,7 +11,10 @@ from app.api.deps import (
     SessionDep,
     get_current_superuser,
 )
+from app.api.routes.metrics.positions import get_consolidated_positions
+from app.api.routes.metrics.realized import get_realized_pl
 from app.core.security import verify_password
+from app.schemas.metrics import ConsolidatedPosition, RealizedPL, RealizedPLGrouping
 from app.schemas.users import (
     Message,
     UpdatePassword,
@@ -49,6 +53,49 @@ def read_user_me(current_user: CurrentUser) -> Any:
     return current_user
 
 
+@router.get("/me/positions", response_model=List[ConsolidatedPosition])
+def read_positions_me(
+    session: SessionDep,
+    current_user: CurrentUser,
+    breakdown: bool = Query(
+        False, description="Include the part of each position in every portfolio"
+    ),
+) -> Any:
+    """
+    Get the net open positions across all portfolios of the current user.
+    """
+    return get_consolidated_positions(
+        session=session, owner_id=current_user.id, breakdown=breakdown
+    )
+
+
+@router.get("/me/realized", response_model=List[RealizedPL])
+def read_realized_pl_me(
+    session: SessionDep,
+    current_user: CurrentUser,
+    group_by: RealizedPLGrouping = Query(
+        RealizedPLGrouping.TICKER, description="ticker, month or year"
+    ),
+    start_date: Optional[date] = Query(
+        None, description="Only lots closed on or after this day"
+    ),
+    end_date: Optional[date] = Query(
+        None, description="Only lots closed on or before this day"
+    ),
+) -> Any:
+    """
+    Get the realized P/L across all portfolios of the current user, per ticker
+    or calendar period.
+    """
+    return get_realized_pl(
+        session,
+        group_by,
+        owner_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
 @router.patch("/me/password", response_model=Message)
 def update_password_me(
     *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
@@ -1,4 +1,5 @@
 import secrets
+from typing import Literal
 
 from pydantic import MySQLDsn, computed_field
 from pydantic_core import MultiHostUrl
@@ -26,6 +27,50 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
 
+    # Market data
+    # "yfinance" calls Yahoo Finance, "file" serves quotes and history from the
+    # daily bars in MARKET_DATA_FILE_PATH (CSV or Parquet) without network access
+    MARKET_DATA_PROVIDER: Literal["yfinance", "file"] = "yfinance"
+    MARKET_DATA_FILE_PATH: str = "market_data.csv"
+    # "memory" keeps quotes per process, "sqlite" shares them between the worker
+    # processes of a host through QUOTE_CACHE_SQLITE_PATH
+    QUOTE_CACHE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    QUOTE_CACHE_SQLITE_PATH: str = "quote_cache.sqlite3"
+    QUOTE_CACHE_TTL_SECONDS: int = 60
+    QUOTE_CACHE_MAX_SIZE: int = 2048
+    QUOTE_BATCH_SIZE: int = 100
+    QUOTE_FETCH_WORKERS: int = 8
+    # Concurrent per-symbol requests to providers that fetch symbol by symbol
+    QUOTE_SYMBOL_WORKERS: int = 100
+    QUOTE_FETCH_TIMEOUT_SECONDS: float = 5.0
+    QUOTE_REFRESH_ENABLED: bool = True
+    QUOTE_REFRESH_INTERVAL_SECONDS: int = 30
+    QUOTE_REFRESH_BATCH_SIZE: int = 500
+    # Serve expired quotes up to this age while they are refreshed in the background
+    QUOTE_STALE_WHILE_REVALIDATE: bool = True
+    QUOTE_STALE_MAX_AGE_SECONDS: int = 60 * 60 * 24
+    # Stop calling the provider for a cooldown after consecutive failures
+    MARKET_DATA_FAILURE_THRESHOLD: int = 5
+    MARKET_DATA_COOLDOWN_SECONDS: int = 60
+
+    # Analytics
+    # Snapshot the open positions of every portfolio at the end of each day;
+    # the job only does work once a day has ended
+    SNAPSHOTS_ENABLED: bool = True
+    SNAPSHOT_INTERVAL_SECONDS: int = 60 * 60
+    # Closes per ticker and day kept in memory for as-of valuations
+    HISTORICAL_CLOSE_CACHE_MAX_SIZE: int = 100_000
+    # Roll trades and realized lots up into daily trade statistics, so long
+    # statistics periods are summed from days instead of trades
+    STATISTICS_ROLLUP_ENABLED: bool = True
+    STATISTICS_ROLLUP_INTERVAL_SECONDS: int = 60 * 60
+    # Annual risk-free rate that Sharpe and Sortino ratios are measured against
+    RISK_FREE_RATE: float = 0.0
+    # Daily value series of portfolios kept in memory, one per portfolio version
+    PERFORMANCE_CACHE_MAX_SIZE: int = 1000
+    # Index ticker that portfolio returns are compared against
+    BENCHMARK_TICKER: str = "SPY"
+
     @computed_field
     @property
     def DB_URI(self) -> MySQLDsn:
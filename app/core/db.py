@@ -15,6 +15,11 @@ def setup_database():
     from app.models.portfolios import Portfolio
     from app.models.trades import Trade
     from app.models.cash_actions import CashAction
+    from app.models.prices import DailyPrice
+    from app.models.lots import OpenLot, RealizedLot
+    from app.models.snapshots import PositionSnapshot
+    from app.models.statistics import DailyTradeStatistics
+    from app.models.leases import JobLease
 
     Base.metadata.create_all(bind=engine)
     mapper_registry.configure()
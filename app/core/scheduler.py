@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from typing import Callable, List, Tuple
+
+from app.core.log_config import logging_settings
+
+logger = logging.getLogger(logging_settings.LOGGER_NAME)
+
+
+class Scheduler:
+    """
+    Runs blocking jobs periodically in the background of the event loop.
+
+    Jobs execute on worker threads, away from the request threadpool, and a
+    failing run is logged without stopping later runs.
+    """
+
+    def __init__(self):
+        self._jobs: List[Tuple[str, Callable[[], None], float]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(
+        self, name: str, func: Callable[[], None], interval_seconds: float
+    ) -> None:
+        self._jobs.append((name, func, interval_seconds))
+
+    def start(self) -> None:
+        for name, func, interval_seconds in self._jobs:
+            task = asyncio.create_task(self._run(name, func, interval_seconds))
+            self._tasks.append(task)
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    @staticmethod
+    async def _run(name: str, func: Callable[[], None], interval_seconds: float):
+        while True:
+            try:
+                await asyncio.to_thread(func)
+            except Exception as e:
+                logger.exception(f"Background job {name} failed: {e}")
+            await asyncio.sleep(interval_seconds)
@@ -1,8 +1,11 @@
 import uuid
-from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.models.cash_actions import CashAction
+from sqlalchemy import select, and_, case, func
+from app.crud import portfolios as portfolio_crud
+from app.models.cash_actions import CashAction, CashActionType
 from app.schemas.cash_actions import CashActionCreate, CashActionUpdate
 
 
@@ -26,10 +29,59 @@ def get_cash_actions_by_portfolio(
     return list(session.execute(stmt).scalars().all())
 
 
+def get_net_deposits(
+    session: Session, portfolio_id: uuid.UUID, until: Optional[datetime] = None
+) -> Decimal:
+    """
+    Sum the deposits minus the withdrawals of a portfolio, optionally only those
+    executed up to a time.
+    """
+    conditions = [CashAction.portfolio_id == str(portfolio_id)]
+    if until is not None:
+        conditions.append(CashAction.execution_timestamp <= until)
+    stmt = select(
+        func.coalesce(
+            func.sum(
+                case(
+                    (CashAction.action == CashActionType.DEPOSIT, CashAction.amount),
+                    else_=-CashAction.amount,
+                )
+            ),
+            0,
+        )
+    ).where(and_(*conditions))
+    return session.execute(stmt).scalar_one()
+
+
+def get_cash_flows(
+    session: Session, portfolio_id: uuid.UUID, until: Optional[datetime] = None
+) -> List[Tuple[datetime, Decimal]]:
+    """
+    Retrieve the cash actions of a portfolio as execution times and signed
+    amounts, deposits positive, optionally only those executed up to a time.
+    """
+    conditions = [CashAction.portfolio_id == str(portfolio_id)]
+    if until is not None:
+        conditions.append(CashAction.execution_timestamp <= until)
+    stmt = (
+        select(
+            CashAction.execution_timestamp,
+            case(
+                (CashAction.action == CashActionType.DEPOSIT, CashAction.amount),
+                else_=-CashAction.amount,
+            ),
+        )
+        .where(and_(*conditions))
+        .order_by(CashAction.execution_timestamp)
+    )
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
 def create_cash_action(session: Session, cash_action_data: dict) -> CashAction:
     """Create a new cash action in the database."""
     cash_action = CashAction(**cash_action_data)
     session.add(cash_action)
+    portfolio_crud.increment_version(session, cash_action.portfolio_id)
     session.commit()
     session.refresh(cash_action)
     return cash_action
@@ -42,6 +94,7 @@ def update_cash_action(
     for key, value in updates.items():
         setattr(cash_action, key, value)
     session.add(cash_action)
+    portfolio_crud.increment_version(session, cash_action.portfolio_id)
     session.commit()
     session.refresh(cash_action)
     return cash_action
@@ -50,4 +103,5 @@ def update_cash_action(
 def delete_cash_action(session: Session, cash_action: CashAction) -> None:
     """Delete a cash action from the database"""
     session.delete(cash_action)
+    portfolio_crud.increment_version(session, cash_action.portfolio_id)
     session.commit()
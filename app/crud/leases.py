@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update, and_, or_
+from sqlalchemy.orm import Session
+
+from app.models.leases import JobLease
+
+
+def acquire_lease(
+    session: Session, name: str, holder: str, duration: timedelta
+) -> bool:
+    """
+    Take or renew the lease of a job for a holder, unless another holder has it
+    and it has not expired. Returns whether the holder has the lease.
+    """
+    now = datetime.utcnow()
+    session.execute(
+        insert(JobLease)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+        .values(name=name, holder=holder, expires_at=now + duration)
+    )
+    result = session.execute(
+        update(JobLease)
+        .where(
+            and_(
+                JobLease.name == name,
+                or_(JobLease.holder == holder, JobLease.expires_at <= now),
+            )
+        )
+        .values(holder=holder, expires_at=now + duration)
+    )
+    session.commit()
+    return result.rowcount == 1
@@ -0,0 +1,322 @@
+import uuid
+from collections import deque
+from decimal import Decimal
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Row, select, delete, and_, or_, func, extract
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from app.models.lots import OpenLot, RealizedLot
+from app.models.portfolios import Portfolio
+from app.models.trades import Trade, ActionType
+from app.schemas.metrics import RealizedPLGrouping
+
+# Helpers below only flush: they run inside the transaction of the trade change
+# that triggered them and are committed together with it. That transaction
+# holds the lock of the portfolio row; lots and trades are read with locking
+# reads so they see what concurrent changes committed before it got the lock.
+
+
+def _signed_quantity(trade: Trade) -> Decimal:
+    quantity = Decimal(str(trade.quantity))
+    return quantity if trade.action == ActionType.BUY else -quantity
+
+
+def match_trade(
+    lots: Iterable[OpenLot],
+    trade: Trade,
+    realized: Optional[List[RealizedLot]] = None,
+) -> List[OpenLot]:
+    """
+    Close the open lots of the opposite side first-in first-out against a trade,
+    then open a new lot with whatever quantity is left. Lots are updated in
+    place; returns the new lot, if any, and the lots that were fully closed.
+    The closed parts are appended to `realized` when given.
+
+    This is the one FIFO engine of the app: the lot ledger, the snapshots and,
+    through the realized lots, historical positions and statistics all follow
+    its rules. Closed lots are always the oldest, so callers replaying many
+    trades keep the lots in a deque and drop them from its front.
+    """
+    remaining = _signed_quantity(trade)
+    closed = []
+    for lot in lots:
+        if remaining == 0 or (lot.quantity > 0) == (remaining > 0):
+            break
+        matched = min(abs(lot.quantity), abs(remaining))
+        if realized is not None:
+            realized.append(_realize(lot, trade, matched))
+        if lot.quantity > 0:
+            lot.quantity -= matched
+            remaining += matched
+        else:
+            lot.quantity += matched
+            remaining -= matched
+        if lot.quantity == 0:
+            closed.append(lot)
+
+    opened = []
+    if remaining != 0:
+        opened.append(
+            OpenLot(
+                portfolio_id=trade.portfolio_id,
+                ticker=trade.ticker,
+                trade_id=trade.id,
+                opened_at=trade.execution_timestamp,
+                price=Decimal(str(trade.price)),
+                quantity=remaining,
+            )
+        )
+    return opened + closed
+
+
+def _realize(lot: OpenLot, trade: Trade, matched: Decimal) -> RealizedLot:
+    quantity = matched if lot.quantity > 0 else -matched
+    exit_price = Decimal(str(trade.price))
+    return RealizedLot(
+        portfolio_id=lot.portfolio_id,
+        ticker=lot.ticker,
+        open_trade_id=lot.trade_id,
+        close_trade_id=trade.id,
+        opened_at=lot.opened_at,
+        closed_at=trade.execution_timestamp,
+        entry_price=lot.price,
+        exit_price=exit_price,
+        quantity=quantity,
+        realized_pl=(exit_price - lot.price) * quantity,
+        # As stored: without time zones
+        holding_period_days=(
+            trade.execution_timestamp.replace(tzinfo=None)
+            - lot.opened_at.replace(tzinfo=None)
+        ).days,
+    )
+
+
+def _get_lots(session: Session, portfolio_id: str, ticker: str) -> List[OpenLot]:
+    stmt = (
+        select(OpenLot)
+        .where(and_(OpenLot.portfolio_id == portfolio_id, OpenLot.ticker == ticker))
+        .order_by(OpenLot.opened_at)
+        .with_for_update()
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def _apply_trade(session: Session, trade: Trade) -> None:
+    lots = _get_lots(session, trade.portfolio_id, trade.ticker)
+    realized = []
+    for lot in match_trade(lots, trade, realized):
+        if lot.quantity == 0:
+            session.delete(lot)
+        else:
+            session.add(lot)
+    session.add_all(realized)
+    session.flush()
+
+
+def rebuild_lots(session: Session, portfolio_id: str, ticker: str) -> None:
+    """Recompute the open and realized lots of a ticker from all of its trades."""
+    for model in (OpenLot, RealizedLot):
+        session.execute(
+            delete(model).where(
+                and_(model.portfolio_id == portfolio_id, model.ticker == ticker)
+            )
+        )
+    stmt = (
+        select(Trade)
+        .where(and_(Trade.portfolio_id == portfolio_id, Trade.ticker == ticker))
+        .order_by(Trade.execution_timestamp, Trade.action)
+        .with_for_update()
+    )
+    lots = deque()
+    realized = []
+    for trade in session.execute(stmt).scalars():
+        for lot in match_trade(lots, trade, realized):
+            if lot.quantity == 0:
+                lots.remove(lot)
+            else:
+                lots.append(lot)
+    session.add_all(lots)
+    session.add_all(realized)
+    session.flush()
+
+
+def record_trade(session: Session, trade: Trade) -> None:
+    """
+    Update the open lots of a trade's ticker, and record the parts it closes,
+    for a newly recorded trade. Trades arriving in time order are matched
+    against the open lots directly; a backdated trade rebuilds the ticker's
+    lots from its history.
+    """
+    session.flush()
+    later_trades = session.execute(
+        select(func.count())
+        .select_from(Trade)
+        .where(
+            and_(
+                Trade.portfolio_id == trade.portfolio_id,
+                Trade.ticker == trade.ticker,
+                Trade.id != trade.id,
+                or_(
+                    Trade.execution_timestamp > trade.execution_timestamp,
+                    and_(
+                        Trade.execution_timestamp == trade.execution_timestamp,
+                        Trade.action > trade.action,
+                    ),
+                ),
+            )
+        )
+        .with_for_update()
+    ).scalar_one()
+    if later_trades:
+        rebuild_lots(session, trade.portfolio_id, trade.ticker)
+    else:
+        _apply_trade(session, trade)
+
+
+def get_open_lots(session: Session, portfolio_id: uuid.UUID) -> List[OpenLot]:
+    """Retrieve the open lots of a portfolio, oldest first per ticker."""
+    stmt = (
+        select(OpenLot)
+        .where(OpenLot.portfolio_id == str(portfolio_id))
+        .order_by(OpenLot.ticker, OpenLot.opened_at)
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_held_tickers(session: Session) -> List[str]:
+    """Retrieve the distinct tickers of the open lots of every portfolio."""
+    stmt = select(OpenLot.ticker).distinct()
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_open_lot_totals_by_owner(
+    session: Session, owner_id: uuid.UUID
+) -> List[Tuple[str, str, Decimal, Decimal, datetime]]:
+    """
+    Retrieve per portfolio and ticker the quantity, cost and oldest opening time
+    of the open lots of every portfolio of a user, aggregated in the database.
+    """
+    stmt = (
+        select(
+            OpenLot.portfolio_id,
+            OpenLot.ticker,
+            func.sum(OpenLot.quantity),
+            func.sum(OpenLot.price * OpenLot.quantity),
+            func.min(OpenLot.opened_at),
+        )
+        .join(Portfolio, Portfolio.id == OpenLot.portfolio_id)
+        .where(Portfolio.owner_id == str(owner_id))
+        .group_by(OpenLot.portfolio_id, OpenLot.ticker)
+        .order_by(OpenLot.ticker, OpenLot.portfolio_id)
+    )
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
+def get_realized_totals(
+    session: Session,
+    group_by: RealizedPLGrouping,
+    portfolio_id: Optional[uuid.UUID] = None,
+    owner_id: Optional[uuid.UUID] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Tuple]:
+    """
+    Retrieve the realized P/L, closed quantity and number of realized lots of a
+    portfolio, or of every portfolio of a user, grouped by ticker or by year or
+    month of closing and aggregated in the database. Rows start with the
+    group: the ticker, the year, or the year and month. Only lots closed from
+    `start` up to `end` are counted when given.
+    """
+    if group_by == RealizedPLGrouping.TICKER:
+        group = [RealizedLot.ticker]
+    else:
+        group = [extract("year", RealizedLot.closed_at)]
+        if group_by == RealizedPLGrouping.MONTH:
+            group.append(extract("month", RealizedLot.closed_at))
+
+    conditions = []
+    if portfolio_id is not None:
+        conditions.append(RealizedLot.portfolio_id == str(portfolio_id))
+    if owner_id is not None:
+        conditions.append(Portfolio.owner_id == str(owner_id))
+    if start is not None:
+        conditions.append(RealizedLot.closed_at >= start)
+    if end is not None:
+        conditions.append(RealizedLot.closed_at <= end)
+
+    stmt = select(
+        *group,
+        func.sum(RealizedLot.realized_pl),
+        func.sum(func.abs(RealizedLot.quantity)),
+        func.count(),
+    )
+    if owner_id is not None:
+        stmt = stmt.join(Portfolio, Portfolio.id == RealizedLot.portfolio_id)
+    stmt = stmt.where(and_(*conditions)).group_by(*group).order_by(*group)
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
+def get_realized_lots_page(
+    session: Session,
+    portfolio_id: uuid.UUID,
+    order_by: InstrumentedAttribute,
+    descending: bool,
+    limit: int,
+    after: Optional[Tuple[Any, str]] = None,
+) -> List[RealizedLot]:
+    """
+    Retrieve up to `limit` realized lots of a portfolio ordered by one of their
+    columns, ids breaking ties, starting after the (value, id) of the last lot
+    of the previous page when given. Each order has an index, so a page reads
+    only its own rows.
+    """
+    conditions = [RealizedLot.portfolio_id == str(portfolio_id)]
+    if after is not None:
+        value, lot_id = after
+        if descending:
+            conditions.append(
+                or_(
+                    order_by < value,
+                    and_(order_by == value, RealizedLot.id < lot_id),
+                )
+            )
+        else:
+            conditions.append(
+                or_(
+                    order_by > value,
+                    and_(order_by == value, RealizedLot.id > lot_id),
+                )
+            )
+    order = (order_by, RealizedLot.id)
+    if descending:
+        order = (order_by.desc(), RealizedLot.id.desc())
+    stmt = select(RealizedLot).where(and_(*conditions)).order_by(*order).limit(limit)
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_realized_lots_within_period(
+    session: Session,
+    portfolio_id: uuid.UUID,
+    start: datetime,
+    end: datetime,
+    batch_size: int = 1000,
+) -> Iterator[Row]:
+    """
+    Stream the opening and closing times and the realized P/L of the lots of a
+    portfolio closed within a time range (inclusive), in closing order.
+    """
+    stmt = (
+        select(RealizedLot.opened_at, RealizedLot.closed_at, RealizedLot.realized_pl)
+        .where(
+            and_(
+                RealizedLot.portfolio_id == str(portfolio_id),
+                RealizedLot.closed_at >= start,
+                RealizedLot.closed_at <= end,
+            )
+        )
+        .order_by(RealizedLot.closed_at)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from session.execute(stmt)
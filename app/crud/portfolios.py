@@ -1,7 +1,7 @@
 import uuid
 from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
 from app.models.portfolios import Portfolio
@@ -64,3 +64,27 @@ def delete_portfolio(session: Session, portfolio: Portfolio) -> None:
     """
     session.delete(portfolio)
     session.commit()
+
+
+def lock_portfolio(session: Session, portfolio_id: uuid.UUID) -> None:
+    """
+    Lock the row of a portfolio until the end of the transaction, so changes to
+    its trades and the lots derived from them run one at a time.
+    """
+    session.execute(
+        select(Portfolio.id).where(Portfolio.id == str(portfolio_id)).with_for_update()
+    )
+
+
+def increment_version(session: Session, portfolio_id: uuid.UUID) -> None:
+    """
+    Record a change to the trades or cash actions of a portfolio. Only flushes:
+    it runs in the transaction of the change.
+    """
+    session.execute(
+        update(Portfolio)
+        .where(Portfolio.id == str(portfolio_id))
+        .values(version=Portfolio.version + 1)
+        .execution_options(synchronize_session="fetch")
+    )
+    session.flush()
@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, and_, insert
+from sqlalchemy.orm import Session
+
+from app.models.prices import DailyPrice
+
+
+def get_price_date_range(
+    session: Session, ticker: str
+) -> Tuple[Optional[date], Optional[date]]:
+    """Retrieve the first and last dates stored for a ticker."""
+    stmt = select(func.min(DailyPrice.date), func.max(DailyPrice.date)).where(
+        DailyPrice.ticker == ticker
+    )
+    first_date, last_date = session.execute(stmt).one()
+    return first_date, last_date
+
+
+def get_daily_prices(
+    session: Session, ticker: str, start_date: date, end_date: date
+) -> List[DailyPrice]:
+    """Retrieve the stored daily bars of a ticker within the date range, oldest first."""
+    stmt = (
+        select(DailyPrice)
+        .where(
+            and_(
+                DailyPrice.ticker == ticker,
+                DailyPrice.date >= start_date,
+                DailyPrice.date <= end_date,
+            )
+        )
+        .order_by(DailyPrice.date)
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_last_closes(
+    session: Session, tickers: List[str], start_date: date, end_date: date
+) -> Dict[str, Decimal]:
+    """
+    Retrieve per ticker the close of the last stored bar within the date range.
+    Tickers without a bar in the range are left out.
+    """
+    stmt = (
+        select(DailyPrice.ticker, DailyPrice.close)
+        .where(
+            and_(
+                DailyPrice.ticker.in_(tickers),
+                DailyPrice.date >= start_date,
+                DailyPrice.date <= end_date,
+            )
+        )
+        .order_by(DailyPrice.ticker, DailyPrice.date)
+    )
+    # Rows come oldest first, so the last one seen per ticker wins
+    return {ticker: close for ticker, close in session.execute(stmt).all()}
+
+
+def get_closes(
+    session: Session, tickers: List[str], start_date: date, end_date: date
+) -> List[Tuple[str, date, Decimal]]:
+    """Retrieve the stored closes of several tickers within the date range."""
+    stmt = (
+        select(DailyPrice.ticker, DailyPrice.date, DailyPrice.close)
+        .where(
+            and_(
+                DailyPrice.ticker.in_(tickers),
+                DailyPrice.date >= start_date,
+                DailyPrice.date <= end_date,
+            )
+        )
+        .order_by(DailyPrice.date)
+    )
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
+def create_daily_prices(session: Session, prices_data: List[dict]) -> None:
+    """
+    Store new daily bars in the database. Bars already stored, for instance by
+    another worker backfilling the same ticker, are left as they are.
+    """
+    stmt = (
+        insert(DailyPrice)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    session.execute(stmt, prices_data)
+    session.commit()
@@ -0,0 +1,132 @@
+import uuid
+from datetime import date, timedelta
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select, delete, insert, update, func, and_, or_
+from sqlalchemy.orm import Session
+
+from app.models.portfolios import Portfolio
+from app.models.snapshots import PositionSnapshot
+
+
+def get_portfolios_to_snapshot(session: Session, through: date) -> List[Portfolio]:
+    """Retrieve the portfolios whose snapshots stop before a day."""
+    stmt = select(Portfolio).where(
+        or_(
+            Portfolio.snapshots_through.is_(None),
+            Portfolio.snapshots_through < through,
+        )
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_snapshots(
+    session: Session, portfolio_id: uuid.UUID, snapshot_date: date
+) -> List[PositionSnapshot]:
+    """
+    Retrieve the snapshots of the open lots of a portfolio on a day, oldest
+    first per ticker.
+    """
+    stmt = (
+        select(PositionSnapshot)
+        .where(
+            and_(
+                PositionSnapshot.portfolio_id == str(portfolio_id),
+                PositionSnapshot.date == snapshot_date,
+            )
+        )
+        .order_by(PositionSnapshot.ticker, PositionSnapshot.opened_at)
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_last_snapshot_date(
+    session: Session, portfolio_id: uuid.UUID, on_or_before: date
+) -> Optional[date]:
+    """Retrieve the last day on or before a day with snapshots of a portfolio."""
+    stmt = select(func.max(PositionSnapshot.date)).where(
+        and_(
+            PositionSnapshot.portfolio_id == str(portfolio_id),
+            PositionSnapshot.date <= on_or_before,
+        )
+    )
+    return session.execute(stmt).scalar()
+
+
+def create_snapshots(
+    session: Session,
+    portfolio: Portfolio,
+    snapshots_data: Iterable[dict],
+    through: date,
+    seen_version: int,
+    seen_through: Optional[date],
+    batch_size: int = 1000,
+) -> Optional[int]:
+    """
+    Store new position snapshots, batch_size rows per insert, and mark the
+    portfolio covered up to a day, provided its version and coverage are still
+    those the snapshots were taken from. Returns the number of snapshots stored.
+    Otherwise a trade changed, or another run took the same snapshots, in the
+    meantime: nothing is stored and None is returned.
+
+    The snapshots are only read once the portfolio is claimed, so they can be
+    produced lazily while its row is locked.
+    """
+    result = session.execute(
+        update(Portfolio)
+        .where(
+            and_(
+                Portfolio.id == portfolio.id,
+                Portfolio.version == seen_version,
+                (
+                    Portfolio.snapshots_through.is_(None)
+                    if seen_through is None
+                    else Portfolio.snapshots_through == seen_through
+                ),
+            )
+        )
+        .values(snapshots_through=through)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        session.rollback()
+        return None
+    stored = 0
+    snapshots_data = iter(snapshots_data)
+    batch = list(islice(snapshots_data, batch_size))
+    while batch:
+        session.execute(insert(PositionSnapshot), batch)
+        stored += len(batch)
+        batch = list(islice(snapshots_data, batch_size))
+    session.commit()
+    return stored
+
+
+def invalidate_snapshots(
+    session: Session, portfolio_id: uuid.UUID, from_date: date
+) -> None:
+    """
+    Drop the snapshots of a portfolio from a day on, after a change to its trades
+    on that day. Only flushes: it runs in the transaction of the trade change.
+    """
+    session.execute(
+        delete(PositionSnapshot).where(
+            and_(
+                PositionSnapshot.portfolio_id == str(portfolio_id),
+                PositionSnapshot.date >= from_date,
+            )
+        )
+    )
+    session.execute(
+        update(Portfolio)
+        .where(
+            and_(
+                Portfolio.id == str(portfolio_id),
+                Portfolio.snapshots_through >= from_date,
+            )
+        )
+        .values(snapshots_through=from_date - timedelta(days=1))
+        .execution_options(synchronize_session="fetch")
+    )
+    session.flush()
@@ -0,0 +1,106 @@
+import uuid
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, delete, update, and_, or_
+from sqlalchemy.orm import Session
+
+from app.models.portfolios import Portfolio
+from app.models.statistics import DailyTradeStatistics
+
+
+def get_portfolios_to_roll_up(session: Session, through: date) -> List[Portfolio]:
+    """Retrieve the portfolios whose daily trade statistics stop before a day."""
+    stmt = select(Portfolio).where(
+        or_(
+            Portfolio.statistics_through.is_(None),
+            Portfolio.statistics_through < through,
+        )
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_daily_statistics(
+    session: Session, portfolio_id: uuid.UUID, first_day: date, last_day: date
+) -> List[DailyTradeStatistics]:
+    """Retrieve the daily trade statistics of a portfolio between two days."""
+    stmt = (
+        select(DailyTradeStatistics)
+        .where(
+            and_(
+                DailyTradeStatistics.portfolio_id == str(portfolio_id),
+                DailyTradeStatistics.date >= first_day,
+                DailyTradeStatistics.date <= last_day,
+            )
+        )
+        .order_by(DailyTradeStatistics.date)
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def create_daily_statistics(
+    session: Session,
+    portfolio: Portfolio,
+    statistics_data: List[dict],
+    through: date,
+    seen_version: int,
+    seen_through: Optional[date],
+) -> bool:
+    """
+    Store new daily trade statistics and mark the portfolio covered up to a day,
+    provided its version and coverage are still those the statistics were
+    computed from. Otherwise a trade changed, or another run rolled the same
+    days up, in the meantime: nothing is stored and False is returned.
+    """
+    result = session.execute(
+        update(Portfolio)
+        .where(
+            and_(
+                Portfolio.id == portfolio.id,
+                Portfolio.version == seen_version,
+                (
+                    Portfolio.statistics_through.is_(None)
+                    if seen_through is None
+                    else Portfolio.statistics_through == seen_through
+                ),
+            )
+        )
+        .values(statistics_through=through)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        session.rollback()
+        return False
+    session.add_all(DailyTradeStatistics(**day_data) for day_data in statistics_data)
+    session.commit()
+    return True
+
+
+def invalidate_daily_statistics(
+    session: Session, portfolio_id: uuid.UUID, from_date: date
+) -> None:
+    """
+    Drop the daily trade statistics of a portfolio from a day on, after a change
+    to its trades on that day. Only flushes: it runs in the transaction of the
+    trade change.
+    """
+    session.execute(
+        delete(DailyTradeStatistics).where(
+            and_(
+                DailyTradeStatistics.portfolio_id == str(portfolio_id),
+                DailyTradeStatistics.date >= from_date,
+            )
+        )
+    )
+    session.execute(
+        update(Portfolio)
+        .where(
+            and_(
+                Portfolio.id == str(portfolio_id),
+                Portfolio.statistics_through >= from_date,
+            )
+        )
+        .values(statistics_through=from_date - timedelta(days=1))
+        .execution_options(synchronize_session="fetch")
+    )
+    session.flush()
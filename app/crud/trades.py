@@ -1,12 +1,28 @@
 import uuid
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Tuple
 
-from sqlalchemy import select, and_
+from sqlalchemy import Row, select, and_, case, func
 from sqlalchemy.orm import Session
 
+from app.crud import lots as lot_crud
+from app.crud import portfolios as portfolio_crud
+from app.crud import snapshots as snapshot_crud
+from app.crud import statistics as statistics_crud
 from app.models.trades import Trade, ActionType
 
+# Columns read to match trades into lots, without loading Trade instances
+_MATCHING_COLUMNS = (
+    Trade.id,
+    Trade.portfolio_id,
+    Trade.action,
+    Trade.execution_timestamp,
+    Trade.ticker,
+    Trade.price,
+    Trade.quantity,
+)
+
 
 def get_trade_by_id(session: Session, trade_id: uuid.UUID) -> Optional[Trade]:
     """Retrieve trade by its id."""
@@ -31,73 +47,187 @@ def get_trades_by_portfolio(
 
 
 def create_trade(session: Session, trade_data: dict) -> Trade:
-    """Create a new trade in the database."""
+    """
+    Create a new trade in the database, update its open lots and drop the
+    position snapshots and daily statistics it makes out of date.
+    """
+    portfolio_crud.lock_portfolio(session, trade_data["portfolio_id"])
     trade = Trade(**trade_data)
     session.add(trade)
+    lot_crud.record_trade(session, trade)
+    _invalidate_daily_data(
+        session, trade.portfolio_id, trade.execution_timestamp.date()
+    )
     session.commit()
     session.refresh(trade)
     return trade
 
 
 def update_trade(session: Session, trade: Trade, updates: dict) -> Trade:
-    """Update an existing trade."""
+    """
+    Update an existing trade, rebuild the open lots it affects and drop the
+    position snapshots and daily statistics it makes out of date.
+    """
+    portfolio_crud.lock_portfolio(session, trade.portfolio_id)
+    previous_ticker = trade.ticker
+    previous_date = trade.execution_timestamp.date()
     for key, value in updates.items():
         setattr(trade, key, value)
     session.add(trade)
+    session.flush()
+    lot_crud.rebuild_lots(session, trade.portfolio_id, trade.ticker)
+    if previous_ticker != trade.ticker:
+        lot_crud.rebuild_lots(session, trade.portfolio_id, previous_ticker)
+    _invalidate_daily_data(
+        session,
+        trade.portfolio_id,
+        min(previous_date, trade.execution_timestamp.date()),
+    )
     session.commit()
     session.refresh(trade)
     return trade
 
 
 def delete_trade(session: Session, trade: Trade) -> None:
-    """Delete a trade from the database."""
+    """
+    Delete a trade from the database, rebuild the open lots of its ticker and
+    drop the position snapshots and daily statistics it makes out of date.
+    """
+    portfolio_crud.lock_portfolio(session, trade.portfolio_id)
     session.delete(trade)
+    session.flush()
+    lot_crud.rebuild_lots(session, trade.portfolio_id, trade.ticker)
+    _invalidate_daily_data(
+        session, trade.portfolio_id, trade.execution_timestamp.date()
+    )
     session.commit()
 
 
-def get_sell_trades(session: Session, portfolio_id: uuid.UUID) -> List[Trade]:
-    """Retrieve all sell trades for the given portfolio."""
-    return list(
-        session.query(Trade)
-        .filter(
-            and_(
-                Trade.portfolio_id == str(portfolio_id),
-                Trade.action == ActionType.SELL,
-            )
-        )
-        .order_by(Trade.execution_timestamp)
-        .all()
-    )
+def _invalidate_daily_data(
+    session: Session, portfolio_id: uuid.UUID, from_date: date
+) -> None:
+    snapshot_crud.invalidate_snapshots(session, portfolio_id, from_date)
+    statistics_crud.invalidate_daily_statistics(session, portfolio_id, from_date)
+    portfolio_crud.increment_version(session, portfolio_id)
 
 
-def get_buy_trades(session: Session, portfolio_id: uuid.UUID) -> List[Trade]:
-    """Retrieve all buy trades for the given portfolio."""
-    return list(
-        session.query(Trade)
-        .filter(
-            and_(
-                Trade.portfolio_id == str(portfolio_id),
-                Trade.action == ActionType.BUY,
-            )
-        )
-        .order_by(Trade.execution_timestamp)
-        .all()
+def count_trades(session: Session, portfolio_id: uuid.UUID) -> int:
+    """Count the trades of a portfolio."""
+    stmt = (
+        select(func.count())
+        .select_from(Trade)
+        .where(Trade.portfolio_id == str(portfolio_id))
+    )
+    return session.execute(stmt).scalar_one()
+
+
+def stream_trades(
+    session: Session,
+    portfolio_id: uuid.UUID,
+    batch_size: int = 1000,
+    after: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[Row]:
+    """
+    Stream the trades of a portfolio in execution order, buys before sells at
+    the same timestamp, optionally only those executed after one time and up to
+    another. Rows are fetched batch_size at a time through a server-side cursor
+    and carry only the columns needed to match lots.
+    """
+    conditions = [Trade.portfolio_id == str(portfolio_id)]
+    if after is not None:
+        conditions.append(Trade.execution_timestamp > after)
+    if until is not None:
+        conditions.append(Trade.execution_timestamp <= until)
+    stmt = (
+        select(*_MATCHING_COLUMNS)
+        .where(and_(*conditions))
+        .order_by(Trade.execution_timestamp, Trade.action)
+        .execution_options(yield_per=batch_size)
     )
+    yield from session.execute(stmt)
 
 
 def get_trades_within_period(
-    session: Session, portfolio_id: uuid.UUID, start_date: datetime, end_date: datetime
-) -> List[Trade]:
-    """Retrieve all trades for the given portfolio within the specified date range."""
-    return list(
-        session.query(Trade)
-        .filter(
+    session: Session,
+    portfolio_id: uuid.UUID,
+    start_date: datetime,
+    end_date: datetime,
+    batch_size: int = 1000,
+) -> Iterator[Row]:
+    """
+    Stream the trades of a portfolio executed within the date range (inclusive)
+    in execution order, buys before sells at the same timestamp, as rows of the
+    columns needed to match lots.
+    """
+    stmt = (
+        select(*_MATCHING_COLUMNS)
+        .where(
             and_(
                 Trade.portfolio_id == str(portfolio_id),
                 Trade.execution_timestamp >= start_date,
                 Trade.execution_timestamp <= end_date,
             )
         )
-        .order_by(Trade.execution_timestamp)
-        .all()
+        .order_by(Trade.execution_timestamp, Trade.action)
+        .execution_options(yield_per=batch_size)
     )
+    yield from session.execute(stmt)
+
+
+def get_last_trade_timestamp(
+    session: Session, portfolio_id: uuid.UUID, before: datetime
+) -> Optional[datetime]:
+    """Retrieve the time of the last trade of a portfolio before a time."""
+    stmt = select(func.max(Trade.execution_timestamp)).where(
+        and_(
+            Trade.portfolio_id == str(portfolio_id),
+            Trade.execution_timestamp < before,
+        )
+    )
+    return session.execute(stmt).scalar_one()
+
+
+def get_position_aggregates(
+    session: Session, portfolio_id: uuid.UUID, until: Optional[datetime] = None
+) -> List[Tuple[str, Decimal, Decimal, Decimal, Optional[datetime]]]:
+    """
+    Retrieve per ticker the net quantity, buy value, buy quantity and first buy
+    date of a portfolio's trades, optionally only those executed up to a time,
+    aggregated in the database.
+    """
+    conditions = [Trade.portfolio_id == str(portfolio_id)]
+    if until is not None:
+        conditions.append(Trade.execution_timestamp <= until)
+    is_buy = Trade.action == ActionType.BUY
+    stmt = (
+        select(
+            Trade.ticker,
+            func.sum(case((is_buy, Trade.quantity), else_=-Trade.quantity)),
+            func.sum(case((is_buy, Trade.price * Trade.quantity), else_=0)),
+            func.sum(case((is_buy, Trade.quantity), else_=0)),
+            func.min(case((is_buy, Trade.execution_timestamp))),
+        )
+        .where(and_(*conditions))
+        .group_by(Trade.ticker)
+    )
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
+def get_trade_cash_flow(
+    session: Session, portfolio_id: uuid.UUID, until: Optional[datetime] = None
+) -> Decimal:
+    """
+    Sum the proceeds of sells minus the cost of buys of a portfolio, optionally
+    only for trades executed up to a time.
+    """
+    conditions = [Trade.portfolio_id == str(portfolio_id)]
+    if until is not None:
+        conditions.append(Trade.execution_timestamp <= until)
+    value = Trade.price * Trade.quantity
+    stmt = select(
+        func.coalesce(
+            func.sum(case((Trade.action == ActionType.BUY, -value), else_=value)), 0
+        )
+    ).where(and_(*conditions))
+    return session.execute(stmt).scalar_one()
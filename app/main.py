@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
@@ -12,16 +14,44 @@ from app.core.log_config import logging_settings
 logging_settings.setup()
 
 from app.core.middleware import log_requests, add_request_id
+from app.core.scheduler import Scheduler
+from app.services.quote_refresher import run_quote_refresh
+from app.services.snapshots import run_snapshot_fill
+from app.services.statistics import run_statistics_rollup
 
 
 limiter = Limiter(key_func=get_remote_address)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler = Scheduler()
+    if settings.QUOTE_REFRESH_ENABLED:
+        scheduler.add_job(
+            "quote_refresh", run_quote_refresh, settings.QUOTE_REFRESH_INTERVAL_SECONDS
+        )
+    if settings.SNAPSHOTS_ENABLED:
+        scheduler.add_job(
+            "snapshot_fill", run_snapshot_fill, settings.SNAPSHOT_INTERVAL_SECONDS
+        )
+    if settings.STATISTICS_ROLLUP_ENABLED:
+        scheduler.add_job(
+            "statistics_rollup",
+            run_statistics_rollup,
+            settings.STATISTICS_ROLLUP_INTERVAL_SECONDS,
+        )
+    scheduler.start()
+    app.state.scheduler = scheduler
+    yield
+    await scheduler.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Welcome to Finalyzr's API documentation! Here you will be able to discover all the ways you can "
     "interact with the Finalyzr API.",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
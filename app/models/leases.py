@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.mysql import CHAR
+
+from app.core.db import Base
+
+
+class JobLease(Base):
+    """
+    The right to run a background job, held by one process at a time until it
+    expires, so a job scheduled in every worker runs in one of them only.
+    """
+
+    __tablename__ = "job_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(CHAR(36), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
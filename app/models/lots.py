@@ -0,0 +1,81 @@
+import uuid
+
+from sqlalchemy import Column, String, ForeignKey, DateTime, Numeric, Integer, Index
+from sqlalchemy.dialects.mysql import CHAR
+from sqlalchemy.orm import relationship
+
+from app.core.db import Base
+
+
+class OpenLot(Base):
+    """
+    The part of a trade that is still open, matched first-in first-out against
+    later trades of the same ticker. Short lots have a negative quantity.
+    """
+
+    __tablename__ = "open_lots"
+    __table_args__ = (
+        Index("ix_open_lots_portfolio_id_ticker", "portfolio_id", "ticker"),
+    )
+
+    id = Column(
+        CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True
+    )
+    portfolio_id = Column(CHAR(36), ForeignKey("portfolios.id"), nullable=False)
+    ticker = Column(String(10), nullable=False)
+    # The opening trade; not a foreign key so the lots of a ticker can be rebuilt
+    # in the same flush that deletes one of its trades
+    trade_id = Column(CHAR(36), nullable=False)
+    opened_at = Column(DateTime(timezone=True), nullable=False)
+    price = Column(Numeric(20, 10), nullable=False)
+    quantity = Column(Numeric(20, 10), nullable=False)
+
+    portfolio = relationship("Portfolio", back_populates="open_lots")
+
+
+class RealizedLot(Base):
+    """
+    The part of an open lot closed by a later trade of the opposite side, with
+    the P/L it realized. Quantities of closed short lots are negative, as in
+    OpenLot, so the realized P/L is always (exit_price - entry_price) * quantity.
+    """
+
+    __tablename__ = "realized_lots"
+    # Historical positions are paged in the order of any of these columns
+    __table_args__ = (
+        Index("ix_realized_lots_portfolio_id_ticker", "portfolio_id", "ticker"),
+        Index("ix_realized_lots_portfolio_id_closed_at", "portfolio_id", "closed_at"),
+        Index("ix_realized_lots_portfolio_id_opened_at", "portfolio_id", "opened_at"),
+        Index("ix_realized_lots_portfolio_id_quantity", "portfolio_id", "quantity"),
+        Index(
+            "ix_realized_lots_portfolio_id_entry_price", "portfolio_id", "entry_price"
+        ),
+        Index("ix_realized_lots_portfolio_id_exit_price", "portfolio_id", "exit_price"),
+        Index(
+            "ix_realized_lots_portfolio_id_realized_pl", "portfolio_id", "realized_pl"
+        ),
+        Index(
+            "ix_realized_lots_portfolio_id_holding_period_days",
+            "portfolio_id",
+            "holding_period_days",
+        ),
+    )
+
+    id = Column(
+        CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True
+    )
+    portfolio_id = Column(CHAR(36), ForeignKey("portfolios.id"), nullable=False)
+    ticker = Column(String(10), nullable=False)
+    # Not foreign keys, for the same reason as OpenLot.trade_id
+    open_trade_id = Column(CHAR(36), nullable=False)
+    close_trade_id = Column(CHAR(36), nullable=False)
+    opened_at = Column(DateTime(timezone=True), nullable=False)
+    closed_at = Column(DateTime(timezone=True), nullable=False)
+    entry_price = Column(Numeric(20, 10), nullable=False)
+    exit_price = Column(Numeric(20, 10), nullable=False)
+    quantity = Column(Numeric(20, 10), nullable=False)
+    realized_pl = Column(Numeric(20, 10), nullable=False)
+    # Whole days from opening to closing
+    holding_period_days = Column(Integer, nullable=False)
+
+    portfolio = relationship("Portfolio", back_populates="realized_lots")
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, String, ForeignKey, Date, DateTime, Integer, func
 from sqlalchemy.dialects.mysql import CHAR
 
 from sqlalchemy.orm import relationship
@@ -21,6 +21,14 @@ class Portfolio(Base):
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    # Last day covered by the position snapshots; days after it are not snapshot
+    # yet, or were invalidated by a trade change
+    snapshots_through = Column(Date, nullable=True)
+    # Last day covered by the daily trade statistics, in the same way
+    statistics_through = Column(Date, nullable=True)
+    # Incremented on every change to the trades or cash actions, so caches of
+    # data derived from them can be keyed on it
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     owner = relationship("User", back_populates="portfolios")
     trades = relationship(
@@ -29,3 +37,17 @@ class Portfolio(Base):
     cash_actions = relationship(
         "CashAction", back_populates="portfolio", cascade="all, delete-orphan"
     )
+    open_lots = relationship(
+        "OpenLot", back_populates="portfolio", cascade="all, delete-orphan"
+    )
+    realized_lots = relationship(
+        "RealizedLot", back_populates="portfolio", cascade="all, delete-orphan"
+    )
+    position_snapshots = relationship(
+        "PositionSnapshot", back_populates="portfolio", cascade="all, delete-orphan"
+    )
+    daily_trade_statistics = relationship(
+        "DailyTradeStatistics",
+        back_populates="portfolio",
+        cascade="all, delete-orphan",
+    )
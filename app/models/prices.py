@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Date, Numeric, BigInteger
+
+from app.core.db import Base
+
+
+class DailyPrice(Base):
+    __tablename__ = "daily_prices"
+
+    ticker = Column(String(10), primary_key=True)
+    date = Column(Date, primary_key=True)
+    open = Column(Numeric(20, 10), nullable=True)
+    high = Column(Numeric(20, 10), nullable=True)
+    low = Column(Numeric(20, 10), nullable=True)
+    close = Column(Numeric(20, 10), nullable=False)
+    volume = Column(BigInteger, nullable=True)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, ForeignKey, Date, DateTime, Numeric
+from sqlalchemy.dialects.mysql import CHAR
+from sqlalchemy.orm import relationship
+
+from app.core.db import Base
+
+
+class PositionSnapshot(Base):
+    """
+    An open lot of a portfolio at the end of a day on which trades changed its
+    lots, after that day's trades, with its ticker's close that day. The lots
+    of the days without trades are those of the last snapshot before them.
+    Positions are the sums of their lots; keeping the lots lets later trades
+    close them first-in first-out exactly as a replay of every trade would.
+    Days ending without open lots have no snapshot.
+    """
+
+    __tablename__ = "position_snapshots"
+
+    portfolio_id = Column(CHAR(36), ForeignKey("portfolios.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    ticker = Column(String(10), primary_key=True)
+    # The opening trade, as in OpenLot
+    trade_id = Column(CHAR(36), primary_key=True)
+    opened_at = Column(DateTime(timezone=True), nullable=False)
+    price = Column(Numeric(20, 10), nullable=False)
+    # Negative for short lots, as in OpenLot
+    quantity = Column(Numeric(20, 10), nullable=False)
+    # Last close on or before the date; empty when no price history is available
+    close_price = Column(Numeric(20, 10), nullable=True)
+
+    portfolio = relationship("Portfolio", back_populates="position_snapshots")
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, ForeignKey, Date, Integer, Numeric
+from sqlalchemy.dialects.mysql import CHAR
+from sqlalchemy.orm import relationship
+
+from app.core.db import Base
+
+
+class DailyTradeStatistics(Base):
+    """
+    The trade statistics of a portfolio for one day: its trades, and the
+    realized lots closed that day. Days without trades have no row.
+    """
+
+    __tablename__ = "daily_trade_statistics"
+
+    portfolio_id = Column(CHAR(36), ForeignKey("portfolios.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    trade_count = Column(Integer, nullable=False)
+    volume = Column(Numeric(20, 10), nullable=False)
+    # Days from each trade of the day to the trade before it, summed, and from
+    # the first trade of the day alone; the first trade ever counts as 0
+    gap_days = Column(Integer, nullable=False)
+    first_gap_days = Column(Integer, nullable=False)
+    closed_lots = Column(Integer, nullable=False)
+    holding_period_days = Column(Integer, nullable=False)
+    wins = Column(Integer, nullable=False)
+    losses = Column(Integer, nullable=False)
+
+    portfolio = relationship("Portfolio", back_populates="daily_trade_statistics")
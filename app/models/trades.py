@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     Numeric,
+    Index,
 )
 from sqlalchemy.dialects.mysql import CHAR
 from sqlalchemy.orm import relationship
@@ -22,6 +23,13 @@ class ActionType(str, PyEnum):
 
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        Index(
+            "ix_trades_portfolio_id_execution_timestamp",
+            "portfolio_id",
+            "execution_timestamp",
+        ),
+    )
 
     id = Column(
         CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True
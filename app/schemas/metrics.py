@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -14,16 +14,35 @@ class PortfolioOverview(BaseModel):
     number_of_open_positions: int
 
 
+class CostBasis(str, Enum):
+    FIFO = "fifo"
+    AVERAGE = "average"
+
+
 class Position(BaseModel):
     symbol: str
     quantity: float
     entry_price: float
-    current_price: float
-    current_value: float
-    unrealized_pl: float
+    current_price: Optional[float] = None
+    current_value: Optional[float] = None
+    unrealized_pl: Optional[float] = None
+    price_is_stale: bool = False
+    entry_date: datetime
+
+
+class PortfolioPositionShare(BaseModel):
+    portfolio_id: str
+    quantity: float
+    entry_price: float
+    current_value: Optional[float] = None
+    unrealized_pl: Optional[float] = None
     entry_date: datetime
 
 
+class ConsolidatedPosition(Position):
+    portfolios: Optional[List[PortfolioPositionShare]] = None
+
+
 class HistoricalPosition(BaseModel):
     trade_id: str
     symbol: str
@@ -39,6 +58,22 @@ class HistoricalPosition(BaseModel):
         from_attributes = True
 
 
+class HistoricalPositionOrder(str, Enum):
+    SYMBOL = "symbol"
+    QUANTITY = "quantity"
+    ENTRY_PRICE = "entry_price"
+    EXIT_PRICE = "exit_price"
+    REALIZED_PL = "realized_pl"
+    ENTRY_DATE = "entry_date"
+    EXIT_DATE = "exit_date"
+    HOLDING_PERIOD_DAYS = "holding_period_days"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
 class TradeMetrics(BaseModel):
     average_trade_volume: Optional[float]
     trade_frequency_days_per_trade: Optional[float]
@@ -62,3 +97,44 @@ class Period(str, Enum):
     TEN_YEARS = "10Y"
     YEAR_TO_DATE = "YTD"
     ALL = "All"
+
+
+class BenchmarkMetrics(BaseModel):
+    ticker: str
+    # Annualized return not explained by the benchmark, over the risk-free rate
+    alpha: Optional[float]
+    beta: Optional[float]
+    correlation: Optional[float]
+    # Annualized volatility of the returns in excess of the benchmark's
+    tracking_error: Optional[float]
+    information_ratio: Optional[float]
+
+
+class PerformanceMetrics(BaseModel):
+    # First and last day with a daily return in the period
+    start_date: Optional[date]
+    end_date: Optional[date]
+    trading_days: int
+    total_return: Optional[float]
+    annualized_return: Optional[float]
+    volatility: Optional[float]
+    sharpe_ratio: Optional[float]
+    sortino_ratio: Optional[float]
+    # Largest fall of the value from a previous peak, as a negative fraction
+    max_drawdown: Optional[float]
+    # Against the benchmark index, None when its prices are unavailable
+    benchmark: Optional[BenchmarkMetrics] = None
+
+
+class RealizedPLGrouping(str, Enum):
+    TICKER = "ticker"
+    MONTH = "month"
+    YEAR = "year"
+
+
+class RealizedPL(BaseModel):
+    # Ticker, year ("2024") or month ("2024-03") of closing
+    group: str
+    realized_pl: float
+    quantity: float
+    number_of_lots: int
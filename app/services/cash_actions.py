@@ -1,10 +1,13 @@
 import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
 
 from sqlalchemy.orm import Session
 
 from app.crud import cash_actions as cash_action_crud
-from app.models.cash_actions import CashAction, CashActionType
-from app.models.trades import Trade, ActionType
+from app.crud import trades as trade_crud
+from app.models.cash_actions import CashAction
 from app.schemas.cash_actions import CashActionCreate, CashActionUpdate
 
 
@@ -31,30 +34,14 @@ def update_cash_action(
     )
 
 
-def calculate_cash_balance(session: Session, portfolio_id: uuid.UUID) -> float:
-    cash_actions = (
-        session.query(CashAction)
-        .filter(CashAction.portfolio_id == str(portfolio_id))
-        .all()
-    )
-    total_deposits = sum(
-        ca.amount for ca in cash_actions if ca.action == CashActionType.DEPOSIT
-    )
-    total_withdrawals = sum(
-        ca.amount for ca in cash_actions if ca.action == CashActionType.WITHDRAWAL
-    )
-
-    trades = session.query(Trade).filter(Trade.portfolio_id == str(portfolio_id)).all()
-    total_buys = sum(
-        trade.price * trade.quantity
-        for trade in trades
-        if trade.action == ActionType.BUY
-    )
-    total_sells = sum(
-        trade.price * trade.quantity
-        for trade in trades
-        if trade.action == ActionType.SELL
-    )
-
-    cash_balance = float(total_deposits - total_withdrawals - total_buys + total_sells)
-    return cash_balance
+def calculate_cash_balance(
+    session: Session, portfolio_id: uuid.UUID, as_of: Optional[datetime] = None
+) -> float:
+    """
+    Cash of a portfolio from its deposits, withdrawals and trades, optionally
+    only counting those executed up to a time. Totals are summed in the
+    database.
+    """
+    net_deposits = cash_action_crud.get_net_deposits(session, portfolio_id, as_of)
+    trade_cash_flow = trade_crud.get_trade_cash_flow(session, portfolio_id, as_of)
+    return float(Decimal(str(net_deposits)) + Decimal(str(trade_cash_flow)))
@@ -0,0 +1,18 @@
+import uuid
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from app.crud import leases as lease_crud
+
+# Holder of the leases taken by this process
+_holder = str(uuid.uuid4())
+
+
+def acquire(session: Session, name: str, seconds: float) -> bool:
+    """
+    Take the lease of a job for this process for a number of seconds, renewing
+    it if this process already holds it. Returns False while another process
+    holds it.
+    """
+    return lease_crud.acquire_lease(session, name, _holder, timedelta(seconds=seconds))
@@ -0,0 +1,414 @@
+"""
+Daily value series of portfolios and the return and risk metrics computed from
+them.
+
+A portfolio is valued at the close of every business day as its cash plus its
+holdings at that day's close. Activity on a weekend or holiday counts towards
+the next business day, and a ticker without a stored close is valued at its
+last close or, before it has one, at its last trade price. Purchases the cash
+balance does not cover are taken as deposits of the missing amount, so
+portfolios recorded without their cash actions still have a value to measure
+returns against.
+
+Returns are compared against a benchmark index by regressing them on its
+returns over the same business days. The index's returns are kept in a cache
+shared by all portfolios, so its prices are downloaded once a day at most.
+
+This module imports NumPy and pandas at the top; import it lazily from request
+paths.
+"""
+
+import logging
+import math
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.log_config import logging_settings
+from app.crud import cash_actions as cash_action_crud
+from app.crud import prices as price_crud
+from app.crud import trades as trade_crud
+from app.models.portfolios import Portfolio
+from app.models.trades import ActionType
+from app.schemas.metrics import BenchmarkMetrics, PerformanceMetrics
+from app.services import prices as price_service
+from app.utils.quote_cache import QuoteCache
+
+logger = logging.getLogger(logging_settings.LOGGER_NAME)
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Value series keyed by "PORTFOLIO_ID:VERSION:YYYY-MM-DD" (the last day). A
+# trade or cash action change bumps the version, so entries never go stale;
+# the TTL only frees the memory of portfolios nobody looks at.
+value_series = QuoteCache(
+    ttl_seconds=60 * 60 * 24, max_size=settings.PERFORMANCE_CACHE_MAX_SIZE
+)
+
+# Daily returns of benchmark indices, keyed by "TICKER:YYYY-MM-DD" (the last
+# day), with the first day they cover
+benchmark_returns = QuoteCache(ttl_seconds=60 * 60 * 24, max_size=16)
+
+
+class ValueSeries(NamedTuple):
+    """The value of a portfolio at each business day's close."""
+
+    dates: np.ndarray  # datetime64[D]
+    values: np.ndarray
+    # Net deposits made on each day
+    flows: np.ndarray
+    # False when the price history of a ticker could not be brought up to date,
+    # so some of its days are valued at older prices
+    complete: bool = True
+
+
+def build_value_series(
+    session: Session, portfolio_id: uuid.UUID, end_day: date
+) -> Optional[ValueSeries]:
+    """
+    Value a portfolio at the close of every business day from the one before its
+    first trade or cash action up to `end_day`. Returns None without any
+    activity by then.
+    """
+    until = datetime.combine(end_day, time.max)
+    trades = pd.DataFrame.from_records(
+        [
+            (
+                row.execution_timestamp,
+                row.ticker,
+                row.price,
+                row.quantity if row.action == ActionType.BUY else -row.quantity,
+            )
+            for row in trade_crud.stream_trades(session, portfolio_id, until=until)
+        ],
+        columns=["timestamp", "ticker", "price", "quantity"],
+    )
+    cash_actions = pd.DataFrame.from_records(
+        cash_action_crud.get_cash_flows(session, portfolio_id, until),
+        columns=["timestamp", "amount"],
+    )
+    if trades.empty and cash_actions.empty:
+        return None
+
+    trades["day"] = pd.to_datetime(trades["timestamp"]).dt.normalize()
+    trades["price"] = trades["price"].astype(float)
+    # Signed, sells negative
+    trades["quantity"] = trades["quantity"].astype(float)
+    cash_actions["day"] = pd.to_datetime(cash_actions["timestamp"]).dt.normalize()
+    cash_actions["amount"] = cash_actions["amount"].astype(float)
+
+    first_day = pd.concat([trades["day"], cash_actions["day"]]).min()
+    if first_day.date() > end_day:
+        return None
+    # From the business day before any activity, when the value was still 0
+    days = pd.bdate_range(first_day - pd.offsets.BDay(1), end_day)
+
+    def on_days(cumulative: pd.DataFrame) -> pd.DataFrame:
+        # The last state on or before each business day
+        return cumulative.sort_index().reindex(days, method="ffill").fillna(0.0)
+
+    holdings_value = np.zeros(len(days))
+    complete = True
+    if not trades.empty:
+        holdings = on_days(
+            trades.pivot_table(
+                index="day", columns="ticker", values="quantity", aggfunc="sum"
+            )
+            .fillna(0.0)
+            .cumsum()
+        )
+        closes, complete = _closes(session, trades, first_day.date(), end_day)
+        prices = on_days(closes)
+        holdings_value = (holdings * prices[holdings.columns]).sum(axis=1).to_numpy()
+
+    # Trade cash flows and cash actions, by calendar day
+    cash_by_day = (
+        pd.concat(
+            [
+                (-trades["quantity"] * trades["price"]).groupby(trades["day"]).sum(),
+                cash_actions.groupby("day")["amount"].sum(),
+            ]
+        )
+        .groupby(level=0)
+        .sum()
+    )
+    cash = on_days(cash_by_day.cumsum().to_frame("cash"))["cash"].to_numpy()
+    flows = np.zeros(len(days))
+    deposit_days = days.searchsorted(cash_actions["day"])
+    in_range = deposit_days < len(days)
+    np.add.at(
+        flows, deposit_days[in_range], cash_actions["amount"].to_numpy()[in_range]
+    )
+
+    # Cover shortfalls with deposits, as early as they show up
+    implied_deposits = np.maximum.accumulate(np.maximum(-cash, 0.0))
+    cash = cash + implied_deposits
+    flows += np.diff(implied_deposits, prepend=0.0)
+
+    return ValueSeries(
+        dates=days.to_numpy().astype("datetime64[D]"),
+        values=cash + holdings_value,
+        flows=flows,
+        complete=complete,
+    )
+
+
+def _closes(
+    session: Session, trades: pd.DataFrame, first_day: date, end_day: date
+) -> Tuple[pd.DataFrame, bool]:
+    """
+    Closes per day and ticker of the traded tickers, backed by the last trade
+    price of the day where no close is stored, and whether the price history of
+    every ticker could be brought up to date.
+    """
+    tickers = sorted(trades["ticker"].unique())
+    start_date = first_day - timedelta(days=price_service.CLOSE_LOOKBACK_DAYS)
+    complete = True
+    for ticker in tickers:
+        try:
+            price_service.sync_price_history(session, ticker, start_date)
+        except Exception as e:
+            logger.warning(f"Price history of {ticker} is unavailable: {e}")
+            complete = False
+    closes = pd.DataFrame.from_records(
+        price_crud.get_closes(session, tickers, start_date, end_day),
+        columns=["ticker", "day", "close"],
+    )
+    closes["day"] = pd.to_datetime(closes["day"])
+    closes["close"] = closes["close"].astype(float)
+    trade_prices = trades.groupby(["day", "ticker"])["price"].last().unstack()
+    return (
+        closes.pivot_table(index="day", columns="ticker", values="close")
+        .reindex(columns=tickers)
+        .combine_first(trade_prices),
+        complete,
+    )
+
+
+def build_benchmark_returns(
+    session: Session, ticker: str, start_day: date, end_day: date
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily returns of an index on the business days from `start_day` to
+    `end_day`, and those days, up to its last stored close. A day without a
+    close of its own keeps the previous close, so its return is 0.
+    """
+    lookback_start = start_day - timedelta(days=price_service.CLOSE_LOOKBACK_DAYS)
+    try:
+        price_service.sync_price_history(session, ticker, lookback_start)
+    except Exception as e:
+        logger.warning(f"Price history of {ticker} is unavailable: {e}")
+    closes = price_crud.get_closes(session, [ticker], lookback_start, end_day)
+    if not closes:
+        return np.array([], dtype="datetime64[D]"), np.array([])
+
+    # Not past the last close: those days' returns are unknown, not 0
+    last_day = min(end_day, closes[-1][1])
+    days = pd.bdate_range(start_day - pd.offsets.BDay(1), last_day)
+    on_days = (
+        pd.Series(
+            [float(close) for _, _, close in closes],
+            index=pd.to_datetime([day for _, day, _ in closes]),
+        )
+        .reindex(days, method="ffill")
+        .to_numpy()
+    )
+    # Days before the first close have no return
+    valid = ~np.isnan(on_days[:-1])
+    returns = on_days[1:][valid] / on_days[:-1][valid] - 1
+    return days[1:].to_numpy().astype("datetime64[D]")[valid], returns
+
+
+def get_benchmark_returns(
+    session: Session, start_day: date, end_day: date
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily returns of the benchmark index up to `end_day`, from the cache when
+    it covers `start_day`. Otherwise they are rebuilt from `start_day`, so the
+    cached series grows to the earliest day any portfolio asks for. Returns
+    that stop short of the last business day, because the index's prices
+    could not be brought up to date, are not cached.
+    """
+    key = f"{settings.BENCHMARK_TICKER}:{end_day.isoformat()}"
+    cached = benchmark_returns.get(key)
+    if cached is not None and cached[0] <= start_day:
+        return cached[1]
+    if cached is not None:
+        start_day = min(start_day, cached[0])
+    returns = build_benchmark_returns(
+        session, settings.BENCHMARK_TICKER, start_day, end_day
+    )
+    dates = returns[0]
+    last_business_day = np.busday_offset(
+        np.datetime64(end_day, "D"), 0, roll="backward"
+    )
+    if len(dates) and dates[-1] == last_business_day:
+        benchmark_returns.set(key, (start_day, returns))
+    return returns
+
+
+def get_value_series(session: Session, portfolio: Portfolio) -> Optional[ValueSeries]:
+    """
+    The value series of a portfolio up to the last completed day, from the cache
+    while its trades and cash actions are unchanged. A series valued without
+    some of its prices, because they could not be downloaded, is not cached, so
+    the next request tries again.
+    """
+    end_day = datetime.utcnow().date() - timedelta(days=1)
+    key = f"{portfolio.id}:{portfolio.version}:{end_day.isoformat()}"
+    series = value_series.get(key)
+    if series is None:
+        series = build_value_series(session, portfolio.id, end_day)
+        if series is not None and series.complete:
+            value_series.set(key, series)
+    return series
+
+
+def daily_returns(series: ValueSeries) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Time-weighted daily returns of a value series and their days. Deposits count
+    from the start of the day they are made; days that start without a positive
+    value have no return.
+    """
+    start_values = series.values[:-1] + series.flows[1:]
+    valid = start_values > 0
+    returns = series.values[1:][valid] / start_values[valid] - 1
+    return series.dates[1:][valid], returns
+
+
+def compute_performance(
+    dates: np.ndarray, returns: np.ndarray, risk_free_rate: float = 0.0
+) -> PerformanceMetrics:
+    """Annualized return and risk metrics of daily returns on the given days."""
+    if not len(returns):
+        return PerformanceMetrics(
+            start_date=None,
+            end_date=None,
+            trading_days=0,
+            total_return=None,
+            annualized_return=None,
+            volatility=None,
+            sharpe_ratio=None,
+            sortino_ratio=None,
+            max_drawdown=None,
+        )
+
+    wealth = np.cumprod(1 + returns)
+    peaks = np.maximum.accumulate(np.concatenate(([1.0], wealth)))[1:]
+    # Losing more than everything, which short positions allow, can't be
+    # annualized
+    annualized_return = None
+    if wealth[-1] > 0:
+        annualized_return = _finite(
+            wealth[-1] ** (TRADING_DAYS_PER_YEAR / len(returns)) - 1
+        )
+
+    volatility = sharpe_ratio = sortino_ratio = None
+    if len(returns) > 1:
+        daily_risk_free = (1 + risk_free_rate) ** (1 / TRADING_DAYS_PER_YEAR) - 1
+        excess = returns - daily_risk_free
+        deviation = returns.std(ddof=1)
+        downside_deviation = math.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+        scale = math.sqrt(TRADING_DAYS_PER_YEAR)
+        volatility = _finite(deviation * scale)
+        if deviation > 0:
+            sharpe_ratio = _finite(excess.mean() / deviation * scale)
+        if downside_deviation > 0:
+            sortino_ratio = _finite(excess.mean() / downside_deviation * scale)
+
+    return PerformanceMetrics(
+        start_date=dates[0].astype(date),
+        end_date=dates[-1].astype(date),
+        trading_days=len(returns),
+        total_return=_finite(wealth[-1] - 1),
+        annualized_return=annualized_return,
+        volatility=volatility,
+        sharpe_ratio=sharpe_ratio,
+        sortino_ratio=sortino_ratio,
+        max_drawdown=_finite((wealth / peaks - 1).min()),
+    )
+
+
+def _finite(value) -> Optional[float]:
+    """A metric as a float, or None where it is undefined or overflows."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def compute_benchmark_metrics(
+    returns: np.ndarray, index_returns: np.ndarray, risk_free_rate: float = 0.0
+) -> BenchmarkMetrics:
+    """
+    Metrics of daily returns against those of the benchmark index on the same
+    days. Alpha and beta come from a least squares fit of the excess returns
+    over the risk-free rate on the index's.
+    """
+    alpha = beta = correlation = tracking_error = information_ratio = None
+    if len(returns) > 1 and index_returns.std() > 0:
+        daily_risk_free = (1 + risk_free_rate) ** (1 / TRADING_DAYS_PER_YEAR) - 1
+        design = np.column_stack(
+            (np.ones(len(returns)), index_returns - daily_risk_free)
+        )
+        (daily_alpha, beta), *_ = np.linalg.lstsq(
+            design, returns - daily_risk_free, rcond=None
+        )
+        alpha = float(daily_alpha * TRADING_DAYS_PER_YEAR)
+        beta = float(beta)
+        if returns.std() > 0:
+            correlation = float(np.corrcoef(returns, index_returns)[0, 1])
+
+        active = returns - index_returns
+        deviation = active.std(ddof=1)
+        tracking_error = float(deviation * math.sqrt(TRADING_DAYS_PER_YEAR))
+        if deviation > 0:
+            information_ratio = float(
+                active.mean() / deviation * math.sqrt(TRADING_DAYS_PER_YEAR)
+            )
+
+    return BenchmarkMetrics(
+        ticker=settings.BENCHMARK_TICKER,
+        alpha=alpha,
+        beta=beta,
+        correlation=correlation,
+        tracking_error=tracking_error,
+        information_ratio=information_ratio,
+    )
+
+
+def get_performance(
+    session: Session, portfolio: Portfolio, start_date: datetime
+) -> PerformanceMetrics:
+    """
+    Return and risk metrics of a portfolio from its daily returns after the day
+    of a time, including those against the benchmark index.
+    """
+    series = get_value_series(session, portfolio)
+    if series is None:
+        return compute_performance(np.array([], dtype="datetime64[D]"), np.array([]))
+    dates, returns = daily_returns(series)
+    in_period = dates > np.datetime64(start_date.date(), "D")
+    dates, returns = dates[in_period], returns[in_period]
+    performance = compute_performance(dates, returns, settings.RISK_FREE_RATE)
+    if not len(returns):
+        return performance
+
+    index_dates, index_returns = get_benchmark_returns(
+        session, dates[0].astype(date), series.dates[-1].astype(date)
+    )
+    if len(index_returns):
+        # Both are on business days, so the index has a return on every day
+        # after its first close
+        positions = np.searchsorted(index_dates, dates)
+        on_index = positions < len(index_dates)
+        on_index[on_index] = index_dates[positions[on_index]] == dates[on_index]
+        performance.benchmark = compute_benchmark_metrics(
+            returns[on_index],
+            index_returns[positions[on_index]],
+            settings.RISK_FREE_RATE,
+        )
+    return performance
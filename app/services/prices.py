@@ -0,0 +1,110 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.log_config import logging_settings
+from app.crud import prices as price_crud
+from app.models.prices import DailyPrice
+from app.utils import market_data
+from app.utils.quote_cache import QuoteCache
+
+logger = logging.getLogger(logging_settings.LOGGER_NAME)
+
+# How far back to look for the close of a day the market was closed
+CLOSE_LOOKBACK_DAYS = 7
+
+# Day each ticker was last brought up to date by this process and the earliest
+# start date covered, so repeated reads on days without new bars (weekends,
+# holidays, dates before listing) don't go upstream again
+_synced: Dict[str, Tuple[date, date]] = {}
+
+# Closes of completed days, keyed by "TICKER:YYYY-MM-DD". They don't change once
+# stored, the TTL only bounds how long a corrected bar could go unnoticed.
+historical_closes = QuoteCache(
+    ttl_seconds=60 * 60 * 24, max_size=settings.HISTORICAL_CLOSE_CACHE_MAX_SIZE
+)
+
+
+def sync_price_history(session: Session, ticker: str, start_date: date) -> None:
+    """
+    Make sure the price store holds every completed daily bar of a ticker from
+    start_date up to yesterday, downloading only the days that are missing.
+    """
+    today = datetime.utcnow().date()
+    last_complete_day = today - timedelta(days=1)
+    synced_on, synced_from = _synced.get(ticker, (None, None))
+    if synced_on == today and synced_from <= start_date:
+        return
+
+    first_stored, last_stored = price_crud.get_price_date_range(session, ticker)
+    ranges = []
+    if first_stored is None:
+        ranges.append((start_date, last_complete_day))
+    else:
+        if start_date < first_stored:
+            ranges.append((start_date, first_stored - timedelta(days=1)))
+        if last_stored < last_complete_day:
+            ranges.append((last_stored + timedelta(days=1), last_complete_day))
+
+    new_bars = []
+    for range_start, range_end in ranges:
+        if range_start > range_end:
+            continue
+        new_bars.extend(
+            bar
+            for bar in market_data.fetch_daily_bars(ticker, range_start, range_end)
+            # Today's bar is still moving, only completed sessions are stored
+            if range_start <= bar["date"] <= range_end
+        )
+    if new_bars:
+        try:
+            price_crud.create_daily_prices(session, new_bars)
+        except Exception:
+            # Leave the session usable for callers that carry on without them
+            session.rollback()
+            raise
+    if synced_on == today:
+        start_date = min(start_date, synced_from)
+    _synced[ticker] = (today, start_date)
+
+
+def get_price_history(
+    session: Session, ticker: str, start_date: date, end_date: Optional[date] = None
+) -> List[DailyPrice]:
+    """
+    Get the daily bars of a ticker between two dates from the local price store,
+    backfilling it from the market data provider first when days are missing.
+    """
+    end_date = end_date or datetime.utcnow().date()
+    sync_price_history(session, ticker, start_date)
+    return price_crud.get_daily_prices(session, ticker, start_date, end_date)
+
+
+def get_closes_on(
+    session: Session, tickers: Iterable[str], day: date
+) -> Dict[str, float]:
+    """
+    Get the close of each ticker on a past day, or on the last trading day
+    before it, from the in-process cache or the local price store. Tickers
+    without price history are left out.
+    """
+    keys = {ticker: f"{ticker}:{day.isoformat()}" for ticker in tickers}
+    cached = historical_closes.get_many(keys.values())
+    closes = {ticker: cached[key] for ticker, key in keys.items() if key in cached}
+
+    missing = [ticker for ticker in keys if ticker not in closes]
+    if missing:
+        start_date = day - timedelta(days=CLOSE_LOOKBACK_DAYS)
+        for ticker in missing:
+            try:
+                sync_price_history(session, ticker, start_date)
+            except Exception as e:
+                logger.warning(f"Price history of {ticker} is unavailable: {e}")
+        stored = price_crud.get_last_closes(session, missing, start_date, day)
+        for ticker, close in stored.items():
+            closes[ticker] = float(close)
+            historical_closes.set(keys[ticker], closes[ticker])
+    return closes
@@ -0,0 +1,20 @@
+from sqlalchemy.orm import Session
+
+from app.core.db import engine
+from app.crud import lots as lot_crud
+from app.utils import market_data
+
+
+def refresh_held_quotes(session: Session) -> int:
+    """
+    Refresh the cached quote of every ticker currently held in any portfolio.
+    Returns the number of tickers refreshed.
+    """
+    tickers = lot_crud.get_held_tickers(session)
+    return len(market_data.refresh_quotes(tickers))
+
+
+def run_quote_refresh() -> None:
+    """Scheduler job: refresh held quotes using a session of its own."""
+    with Session(engine) as session:
+        refresh_held_quotes(session)
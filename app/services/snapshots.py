@@ -0,0 +1,328 @@
+import bisect
+import logging
+import uuid
+from collections import deque
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.log_config import logging_settings
+from app.crud import lots as lot_crud
+from app.crud import portfolios as portfolio_crud
+from app.crud import snapshots as snapshot_crud
+from app.crud import trades as trade_crud
+from app.models.lots import OpenLot
+from app.models.portfolios import Portfolio
+from app.services import leases as lease_service
+from app.services import prices as price_service
+
+logger = logging.getLogger(logging_settings.LOGGER_NAME)
+
+# Trades read at once while writing snapshots
+SNAPSHOT_TRADES_PER_READ = 1000
+
+
+class HeldPosition(NamedTuple):
+    """The open lots of a ticker, summed up."""
+
+    ticker: str
+    quantity: Decimal
+    cost_basis: Decimal
+    entry_date: datetime
+
+
+def _apply_trade(lots: Dict[str, Deque[OpenLot]], trade) -> None:
+    ticker_lots = lots.setdefault(trade.ticker, deque())
+    for lot in lot_crud.match_trade(ticker_lots, trade):
+        if lot.quantity == 0:
+            ticker_lots.remove(lot)
+        else:
+            ticker_lots.append(lot)
+
+
+def _held_positions(lots: Dict[str, Deque[OpenLot]]) -> List[HeldPosition]:
+    return [
+        HeldPosition(
+            ticker=ticker,
+            quantity=sum(lot.quantity for lot in ticker_lots),
+            cost_basis=sum(lot.price * lot.quantity for lot in ticker_lots),
+            entry_date=ticker_lots[0].opened_at,
+        )
+        for ticker, ticker_lots in sorted(lots.items())
+        if ticker_lots
+    ]
+
+
+class _LotState(NamedTuple):
+    """An open lot as it stood at the end of a day."""
+
+    ticker: str
+    trade_id: str
+    opened_at: datetime
+    price: Decimal
+    quantity: Decimal
+
+
+def _lot_states(lots: Dict[str, Deque[OpenLot]]) -> List[_LotState]:
+    return [
+        _LotState(lot.ticker, lot.trade_id, lot.opened_at, lot.price, lot.quantity)
+        for ticker in sorted(lots)
+        for lot in lots[ticker]
+    ]
+
+
+def _lots_on(
+    session: Session, portfolio_id: uuid.UUID, snapshot_date: date
+) -> Dict[str, Deque[OpenLot]]:
+    """The open lots of a portfolio at the end of a snapshot day, oldest first."""
+    lots: Dict[str, Deque[OpenLot]] = {}
+    for snapshot in snapshot_crud.get_snapshots(session, portfolio_id, snapshot_date):
+        lots.setdefault(snapshot.ticker, deque()).append(
+            OpenLot(
+                portfolio_id=snapshot.portfolio_id,
+                ticker=snapshot.ticker,
+                trade_id=snapshot.trade_id,
+                opened_at=snapshot.opened_at,
+                price=snapshot.price,
+                quantity=snapshot.quantity,
+            )
+        )
+    return lots
+
+
+def _base_lots(
+    session: Session, portfolio_id: uuid.UUID, on_or_before: Optional[date]
+) -> Tuple[Dict[str, Deque[OpenLot]], Optional[datetime]]:
+    """
+    The open lots of the last snapshot of a portfolio on or before a day, and
+    the end of that snapshot's day, after which the trades are to be replayed.
+    Without a snapshot, every trade is.
+    """
+    if on_or_before is not None:
+        snapshot_date = snapshot_crud.get_last_snapshot_date(
+            session, portfolio_id, on_or_before
+        )
+        if snapshot_date is not None:
+            return (
+                _lots_on(session, portfolio_id, snapshot_date),
+                datetime.combine(snapshot_date, time.max),
+            )
+    return {}, None
+
+
+def _close_lookup(
+    session: Session, ticker: str, start_date: date, end_date: date
+) -> Callable[[date], Optional[Decimal]]:
+    """Last close of a ticker on or before a day, from its stored price history."""
+    bars = price_service.get_price_history(
+        session,
+        ticker,
+        start_date - timedelta(days=price_service.CLOSE_LOOKBACK_DAYS),
+        end_date,
+    )
+    dates = [bar.date for bar in bars]
+    closes = [bar.close for bar in bars]
+
+    def close_on(day: date) -> Optional[Decimal]:
+        index = bisect.bisect_right(dates, day)
+        return closes[index - 1] if index else None
+
+    return close_on
+
+
+def _snapshots_data(
+    session: Session,
+    portfolio_id: uuid.UUID,
+    since: Optional[date],
+    trade_days: List[Tuple[date, int]],
+    close_on: Dict[str, Callable[[date], Optional[Decimal]]],
+) -> Iterator[dict]:
+    """
+    Replay the trades of the given days, with how many trades each has, and
+    yield the open lots at the end of those after `since`. The trades are read
+    about SNAPSHOT_TRADES_PER_READ at a time, each read done before its
+    snapshots are yielded so they can be written in between.
+    """
+    lots, after = _base_lots(session, portfolio_id, since)
+    next_day = 0
+    while next_day < len(trade_days):
+        window, count = [], 0
+        while next_day < len(trade_days) and count < SNAPSHOT_TRADES_PER_READ:
+            day, day_count = trade_days[next_day]
+            window.append(day)
+            count += day_count
+            next_day += 1
+        trades = list(
+            trade_crud.stream_trades(
+                session,
+                portfolio_id,
+                after=after,
+                until=datetime.combine(window[-1], time.max),
+            )
+        )
+        after = datetime.combine(window[-1], time.max)
+        index = 0
+        for day in window:
+            while (
+                index < len(trades) and trades[index].execution_timestamp.date() == day
+            ):
+                _apply_trade(lots, trades[index])
+                index += 1
+            if since is not None and day <= since:
+                continue
+            for lot in _lot_states(lots):
+                yield {
+                    "portfolio_id": portfolio_id,
+                    "date": day,
+                    "ticker": lot.ticker,
+                    "trade_id": lot.trade_id,
+                    "opened_at": lot.opened_at,
+                    "price": lot.price,
+                    "quantity": lot.quantity,
+                    "close_price": close_on[lot.ticker](day),
+                }
+
+
+def fill_snapshots(session: Session, portfolio: Portfolio, through: date) -> int:
+    """
+    Snapshot the open lots of a portfolio at the end of every day after its
+    last snapshot, up to and including `through`, on which trades changed
+    them, with each ticker's close that day. The lots of the days in between
+    are those of the last snapshot before them. Returns the number of
+    snapshots stored, none if a trade changed in the meantime.
+
+    The lots are carried over from the last snapshot and the trades after it
+    are matched against them twice: once streaming, to learn which days and
+    tickers to snapshot, and once the portfolio is claimed, a window of trades
+    at a time, to write the snapshots in batches.
+    """
+    # What the trades are read against, checked again before storing
+    seen_version, seen_through = portfolio.version, portfolio.snapshots_through
+    if seen_through is not None and seen_through >= through:
+        return 0
+
+    lots, after = _base_lots(session, portfolio.id, seen_through)
+    # Days with trades and how many, and the first snapshot day of each ticker
+    trade_days: List[Tuple[date, int]] = []
+    first_days: Dict[str, date] = {}
+
+    def held(day: date) -> None:
+        if seen_through is None or day > seen_through:
+            for ticker, ticker_lots in lots.items():
+                if ticker_lots:
+                    first_days.setdefault(ticker, day)
+
+    trades = trade_crud.stream_trades(
+        session, portfolio.id, after=after, until=datetime.combine(through, time.max)
+    )
+    for trade in trades:
+        trade_day = trade.execution_timestamp.date()
+        if trade_days and trade_days[-1][0] == trade_day:
+            trade_days[-1] = (trade_day, trade_days[-1][1] + 1)
+        else:
+            if trade_days:
+                held(trade_days[-1][0])
+            trade_days.append((trade_day, 1))
+        _apply_trade(lots, trade)
+    if trade_days:
+        held(trade_days[-1][0])
+
+    close_on = {
+        ticker: _close_lookup(session, ticker, first_day, through)
+        for ticker, first_day in first_days.items()
+    }
+    stored = snapshot_crud.create_snapshots(
+        session,
+        portfolio,
+        _snapshots_data(session, portfolio.id, seen_through, trade_days, close_on),
+        through,
+        seen_version,
+        seen_through,
+    )
+    if stored is None:
+        logger.info(
+            f"Portfolio {portfolio.id} changed during its snapshot fill, "
+            "leaving it to the next run"
+        )
+        return 0
+    return stored
+
+
+def fill_all_snapshots(session: Session, through: Optional[date] = None) -> int:
+    """
+    Bring the snapshots of every portfolio up to `through`, yesterday by
+    default. A portfolio that fails is logged and retried on the next run.
+    Returns the number of snapshots stored.
+    """
+    through = through or datetime.utcnow().date() - timedelta(days=1)
+    stored = 0
+    for portfolio in snapshot_crud.get_portfolios_to_snapshot(session, through):
+        try:
+            stored += fill_snapshots(session, portfolio, through)
+        except Exception as e:
+            session.rollback()
+            logger.exception(f"Snapshots of portfolio {portfolio.id} failed: {e}")
+    return stored
+
+
+def run_snapshot_fill() -> None:
+    """
+    Scheduler job: fill position snapshots using a session of its own. Of all
+    the workers running it, only the one holding its lease does the work.
+    """
+    with Session(engine) as session:
+        if lease_service.acquire(
+            session, "snapshot_fill", settings.SNAPSHOT_INTERVAL_SECONDS
+        ):
+            fill_all_snapshots(session)
+
+
+def get_positions_as_of(
+    session: Session, portfolio_id: uuid.UUID, as_of: Union[date, datetime]
+) -> List[HeldPosition]:
+    """
+    Rebuild the open positions of a portfolio at a point in time, or at the end
+    of a day when given a date, from the open lots of the last snapshot before
+    it and the trades since, matched first-in first-out. Snapshots are taken on
+    the days trades change the lots, so only the trades of the day itself are
+    usually replayed. The result is the same as replaying every trade, however
+    far the snapshots have been filled.
+    """
+    if isinstance(as_of, datetime):
+        if as_of.tzinfo is not None:
+            as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+        until = as_of
+        last_complete_day = as_of.date() - timedelta(days=1)
+    else:
+        until = datetime.combine(as_of, time.max)
+        last_complete_day = as_of
+    portfolio = portfolio_crud.get_portfolio_by_id(session, portfolio_id)
+
+    lots: Dict[str, Deque[OpenLot]] = {}
+    after = None
+    if portfolio is not None and portfolio.snapshots_through is not None:
+        lots, after = _base_lots(
+            session,
+            portfolio_id,
+            min(portfolio.snapshots_through, last_complete_day),
+        )
+
+    for trade in trade_crud.stream_trades(
+        session, portfolio_id, after=after, until=until
+    ):
+        _apply_trade(lots, trade)
+    return _held_positions(lots)
@@ -0,0 +1,299 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.log_config import logging_settings
+from app.crud import lots as lot_crud
+from app.crud import statistics as statistics_crud
+from app.crud import trades as trade_crud
+from app.models.portfolios import Portfolio
+from app.schemas.metrics import TradeMetrics
+from app.services import leases as lease_service
+
+logger = logging.getLogger(logging_settings.LOGGER_NAME)
+
+
+class _TradeTotals:
+    """
+    Totals of a run of consecutive trades. Each trade adds the days since the
+    trade before it to gap_days; first_gap_days is the part added by the first
+    trade of the run, whose previous trade lies outside of it.
+    """
+
+    __slots__ = ("count", "volume", "gap_days", "first_gap_days")
+
+    def __init__(self, count=0, volume=0, gap_days=0, first_gap_days=0):
+        self.count = count
+        self.volume = volume
+        self.gap_days = gap_days
+        self.first_gap_days = first_gap_days
+
+    def add(self, quantity, gap_days: int) -> None:
+        if not self.count:
+            self.first_gap_days = gap_days
+        self.count += 1
+        self.volume += quantity
+        self.gap_days += gap_days
+
+    def followed_by(self, later: "_TradeTotals") -> "_TradeTotals":
+        """Totals of this run of trades followed by a later one."""
+        return _TradeTotals(
+            self.count + later.count,
+            self.volume + later.volume,
+            self.gap_days + later.gap_days,
+            self.first_gap_days if self.count else later.first_gap_days,
+        )
+
+
+class _LotTotals:
+    """Totals of realized lots."""
+
+    __slots__ = ("count", "holding_period_days", "wins", "losses")
+
+    def __init__(self, count=0, holding_period_days=0, wins=0, losses=0):
+        self.count = count
+        self.holding_period_days = holding_period_days
+        self.wins = wins
+        self.losses = losses
+
+    def add(self, lot) -> None:
+        self.count += 1
+        self.holding_period_days += (lot.closed_at - lot.opened_at).days
+        if lot.realized_pl > 0:
+            self.wins += 1
+        elif lot.realized_pl < 0:
+            self.losses += 1
+
+    def __add__(self, other: "_LotTotals") -> "_LotTotals":
+        return _LotTotals(
+            self.count + other.count,
+            self.holding_period_days + other.holding_period_days,
+            self.wins + other.wins,
+            self.losses + other.losses,
+        )
+
+
+def _daily_totals(
+    trades: Iterable,
+    realized_lots: Iterable,
+    previous_timestamp: Optional[datetime] = None,
+) -> Dict[date, Tuple[_TradeTotals, _LotTotals]]:
+    """
+    Total trades given in execution order per day of execution, and realized
+    lots per day of closing. `previous_timestamp` is the time of the trade
+    before the first one, if any.
+    """
+    days: Dict[date, Tuple[_TradeTotals, _LotTotals]] = {}
+
+    def totals_on(day: date) -> Tuple[_TradeTotals, _LotTotals]:
+        if day not in days:
+            days[day] = (_TradeTotals(), _LotTotals())
+        return days[day]
+
+    for trade in trades:
+        timestamp = trade.execution_timestamp
+        gap_days = 0
+        if previous_timestamp is not None:
+            gap_days = (timestamp - previous_timestamp).days
+        previous_timestamp = timestamp
+        totals_on(timestamp.date())[0].add(trade.quantity, gap_days)
+    for lot in realized_lots:
+        totals_on(lot.closed_at.date())[1].add(lot)
+    return days
+
+
+def _scan_days(
+    session: Session, portfolio: Portfolio, start: datetime, end: datetime
+) -> Dict[date, Tuple[_TradeTotals, _LotTotals]]:
+    """Total the trades and realized lots of a portfolio per day in a time range."""
+    return _daily_totals(
+        trade_crud.get_trades_within_period(session, portfolio.id, start, end),
+        lot_crud.get_realized_lots_within_period(session, portfolio.id, start, end),
+        trade_crud.get_last_trade_timestamp(session, portfolio.id, start),
+    )
+
+
+def fill_daily_statistics(session: Session, portfolio: Portfolio, through: date) -> int:
+    """
+    Roll the trades of a portfolio and the lots they closed up into daily
+    statistics, from the day after the last one covered up to `through`.
+    Returns the number of days stored, none if a trade changed in the meantime.
+    """
+    # What the trades are read against, checked again before storing
+    seen_version, seen_through = portfolio.version, portfolio.statistics_through
+    if portfolio.statistics_through is None:
+        start = datetime.min
+    else:
+        start = datetime.combine(
+            portfolio.statistics_through + timedelta(days=1), time.min
+        )
+    days = _scan_days(session, portfolio, start, datetime.combine(through, time.max))
+    statistics_data = [
+        {
+            "portfolio_id": portfolio.id,
+            "date": day,
+            "trade_count": trades.count,
+            "volume": trades.volume,
+            "gap_days": trades.gap_days,
+            "first_gap_days": trades.first_gap_days,
+            "closed_lots": lots.count,
+            "holding_period_days": lots.holding_period_days,
+            "wins": lots.wins,
+            "losses": lots.losses,
+        }
+        for day, (trades, lots) in sorted(days.items())
+    ]
+    if not statistics_crud.create_daily_statistics(
+        session, portfolio, statistics_data, through, seen_version, seen_through
+    ):
+        logger.info(
+            f"Portfolio {portfolio.id} changed during its statistics rollup, "
+            "leaving it to the next run"
+        )
+        return 0
+    return len(statistics_data)
+
+
+def fill_all_daily_statistics(session: Session, through: Optional[date] = None) -> int:
+    """
+    Bring the daily trade statistics of every portfolio up to `through`,
+    yesterday by default. A portfolio that fails is logged and retried on the
+    next run. Returns the number of days stored.
+    """
+    through = through or datetime.utcnow().date() - timedelta(days=1)
+    stored = 0
+    for portfolio in statistics_crud.get_portfolios_to_roll_up(session, through):
+        try:
+            stored += fill_daily_statistics(session, portfolio, through)
+        except Exception as e:
+            session.rollback()
+            logger.exception(
+                f"Daily statistics of portfolio {portfolio.id} failed: {e}"
+            )
+    return stored
+
+
+def run_statistics_rollup() -> None:
+    """
+    Scheduler job: fill daily trade statistics using a session of its own. Of
+    all the workers running it, only the one holding its lease does the work.
+    """
+    with Session(engine) as session:
+        if lease_service.acquire(
+            session, "statistics_rollup", settings.STATISTICS_ROLLUP_INTERVAL_SECONDS
+        ):
+            fill_all_daily_statistics(session)
+
+
+def get_trade_metrics(
+    session: Session,
+    portfolio: Portfolio,
+    start_dates: Mapping[Hashable, datetime],
+    end_date: datetime,
+) -> Dict[Hashable, TradeMetrics]:
+    """
+    Compute TradeMetrics of a portfolio for windows that all end at `end_date`,
+    keyed like `start_dates`. A window counts the trades executed in it and the
+    realized lots closed in it.
+
+    The whole days of the windows are read from the daily statistics as far as
+    they are rolled up, and totalled from the trades and realized lots after
+    that in a single scan. The windows are nested, so each adds its whole days
+    to those of the next shorter one. Only the partial first day of a window is
+    totalled from its own trades and realized lots.
+    """
+    first_day = min(start_dates.values()).date() + timedelta(days=1)
+    last_day = end_date.date()
+    days: List[Tuple[date, _TradeTotals, _LotTotals]] = []
+    scan_from = first_day
+    if portfolio.statistics_through is not None:
+        # The end day is only partly in the windows
+        through = min(portfolio.statistics_through, last_day - timedelta(days=1))
+        days = [
+            (
+                row.date,
+                _TradeTotals(
+                    row.trade_count, row.volume, row.gap_days, row.first_gap_days
+                ),
+                _LotTotals(
+                    row.closed_lots, row.holding_period_days, row.wins, row.losses
+                ),
+            )
+            for row in statistics_crud.get_daily_statistics(
+                session, portfolio.id, first_day, through
+            )
+        ]
+        scan_from = max(first_day, through + timedelta(days=1))
+    if scan_from <= last_day:
+        scanned = _scan_days(
+            session, portfolio, datetime.combine(scan_from, time.min), end_date
+        )
+        days.extend((day, *totals) for day, totals in sorted(scanned.items()))
+
+    metrics = {}
+    trades_after, lots_after = _TradeTotals(), _LotTotals()
+    index = len(days)
+    for key, start_date in sorted(
+        start_dates.items(), key=lambda item: item[1], reverse=True
+    ):
+        start_day = start_date.date()
+        while index and days[index - 1][0] > start_day:
+            index -= 1
+            _, trades, lots = days[index]
+            trades_after = trades.followed_by(trades_after)
+            lots_after = lots + lots_after
+        first_day_end = min(datetime.combine(start_day, time.max), end_date)
+        trades, lots = _daily_totals(
+            trade_crud.get_trades_within_period(
+                session, portfolio.id, start_date, first_day_end
+            ),
+            lot_crud.get_realized_lots_within_period(
+                session, portfolio.id, start_date, first_day_end
+            ),
+        ).get(start_day, (_TradeTotals(), _LotTotals()))
+        metrics[key] = _build_metrics(
+            trades.followed_by(trades_after), lots + lots_after, start_date, end_date
+        )
+    return {key: metrics[key] for key in start_dates}
+
+
+def _build_metrics(
+    trades: _TradeTotals,
+    lots: _LotTotals,
+    start_date: datetime,
+    end_date: datetime,
+) -> TradeMetrics:
+    if not trades.count:
+        return TradeMetrics(
+            average_trade_volume=0,
+            trade_frequency_days_per_trade=None,
+            trade_frequency_trades_per_day=0,
+            average_holding_period_days=None,
+            win_loss_ratio=None,
+        )
+
+    total_days = (end_date - start_date).days or 1  # Avoid division by zero
+    if lots.losses == 0:
+        win_loss_ratio = None if lots.wins > 0 else 0
+    else:
+        win_loss_ratio = lots.wins / lots.losses
+
+    return TradeMetrics(
+        average_trade_volume=float(trades.volume) / trades.count,
+        # Average days between consecutive trades, undefined for a single trade;
+        # the first trade's gap is to a trade outside the window
+        trade_frequency_days_per_trade=(
+            (trades.gap_days - trades.first_gap_days) / (trades.count - 1)
+            if trades.count > 1
+            else None
+        ),
+        trade_frequency_trades_per_day=trades.count / total_days,
+        average_holding_period_days=(
+            lots.holding_period_days / lots.count if lots.count else None
+        ),
+        win_loss_ratio=win_loss_ratio,
+    )
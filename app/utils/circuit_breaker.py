@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream service whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream service for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and every
+    call is refused for `cooldown_seconds`. Once the cooldown is over a single
+    trial call is let through: success closes the circuit again, failure opens
+    it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            cooled_down = time.monotonic() - self._opened_at >= self.cooldown_seconds
+            if cooled_down and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def reset(self) -> None:
+        self.record_success()
@@ -0,0 +1,151 @@
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, FrozenSet, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from dateutil.easter import easter
+from dateutil.relativedelta import relativedelta, MO, TH
+
+# Closing prices keep settling for a few minutes after the bell (closing
+# auctions, late prints), so a session only counts as closed after this delay
+CLOSE_SETTLE_DELAY = timedelta(minutes=15)
+
+# Quote currencies of crypto pairs, e.g. BTC-USD, which trade around the clock
+CRYPTO_QUOTE_CURRENCIES = {"USD", "USDT", "USDC", "EUR", "GBP", "BTC", "ETH"}
+
+
+class Exchange(NamedTuple):
+    name: str
+    timezone: ZoneInfo
+    opens_at: time
+    closes_at: time
+    holidays: Callable[[int], FrozenSet[date]]
+
+
+def _observed(day: date) -> date:
+    """Move a holiday falling on a weekend to the nearest weekday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=64)
+def nyse_holidays(year: int) -> FrozenSet[date]:
+    """
+    Full-day NYSE/Nasdaq holidays of a year. Early closes are not included, the
+    market simply counts as open until the regular close on those days.
+    """
+    holidays = {
+        date(year, 1, 1) + relativedelta(weekday=MO(+3)),
+        date(year, 2, 1) + relativedelta(weekday=MO(+3)),
+        easter(year) - timedelta(days=2),
+        date(year, 5, 31) + relativedelta(weekday=MO(-1)),
+        _observed(date(year, 7, 4)),
+        date(year, 9, 1) + relativedelta(weekday=MO(+1)),
+        date(year, 11, 1) + relativedelta(weekday=TH(+4)),
+        _observed(date(year, 12, 25)),
+    }
+    # New Year's Day falling on a Saturday is not observed on the Friday before
+    new_years_day = date(year, 1, 1)
+    if new_years_day.weekday() != 5:
+        holidays.add(_observed(new_years_day))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))
+    return frozenset(holidays)
+
+
+def _no_holidays(year: int) -> FrozenSet[date]:
+    return frozenset()
+
+
+NYSE = Exchange(
+    "NYSE", ZoneInfo("America/New_York"), time(9, 30), time(16, 0), nyse_holidays
+)
+# Only weekends are known to be closed for the exchanges below; on their
+# holidays quotes fall back to the regular cache TTL
+LSE = Exchange(
+    "LSE", ZoneInfo("Europe/London"), time(8, 0), time(16, 30), _no_holidays
+)
+XETRA = Exchange(
+    "XETRA", ZoneInfo("Europe/Berlin"), time(9, 0), time(17, 30), _no_holidays
+)
+EURONEXT = Exchange(
+    "Euronext", ZoneInfo("Europe/Paris"), time(9, 0), time(17, 30), _no_holidays
+)
+TSX = Exchange(
+    "TSX", ZoneInfo("America/Toronto"), time(9, 30), time(16, 0), _no_holidays
+)
+TSE = Exchange("TSE", ZoneInfo("Asia/Tokyo"), time(9, 0), time(15, 30), _no_holidays)
+HKEX = Exchange(
+    "HKEX", ZoneInfo("Asia/Hong_Kong"), time(9, 30), time(16, 0), _no_holidays
+)
+ASX = Exchange(
+    "ASX", ZoneInfo("Australia/Sydney"), time(10, 0), time(16, 0), _no_holidays
+)
+
+# Yahoo Finance ticker suffix of each exchange, plain symbols are US listings
+EXCHANGES_BY_SUFFIX = {
+    "": NYSE,
+    "L": LSE,
+    "DE": XETRA,
+    "F": XETRA,
+    "PA": EURONEXT,
+    "AS": EURONEXT,
+    "BR": EURONEXT,
+    "TO": TSX,
+    "V": TSX,
+    "T": TSE,
+    "HK": HKEX,
+    "AX": ASX,
+}
+
+
+def get_exchange(ticker: str) -> Optional[Exchange]:
+    """
+    Returns the exchange a ticker trades on, or None when its trading hours are
+    unknown (indices, futures, currencies, crypto, unmapped suffixes).
+    """
+    ticker = ticker.upper()
+    if ticker.startswith("^") or "=" in ticker:
+        return None
+    if "-" in ticker and ticker.rsplit("-", 1)[1] in CRYPTO_QUOTE_CURRENCIES:
+        return None
+    suffix = ticker.rsplit(".", 1)[1] if "." in ticker else ""
+    return EXCHANGES_BY_SUFFIX.get(suffix)
+
+
+def is_trading_day(exchange: Exchange, day: date) -> bool:
+    return day.weekday() < 5 and day not in exchange.holidays(day.year)
+
+
+def next_market_open(
+    ticker: str, now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """
+    Returns when the market of a ticker next opens (in UTC) if it is closed at
+    `now`, so its latest close cannot change before then. Returns None while the
+    market is open or settling, or when the ticker's trading hours are unknown.
+    """
+    exchange = get_exchange(ticker)
+    if exchange is None:
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    local_now = now.astimezone(exchange.timezone)
+    day = local_now.date()
+
+    if is_trading_day(exchange, day):
+        opens = datetime.combine(day, exchange.opens_at, tzinfo=exchange.timezone)
+        closes = datetime.combine(day, exchange.closes_at, tzinfo=exchange.timezone)
+        if local_now < opens:
+            return opens.astimezone(timezone.utc)
+        if local_now < closes + CLOSE_SETTLE_DELAY:
+            return None
+
+    day += timedelta(days=1)
+    while not is_trading_day(exchange, day):
+        day += timedelta(days=1)
+    opens = datetime.combine(day, exchange.opens_at, tzinfo=exchange.timezone)
+    return opens.astimezone(timezone.utc)
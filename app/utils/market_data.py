@@ -1,10 +1,304 @@
-import yfinance as yf
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
+from app.core.config import settings
+from app.core.log_config import logging_settings
+from app.utils import market_calendar
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.market_data_providers import (
+    FileMarketDataProvider,
+    MarketDataProvider,
+    YFinanceProvider,
+)
+from app.utils.quote_cache import QuoteCache, RequestCoalescer, SQLiteQuoteCache
 
-def get_current_price(ticker: str) -> float:
-    ticker_data = yf.Ticker(ticker)
-    hist = ticker_data.history(period="1d")
-    if hist.empty:
-        raise ValueError(f"No data found for ticker {ticker}")
-    current_price = hist["Close"].iloc[-1]
+logger = logging.getLogger(logging_settings.LOGGER_NAME)
+
+
+class Quote(NamedTuple):
+    price: float
+    stale: bool = False
+
+
+def _create_quote_cache():
+    if settings.QUOTE_CACHE_BACKEND == "sqlite":
+        return SQLiteQuoteCache(
+            path=settings.QUOTE_CACHE_SQLITE_PATH,
+            ttl_seconds=settings.QUOTE_CACHE_TTL_SECONDS,
+            max_size=settings.QUOTE_CACHE_MAX_SIZE,
+            stale_seconds=settings.QUOTE_STALE_MAX_AGE_SECONDS,
+        )
+    return QuoteCache(
+        ttl_seconds=settings.QUOTE_CACHE_TTL_SECONDS,
+        max_size=settings.QUOTE_CACHE_MAX_SIZE,
+        stale_seconds=settings.QUOTE_STALE_MAX_AGE_SECONDS,
+    )
+
+
+def _create_provider() -> MarketDataProvider:
+    if settings.MARKET_DATA_PROVIDER == "file":
+        return FileMarketDataProvider(settings.MARKET_DATA_FILE_PATH)
+    return YFinanceProvider(
+        timeout=settings.QUOTE_FETCH_TIMEOUT_SECONDS,
+        max_workers=settings.QUOTE_SYMBOL_WORKERS,
+    )
+
+
+provider = _create_provider()
+quote_cache = _create_quote_cache()
+_coalescer = RequestCoalescer()
+_executor = ThreadPoolExecutor(
+    max_workers=settings.QUOTE_FETCH_WORKERS, thread_name_prefix="quote-fetch"
+)
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.MARKET_DATA_FAILURE_THRESHOLD,
+    cooldown_seconds=settings.MARKET_DATA_COOLDOWN_SECONDS,
+)
+
+
+def _call_upstream(fetch: Callable, *args):
+    """Call the market data provider through the circuit breaker."""
+    if not circuit_breaker.allow_request():
+        raise CircuitOpenError("Market data provider is unavailable, cooling down")
+    try:
+        result = fetch(*args)
+    except Exception:
+        circuit_breaker.record_failure()
+        raise
+    circuit_breaker.record_success()
+    return result
+
+
+def _fetch_current_price(ticker: str) -> float:
+    return provider.get_current_price(ticker)
+
+
+def _fetch_current_prices(tickers: List[str]) -> Dict[str, float]:
+    return provider.get_current_prices(tickers)
+
+
+def _iter_current_prices(tickers: List[str]) -> Iterator[Tuple[str, float]]:
+    return provider.iter_current_prices(tickers)
+
+
+def fetch_daily_bars(ticker: str, start_date: date, end_date: date) -> List[dict]:
+    """
+    Download the daily OHLCV bars of a ticker between two dates (inclusive).
+    """
+    return _call_upstream(provider.get_daily_bars, ticker, start_date, end_date)
+
+
+def _quote_ttl_seconds(ticker: str) -> float:
+    """
+    Quotes stay valid for the cache TTL, or until the next market open of the
+    ticker's exchange when its market is closed and the close can't change.
+    """
+    now = datetime.now(timezone.utc)
+    next_open = market_calendar.next_market_open(ticker, now)
+    if next_open is None:
+        return settings.QUOTE_CACHE_TTL_SECONDS
+    return max(settings.QUOTE_CACHE_TTL_SECONDS, (next_open - now).total_seconds())
+
+
+def _cache_quote(ticker: str, price: float) -> None:
+    quote_cache.set(ticker, price, ttl_seconds=_quote_ttl_seconds(ticker))
+
+
+def _fetch_and_cache(ticker: str) -> float:
+    # Another caller may have filled the cache while we waited to lead the fetch
+    cached_price = quote_cache.get(ticker)
+    if cached_price is not None:
+        return cached_price
+    current_price = _call_upstream(_fetch_current_price, ticker)
+    _cache_quote(ticker, current_price)
     return current_price
+
+
+def _fetch_batch_and_cache(batch: List[str]) -> None:
+    """
+    Download one batch, caching each quote and waking up its waiters as soon as
+    it comes in so a slow symbol doesn't hold back the rest of the batch.
+    """
+    fetched = set()
+    if circuit_breaker.allow_request():
+        try:
+            for ticker, price in _iter_current_prices(batch):
+                _cache_quote(ticker, price)
+                _coalescer.resolve(ticker, result=price)
+                fetched.add(ticker)
+        except Exception as e:
+            logger.warning(f"Bulk quote download failed for {len(batch)} tickers: {e}")
+        # A batch that brings nothing back counts as a failed call
+        if fetched:
+            circuit_breaker.record_success()
+        else:
+            circuit_breaker.record_failure()
+    for ticker in batch:
+        if ticker not in fetched:
+            _coalescer.resolve(
+                ticker, exception=ValueError(f"No data found for ticker {ticker}")
+            )
+    quote_cache.release_refresh(batch)
+
+
+def _await_shared_quotes(tickers: List[str], timeout: float) -> None:
+    """
+    Wait for quotes that another worker process is refreshing to show up in the
+    shared cache, then wake up the local waiters. Runs on the calling request's
+    thread so polling never ties up the quote worker pool; with a timeout of 0
+    the cache is checked once.
+    """
+    deadline = time.monotonic() + timeout
+    pending = list(tickers)
+    while pending:
+        found = quote_cache.get_many(pending)
+        for ticker, price in found.items():
+            _coalescer.resolve(ticker, result=price)
+        pending = [ticker for ticker in pending if ticker not in found]
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(0.05)
+    for ticker in pending:
+        _coalescer.resolve(
+            ticker, exception=ValueError(f"No data found for ticker {ticker}")
+        )
+
+
+def _batched(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def get_current_price(ticker: str) -> float:
+    """
+    Get the latest close for a ticker, served from the quote cache when fresh.
+    Concurrent misses for the same ticker share a single upstream fetch.
+    """
+    cached_price = quote_cache.get(ticker)
+    if cached_price is not None:
+        return cached_price
+    return _coalescer.run(ticker, lambda: _fetch_and_cache(ticker))
+
+
+def _start_fetches(
+    tickers: List[str], timeout: float
+) -> Tuple[Dict[str, Future], List[str]]:
+    """
+    Make sure a download is under way for each ticker and return the futures
+    that complete when their quotes are in.
+
+    With a shared cache, symbols already being fetched by another worker process
+    are not downloaded a second time. They are returned as well: the caller led
+    them and must pass them to _await_shared_quotes to resolve their futures.
+    """
+    led, futures = _coalescer.claim(tickers)
+    won = set(quote_cache.acquire_refresh(led, lease_seconds=timeout))
+    for batch in _batched(
+        [ticker for ticker in led if ticker in won], settings.QUOTE_BATCH_SIZE
+    ):
+        _executor.submit(_fetch_batch_and_cache, batch)
+    shared = [ticker for ticker in led if ticker not in won]
+    return futures, shared
+
+
+def get_quotes(
+    tickers: Iterable[str], timeout: Optional[float] = None
+) -> Dict[str, Quote]:
+    """
+    Get the latest quote for many tickers at once.
+
+    Cached quotes are returned as is; the remaining tickers are downloaded in
+    batches of QUOTE_BATCH_SIZE symbols, in parallel on the quote worker pool. The
+    call returns after at most `timeout` seconds (QUOTE_FETCH_TIMEOUT_SECONDS by
+    default) with whatever quotes are available: tickers without data, or whose
+    download is still running, are left out of the result. Downloads that miss
+    the deadline keep running and fill the cache for later calls.
+
+    With QUOTE_STALE_WHILE_REVALIDATE, expired quotes younger than
+    QUOTE_STALE_MAX_AGE_SECONDS are returned right away, marked stale, while
+    they are refreshed in the background.
+    """
+    if timeout is None:
+        timeout = settings.QUOTE_FETCH_TIMEOUT_SECONDS
+
+    unique_tickers = list(dict.fromkeys(tickers))
+    cached_prices = quote_cache.get_many(unique_tickers)
+    quotes = {ticker: Quote(price) for ticker, price in cached_prices.items()}
+    missing = [ticker for ticker in unique_tickers if ticker not in quotes]
+    if not missing:
+        return quotes
+
+    if settings.QUOTE_STALE_WHILE_REVALIDATE:
+        stale_prices = quote_cache.get_stale_many(missing)
+        if stale_prices:
+            # Nobody waits for the refresh, so don't wait for other workers either
+            _, shared = _start_fetches(list(stale_prices), timeout)
+            _await_shared_quotes(shared, 0)
+            for ticker, price in stale_prices.items():
+                quotes[ticker] = Quote(price, stale=True)
+            missing = [ticker for ticker in missing if ticker not in stale_prices]
+        if not missing:
+            return quotes
+
+    deadline = time.monotonic() + timeout
+    futures, shared = _start_fetches(missing, timeout)
+    if shared:
+        _await_shared_quotes(shared, timeout)
+    done, not_done = wait(
+        futures.values(), timeout=max(0.0, deadline - time.monotonic())
+    )
+    if not_done:
+        logger.warning(
+            f"Quote fetch timed out after {timeout}s for {len(not_done)} tickers"
+        )
+    for ticker, future in futures.items():
+        if future in done and future.exception() is None:
+            quotes[ticker] = Quote(future.result())
+    return quotes
+
+
+def get_current_prices(
+    tickers: Iterable[str], timeout: Optional[float] = None
+) -> Dict[str, float]:
+    """
+    Get the latest close for many tickers at once, see get_quotes.
+    """
+    quotes = get_quotes(tickers, timeout=timeout)
+    return {ticker: quote.price for ticker, quote in quotes.items()}
+
+
+def refresh_quotes(tickers: Iterable[str]) -> Dict[str, float]:
+    """
+    Download fresh quotes for the given tickers, QUOTE_REFRESH_BATCH_SIZE symbols
+    per request, and store them in the quote cache even if it still holds them.
+    Tickers whose market is closed are skipped while their quote is cached.
+    Meant for background refreshes; blocks until every batch is done.
+
+    With a shared cache each symbol is refreshed by whichever worker claims it
+    first; its lease is kept for a refresh interval so the other workers skip it.
+    """
+    refreshed = {}
+    unique_tickers = list(dict.fromkeys(tickers))
+    cached_prices = quote_cache.get_many(unique_tickers)
+    due_tickers = [
+        ticker
+        for ticker in unique_tickers
+        if ticker not in cached_prices
+        or market_calendar.next_market_open(ticker) is None
+    ]
+    due_tickers = quote_cache.acquire_refresh(
+        due_tickers, lease_seconds=settings.QUOTE_REFRESH_INTERVAL_SECONDS
+    )
+    for batch in _batched(due_tickers, settings.QUOTE_REFRESH_BATCH_SIZE):
+        try:
+            fetched = _call_upstream(_fetch_current_prices, batch)
+        except Exception as e:
+            logger.warning(f"Quote refresh failed for {len(batch)} tickers: {e}")
+            continue
+        for ticker, price in fetched.items():
+            _cache_quote(ticker, price)
+        refreshed.update(fetched)
+    return refreshed
@@ -0,0 +1,223 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# yfinance and pandas pull in numpy, requests and friends, which take a large
+# share of the API's start-up time. They are imported on first use so workers
+# that never touch market data don't pay for them.
+
+BAR_COLUMNS = ["ticker", "date", "open", "high", "low", "close", "volume"]
+
+
+class MarketDataProvider(ABC):
+    """
+    Source of quotes and daily price history.
+
+    Providers only talk to their backend: caching, batching, deadlines and the
+    circuit breaker are handled by app.utils.market_data on top of them.
+    """
+
+    @abstractmethod
+    def get_current_price(self, ticker: str) -> float:
+        """Return the latest close of a ticker, raising ValueError without data."""
+
+    @abstractmethod
+    def get_current_prices(self, tickers: List[str]) -> Dict[str, float]:
+        """
+        Return the latest close of several tickers. Tickers without data are left
+        out; raise when nothing at all could be retrieved.
+        """
+
+    def iter_current_prices(self, tickers: List[str]) -> Iterator[Tuple[str, float]]:
+        """
+        Yield the latest close of several tickers as (ticker, price) pairs as soon
+        as each one is in, so callers can use them before the slowest arrives.
+        By default they all come at once from get_current_prices.
+        """
+        return iter(self.get_current_prices(tickers).items())
+
+    @abstractmethod
+    def get_daily_bars(
+        self, ticker: str, start_date: date, end_date: date
+    ) -> List[dict]:
+        """
+        Return the daily OHLCV bars of a ticker between two dates (inclusive),
+        as dicts with the keys of BAR_COLUMNS.
+        """
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Quotes and history from Yahoo Finance."""
+
+    def __init__(self, timeout: float, max_workers: int = 100):
+        self.timeout = timeout
+        # Quotes are requested symbol by symbol; the pool runs a whole batch
+        # at once so a batch takes as long as its slowest symbol, at most the
+        # timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="yfinance"
+        )
+
+    def get_current_price(self, ticker: str) -> float:
+        import yfinance as yf
+
+        hist = yf.Ticker(ticker).history(period="1d", timeout=self.timeout)
+        if hist.empty:
+            raise ValueError(f"No data found for ticker {ticker}")
+        return float(hist["Close"].iloc[-1])
+
+    def _last_close(self, ticker: str) -> Optional[float]:
+        import yfinance as yf
+
+        # A few days of history so symbols that did not trade today still have
+        # a close
+        closes = (
+            yf.Ticker(ticker)
+            .history(period="5d", auto_adjust=True, timeout=self.timeout)["Close"]
+            .dropna()
+        )
+        return None if closes.empty else float(closes.iloc[-1])
+
+    def iter_current_prices(self, tickers: List[str]) -> Iterator[Tuple[str, float]]:
+        # Each symbol is its own request with its own future, rather than one
+        # yf.download: that collects results in module globals it resets on
+        # every call, and waits for every symbol, so a single hung symbol holds
+        # up the whole batch. Symbols still missing after the timeout are
+        # dropped.
+        futures = {
+            self._executor.submit(self._last_close, ticker): ticker
+            for ticker in tickers
+        }
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                if future.exception() is None and future.result() is not None:
+                    yield futures[future], future.result()
+        except TimeoutError:
+            pass
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def get_current_prices(self, tickers: List[str]) -> Dict[str, float]:
+        prices = dict(self.iter_current_prices(tickers))
+        if not prices:
+            raise ValueError(f"No data returned for {len(tickers)} tickers")
+        return prices
+
+    def get_daily_bars(
+        self, ticker: str, start_date: date, end_date: date
+    ) -> List[dict]:
+        import yfinance as yf
+
+        hist = yf.Ticker(ticker).history(
+            start=start_date,
+            end=end_date + timedelta(days=1),
+            interval="1d",
+            auto_adjust=True,
+            timeout=self.timeout,
+        )
+        bars = []
+        for timestamp, row in hist.iterrows():
+            if row["Close"] != row["Close"]:  # NaN close, no trading that day
+                continue
+            bars.append(
+                {
+                    "ticker": ticker,
+                    "date": timestamp.date(),
+                    "open": float(row["Open"]),
+                    "high": float(row["High"]),
+                    "low": float(row["Low"]),
+                    "close": float(row["Close"]),
+                    "volume": (
+                        int(row["Volume"]) if row["Volume"] == row["Volume"] else None
+                    ),
+                }
+            )
+        return bars
+
+
+class FileMarketDataProvider(MarketDataProvider):
+    """
+    Quotes and history served from a local file of daily bars, for benchmarks,
+    load tests and replay environments that must not touch the network.
+
+    The file holds one row per ticker and day with the columns of BAR_COLUMNS
+    (volume may be empty). CSV files are read through a memory map, Parquet
+    files need pyarrow or fastparquet. The file is loaded on first use; the
+    current price of a ticker is its last close in the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._bars: Optional[Dict[str, "pd.DataFrame"]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, "pd.DataFrame"]:
+        if self._bars is not None:
+            return self._bars
+        with self._lock:
+            if self._bars is None:
+                self._bars = self._read(self.path)
+        return self._bars
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, "pd.DataFrame"]:
+        import pandas as pd
+
+        if os.path.splitext(path)[1].lower() == ".parquet":
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path, memory_map=True)
+        missing = set(BAR_COLUMNS) - set(frame.columns)
+        if missing:
+            raise ValueError(
+                f"Market data file {path} is missing columns: "
+                f"{', '.join(sorted(missing))}"
+            )
+        frame = frame[BAR_COLUMNS].dropna(subset=["close"])
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        frame = frame.sort_values(["ticker", "date"])
+        return {
+            ticker: bars.reset_index(drop=True)
+            for ticker, bars in frame.groupby("ticker", sort=False)
+        }
+
+    def get_current_price(self, ticker: str) -> float:
+        bars = self._load().get(ticker)
+        if bars is None:
+            raise ValueError(f"No data found for ticker {ticker}")
+        return float(bars["close"].iloc[-1])
+
+    def get_current_prices(self, tickers: List[str]) -> Dict[str, float]:
+        all_bars = self._load()
+        return {
+            ticker: float(all_bars[ticker]["close"].iloc[-1])
+            for ticker in tickers
+            if ticker in all_bars
+        }
+
+    def get_daily_bars(
+        self, ticker: str, start_date: date, end_date: date
+    ) -> List[dict]:
+        bars = self._load().get(ticker)
+        if bars is None:
+            return []
+        in_range = bars[(bars["date"] >= start_date) & (bars["date"] <= end_date)]
+        return [
+            {
+                "ticker": ticker,
+                "date": row.date,
+                "open": float(row.open),
+                "high": float(row.high),
+                "low": float(row.low),
+                "close": float(row.close),
+                "volume": int(row.volume) if row.volume == row.volume else None,
+            }
+            for row in in_range.itertuples(index=False)
+        ]
@@ -0,0 +1,22 @@
+import base64
+import binascii
+import json
+from typing import Any, List
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Pack the sort key of the last item of a page into an opaque cursor."""
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Unpack a cursor made by encode_cursor, raising ValueError if malformed."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,288 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class QuoteCache:
+    """
+    Thread-safe in-process quote cache.
+
+    Entries expire after a time-to-live and, once the cache is full, the least
+    recently used entry is evicted to make room for a new one. Expired entries
+    are kept for another `stale_seconds` so they can still be served as stale.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int, stale_seconds: float = 0):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[float]:
+        """Return the cached value for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            now = time.time()
+            if expires_at <= now:
+                if expires_at + self.stale_seconds <= now:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: float, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        """Return the cached values of the keys that are present and fresh."""
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def get_stale_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        """Return the values of the keys that have expired but are still servable."""
+        values = {}
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires_at = entry
+                if expires_at <= now < expires_at + self.stale_seconds:
+                    values[key] = value
+        return values
+
+    def acquire_refresh(self, keys: Iterable[str], lease_seconds: float) -> List[str]:
+        """
+        Claim the right to refresh keys. A process-local cache has nobody to
+        share the work with, so every key is granted.
+        """
+        return list(keys)
+
+    def release_refresh(self, keys: Iterable[str]) -> None:
+        pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteQuoteCache:
+    """
+    Quote cache shared by every worker process on a host through a SQLite file
+    in WAL mode, so readers never block each other or the writer. Reads don't
+    write: once the cache is full, the quotes that expire first make room for
+    new ones, rather than the least recently read.
+
+    Besides the quotes themselves it keeps short refresh leases: a worker about
+    to fetch a symbol first claims its lease, and workers that lose the claim
+    wait for the winner's result instead of fetching the same symbol again.
+    """
+
+    def __init__(
+        self, path: str, ttl_seconds: float, max_size: int, stale_seconds: float = 0
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.stale_seconds = stale_seconds
+        self._local = threading.local()
+        with self._connect() as connection:
+            # accessed_at is when a quote was stored
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS quotes ("
+                "ticker TEXT PRIMARY KEY, price REAL NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_quotes_expires_at "
+                "ON quotes (expires_at)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS refresh_leases ("
+                "ticker TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, keep one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[float]:
+        """Return the cached value for a key, or None if missing or expired."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        """Return the cached values of the keys that are present and fresh."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT ticker, price FROM quotes "
+                f"WHERE ticker IN ({placeholders}) AND expires_at > ?",
+                (*keys, now),
+            ).fetchall()
+        return dict(rows)
+
+    def get_stale_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        """Return the values of the keys that have expired but are still servable."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT ticker, price FROM quotes "
+                f"WHERE ticker IN ({placeholders}) "
+                f"AND expires_at <= ? AND expires_at + ? > ?",
+                (*keys, now, self.stale_seconds, now),
+            ).fetchall()
+        return dict(rows)
+
+    def set(self, key: str, value: float, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the entries that expire first if full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO quotes (ticker, price, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            connection.execute(
+                "DELETE FROM quotes WHERE ticker IN ("
+                "SELECT ticker FROM quotes ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    def acquire_refresh(self, keys: Iterable[str], lease_seconds: float) -> List[str]:
+        """
+        Claim the refresh lease of each key for lease_seconds. Returns the keys
+        this caller won; the others are being refreshed by another worker.
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+        owner = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO refresh_leases (ticker, owner, expires_at) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (ticker) DO UPDATE SET "
+                "owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE refresh_leases.expires_at <= ?",
+                [(key, owner, now + lease_seconds, now) for key in keys],
+            )
+            rows = connection.execute(
+                "SELECT ticker FROM refresh_leases WHERE owner = ?", (owner,)
+            ).fetchall()
+        return [ticker for ticker, in rows]
+
+    def release_refresh(self, keys: Iterable[str]) -> None:
+        """Give up refresh leases early, once their quotes have been stored."""
+        keys = list(keys)
+        if not keys:
+            return
+        with self._connect() as connection:
+            connection.execute(
+                f"DELETE FROM refresh_leases "
+                f"WHERE ticker IN ({','.join('?' * len(keys))})",
+                keys,
+            )
+
+    def clear(self) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM quotes")
+            connection.execute("DELETE FROM refresh_leases")
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+
+
+class RequestCoalescer:
+    """
+    Collapses concurrent calls for the same key into a single upstream call.
+
+    The first caller to claim a key leads the fetch and must resolve it; callers
+    arriving while it is in flight wait on the same future and receive its result
+    (or exception).
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, keys: Iterable[str]) -> Tuple[List[str], Dict[str, Future]]:
+        """
+        Register interest in a set of keys. Returns the keys the caller now leads
+        and a future per key, whether led by this caller or by someone else.
+        """
+        led, futures = [], {}
+        with self._lock:
+            for key in keys:
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = Future()
+                    self._in_flight[key] = future
+                    led.append(key)
+                futures[key] = future
+        return led, futures
+
+    def resolve(
+        self, key: str, result: Any = None, exception: Optional[BaseException] = None
+    ) -> None:
+        """Complete a led key, waking up every caller waiting on it."""
+        with self._lock:
+            future = self._in_flight.pop(key, None)
+        if future is None:
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def run(self, key: str, fetch: Callable[[], Any]) -> Any:
+        led, futures = self.claim([key])
+        if not led:
+            return futures[key].result()
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            self.resolve(key, exception=e)
+            raise
+        self.resolve(key, result=result)
+        return result
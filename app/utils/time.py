@@ -1,13 +1,18 @@
 from datetime import datetime, timedelta
+from typing import Optional
 from dateutil.relativedelta import relativedelta
 from app.schemas.metrics import Period
 
 
-def get_date_range(period: Period) -> (datetime, datetime):
+def get_date_range(
+    period: Period, end_date: Optional[datetime] = None
+) -> (datetime, datetime):
     """
-    Returns the start and end dates based on the specified period.
+    Returns the start and end dates based on the specified period, ending now
+    unless another end date is given.
     """
-    end_date = datetime.utcnow()
+    if end_date is None:
+        end_date = datetime.utcnow()
 
     if period == Period.ALL:
         start_date = datetime.min
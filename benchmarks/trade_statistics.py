@@ -0,0 +1,193 @@
+"""
+Time the trade statistics of one portfolio against an in-memory SQLite database,
+comparing the previous implementation (Trade instances, re-sorted, one pass per
+metric) with the statistics summed from the trades and realized lots in a single
+scan, and from the daily rollup.
+
+    python -m benchmarks.trade_statistics [--trades 100000] [--repeat 3]
+
+Needs the same environment as the app (DB_* settings), as it imports app code.
+"""
+
+import argparse
+import random
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.crud.lots as lots_crud
+from app.core.db import Base
+
+# Every model must be imported for the relationships to resolve
+from app.models.cash_actions import CashAction  # noqa: F401
+from app.models.lots import OpenLot, RealizedLot  # noqa: F401
+from app.models.portfolios import Portfolio
+from app.models.prices import DailyPrice  # noqa: F401
+from app.models.snapshots import PositionSnapshot  # noqa: F401
+from app.models.statistics import DailyTradeStatistics  # noqa: F401
+from app.models.trades import ActionType, Trade
+from app.models.users import User
+from app.schemas.metrics import TradeMetrics
+from app.services.statistics import fill_daily_statistics, get_trade_metrics
+
+
+def make_trades(count: int, tickers: int, seed: int = 0) -> List[SimpleNamespace]:
+    """Random DCA-style trading: mostly small buys, with sells of open holdings."""
+    rng = random.Random(seed)
+    held = {f"T{i}": Decimal(0) for i in range(tickers)}
+    start = datetime(2015, 1, 1)
+    trades = []
+    for i in range(count):
+        ticker = rng.choice(list(held))
+        quantity = Decimal(rng.randint(1, 100))
+        action = ActionType.BUY
+        if held[ticker] and rng.random() < 0.4:
+            action = ActionType.SELL
+            quantity = min(quantity * 3, held[ticker])
+        held[ticker] += quantity if action == ActionType.BUY else -quantity
+        trades.append(
+            SimpleNamespace(
+                id=f"{i:036d}",
+                ticker=ticker,
+                action=action,
+                price=Decimal(rng.randint(5000, 15000)) / 100,
+                quantity=quantity,
+                execution_timestamp=start + timedelta(minutes=i),
+            )
+        )
+    return trades
+
+
+def load_portfolio(session: Session, count: int) -> str:
+    user = User(email="benchmark@example.com", password="x")
+    session.add(user)
+    session.flush()
+    portfolio = Portfolio(name="benchmark", owner_id=user.id)
+    session.add(portfolio)
+    session.flush()
+    trades = make_trades(count, tickers=20)
+    session.bulk_insert_mappings(
+        Trade,
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "portfolio_id": portfolio.id,
+                "action": trade.action,
+                "execution_timestamp": trade.execution_timestamp,
+                "ticker": trade.ticker,
+                "price": trade.price,
+                "quantity": trade.quantity,
+                "currency": "USD",
+            }
+            for trade in trades
+        ],
+    )
+    # Statistics read the realized lots that recording the trades would store
+    for ticker in {trade.ticker for trade in trades}:
+        lots_crud.rebuild_lots(session, portfolio.id, ticker)
+    session.commit()
+    return portfolio.id
+
+
+def previous(session: Session, portfolio_id: str, start, end) -> TradeMetrics:
+    """The statistics as computed before the single-pass engine."""
+    trades = (
+        session.query(Trade)
+        .filter(
+            Trade.portfolio_id == portfolio_id,
+            Trade.execution_timestamp >= start,
+            Trade.execution_timestamp <= end,
+        )
+        .order_by(Trade.execution_timestamp, Trade.action)
+        .all()
+    )
+    total_volume = sum(float(trade.quantity) for trade in trades)
+    sorted_trades = sorted(trades, key=lambda x: x.execution_timestamp)
+    deltas = [
+        (
+            sorted_trades[i + 1].execution_timestamp
+            - sorted_trades[i].execution_timestamp
+        ).days
+        for i in range(len(sorted_trades) - 1)
+    ]
+    lots = {}
+    realized = []
+    for trade in trades:
+        ticker_lots = lots.setdefault(trade.ticker, deque())
+        for lot in lots_crud.match_trade(ticker_lots, trade, realized):
+            if lot.quantity == 0:
+                ticker_lots.remove(lot)
+            else:
+                ticker_lots.append(lot)
+    holding_periods = []
+    wins = losses = 0
+    for lot in realized:
+        holding_periods.append(lot.holding_period_days)
+        if lot.realized_pl > 0:
+            wins += 1
+        elif lot.realized_pl < 0:
+            losses += 1
+    return TradeMetrics(
+        average_trade_volume=total_volume / len(trades),
+        trade_frequency_days_per_trade=sum(deltas) / len(deltas),
+        trade_frequency_trades_per_day=len(trades) / ((end - start).days or 1),
+        average_holding_period_days=sum(holding_periods) / len(holding_periods),
+        win_loss_ratio=wins / losses if losses else None,
+    )
+
+
+def current(session: Session, portfolio_id: str, start, end) -> TradeMetrics:
+    portfolio = session.get(Portfolio, portfolio_id)
+    return get_trade_metrics(session, portfolio, {"all": start}, end)["all"]
+
+
+def best_of(func: Callable, repeat: int, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        args[0].expunge_all()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trades", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        portfolio_id = load_portfolio(session, args.trades)
+        start, end = datetime.min, datetime.utcnow()
+        expected = previous(session, portfolio_id, start, end)
+        assert current(session, portfolio_id, start, end) == expected
+        before = best_of(previous, args.repeat, session, portfolio_id, start, end)
+        scanned = best_of(current, args.repeat, session, portfolio_id, start, end)
+        fill_daily_statistics(
+            session,
+            session.get(Portfolio, portfolio_id),
+            end.date() - timedelta(days=1),
+        )
+        assert current(session, portfolio_id, start, end) == expected
+        rolled_up = best_of(current, args.repeat, session, portfolio_id, start, end)
+    print(f"{args.trades} trades")
+    print(f"previous:  {before * 1000:8.1f}ms")
+    print(f"scanned:   {scanned * 1000:8.1f}ms  ({before / scanned:.1f}x)")
+    print(f"rolled up: {rolled_up * 1000:8.1f}ms  ({before / rolled_up:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.trades import ActionType
+from app.services import prices as price_service
+from app.utils import market_data
+
+
+def authenticate_user(client: TestClient, user):
+    """Helper function to authenticate and return headers."""
+    access_token = create_access_token(
+        user.id, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def test_get_portfolio_overview(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+    create_cash_action_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    create_cash_action_fixture(portfolio_id=portfolio.id, amount=5000.0)
+    create_trade_fixture(portfolio_id=portfolio.id, price=100.0, quantity=10.0)
+    mocker.patch.object(
+        market_data, "get_quotes", return_value={"AAPL": market_data.Quote(110.0)}
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/overview/current",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    overview = response.json()
+    assert overview["cash_balance"] == 4000.0
+    assert overview["total_open_positions_value"] == 1100.0
+    assert overview["total_portfolio_value"] == 5100.0
+    assert overview["unrealized_returns_absolute"] == 100.0
+    assert overview["number_of_open_positions"] == 1
+
+
+def test_get_portfolio_overview_as_of(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+    create_cash_action_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        amount=5000.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 2, 1),
+    )
+    get_closes_on = mocker.patch.object(
+        price_service, "get_closes_on", return_value={"AAPL": 105.0}
+    )
+    url = f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/overview/current"
+
+    response = client.get(url, params={"as_of": "2024-01-15"}, headers=headers)
+
+    assert response.status_code == 200
+    overview = response.json()
+    assert overview["cash_balance"] == 4000.0
+    assert overview["total_open_positions_value"] == 1050.0
+    assert overview["unrealized_returns_absolute"] == 50.0
+    assert overview["number_of_open_positions"] == 1
+    assert get_closes_on.call_args.args[2] == datetime(2024, 1, 15).date()
+
+    response = client.get(url, params={"as_of": "not-a-date"}, headers=headers)
+    assert response.status_code == 422
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services import performance as performance_service
+from app.services import prices as price_service
+from app.utils import market_data
+
+
+def authenticate_user(client: TestClient, user):
+    """Helper function to authenticate and return headers."""
+    access_token = create_access_token(
+        user.id, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    price_service._synced.clear()
+    performance_service.value_series.clear()
+    performance_service.benchmark_returns.clear()
+    yield
+    price_service._synced.clear()
+    performance_service.value_series.clear()
+    performance_service.benchmark_returns.clear()
+
+
+def test_get_performance_metrics(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+    create_cash_action_fixture,
+):
+    mocker.patch.object(market_data, "fetch_daily_bars", return_value=[])
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        amount=2000.0,
+        execution_timestamp=datetime.utcnow() - timedelta(days=30),
+    )
+    # Without stored closes, AAPL keeps its trade price
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        execution_timestamp=datetime.utcnow() - timedelta(days=20),
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/performance/",
+        headers=headers,
+        params={"period": "1Y"},
+    )
+
+    assert response.status_code == 200
+    metrics = response.json()
+    assert metrics["trading_days"] > 0
+    assert metrics["total_return"] == 0
+    assert metrics["max_drawdown"] == 0
+    assert metrics["sharpe_ratio"] is None
+    # No SPY closes either
+    assert metrics["benchmark"] is None
+
+
+def test_get_performance_metrics_not_authorized(
+    client: TestClient, create_user_fixture, create_portfolio_fixture
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/performance/",
+        headers=headers,
+    )
+
+    assert response.status_code == 403
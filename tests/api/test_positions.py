@@ -0,0 +1,433 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.trades import ActionType
+from app.services import prices as price_service
+from app.services.snapshots import fill_snapshots
+from app.utils import market_data
+
+
+def authenticate_user(client: TestClient, user):
+    """Helper function to authenticate and return headers."""
+    access_token = create_access_token(
+        user.id, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def test_get_current_positions_success(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        ticker="AAPL",
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        ticker="AAPL",
+        price=120.0,
+        quantity=4.0,
+        execution_timestamp=datetime(2024, 2, 1),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        ticker="MSFT",
+        price=300.0,
+        quantity=1.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        ticker="MSFT",
+        price=310.0,
+        quantity=1.0,
+        execution_timestamp=datetime(2024, 3, 1),
+    )
+    get_quotes = mocker.patch.object(
+        market_data, "get_quotes", return_value={"AAPL": market_data.Quote(150.0)}
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/current",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    positions = response.json()
+    assert len(positions) == 1
+    assert positions[0]["symbol"] == "AAPL"
+    assert positions[0]["quantity"] == 6.0
+    assert positions[0]["current_value"] == 900.0
+    assert positions[0]["unrealized_pl"] == 300.0
+    assert positions[0]["price_is_stale"] is False
+    assert list(get_quotes.call_args.args[0]) == ["AAPL"]
+
+
+def test_get_current_positions_forbidden(
+    client: TestClient, create_user_fixture, create_portfolio_fixture
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/current",
+        headers=headers,
+    )
+
+    assert response.status_code == 403
+
+
+def test_get_current_positions_without_quote(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    create_trade_fixture(portfolio_id=portfolio.id, ticker="DEAD", quantity=5.0)
+    mocker.patch.object(market_data, "get_quotes", return_value={})
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/current",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    positions = response.json()
+    assert positions[0]["symbol"] == "DEAD"
+    assert positions[0]["current_price"] is None
+    assert positions[0]["current_value"] is None
+
+
+def test_get_current_positions_uses_cost_of_open_lots(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day, action, price, quantity in [
+        (1, ActionType.BUY, 100.0, 10.0),
+        (2, ActionType.BUY, 130.0, 10.0),
+        (3, ActionType.SELL, 120.0, 15.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    mocker.patch.object(
+        market_data, "get_quotes", return_value={"AAPL": market_data.Quote(140.0)}
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/current",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    position = response.json()[0]
+    assert position["quantity"] == 5.0
+    assert position["entry_price"] == 130.0
+    assert position["entry_date"].startswith("2024-01-02")
+    assert position["unrealized_pl"] == 50.0
+
+
+def test_get_current_positions_average_cost_basis(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day, action, price, quantity in [
+        (1, ActionType.BUY, 100.0, 10.0),
+        (2, ActionType.BUY, 130.0, 10.0),
+        (3, ActionType.SELL, 120.0, 15.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    mocker.patch.object(
+        market_data, "get_quotes", return_value={"AAPL": market_data.Quote(140.0)}
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/current",
+        params={"cost_basis": "average"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    position = response.json()[0]
+    assert position["quantity"] == 5.0
+    assert position["entry_price"] == 115.0
+    assert position["entry_date"].startswith("2024-01-01")
+    assert position["unrealized_pl"] == 125.0
+
+
+def test_get_current_positions_as_of(
+    client: TestClient,
+    db,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day, action, price, quantity in [
+        (1, ActionType.BUY, 100.0, 10.0),
+        (2, ActionType.BUY, 130.0, 10.0),
+        (3, ActionType.SELL, 120.0, 15.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    mocker.patch.object(price_service, "sync_price_history")
+    mocker.patch.object(price_service, "get_closes_on", return_value={"AAPL": 125.0})
+    get_quotes = mocker.patch.object(market_data, "get_quotes")
+    url = f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/current"
+
+    # Before and after the 2nd has been snapshot: the sell on the 3rd closes
+    # the snapshot's lots first-in first-out either way
+    for _ in range(2):
+        response = client.get(url, params={"as_of": "2024-01-02"}, headers=headers)
+        assert response.status_code == 200
+        position = response.json()[0]
+        assert position["quantity"] == 20.0
+        assert position["entry_price"] == 115.0
+        assert position["current_price"] == 125.0
+        assert position["unrealized_pl"] == 200.0
+
+        response = client.get(url, params={"as_of": "2024-01-03"}, headers=headers)
+        position = response.json()[0]
+        assert position["quantity"] == 5.0
+        assert position["entry_price"] == 130.0
+        assert position["entry_date"].startswith("2024-01-02")
+        fill_snapshots(db, portfolio, datetime(2024, 1, 2).date())
+
+    response = client.get(
+        url, params={"as_of": "2024-01-02", "cost_basis": "average"}, headers=headers
+    )
+    assert response.json()[0]["quantity"] == 20.0
+
+    response = client.get(url, params={"as_of": "2023-12-31"}, headers=headers)
+    assert response.json() == []
+    get_quotes.assert_not_called()
+
+
+def test_get_historical_positions(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day, action, price, quantity in [
+        (1, ActionType.BUY, 100.0, 10.0),
+        (2, ActionType.BUY, 130.0, 10.0),
+        (3, ActionType.SELL, 120.0, 15.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/historic",
+        params={"order_by": "entry_price", "sort": "asc"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    assert [
+        (position["quantity"], position["entry_price"], position["realized_pl"])
+        for position in response.json()
+    ] == [(10.0, 100.0, 200.0), (5.0, 130.0, -50.0)]
+
+
+def test_get_historical_positions_match_earlier_buys_only(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day, action, price in [
+        (1, ActionType.BUY, 100.0),
+        (2, ActionType.SELL, 110.0),
+        (3, ActionType.BUY, 90.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=10.0,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/historic",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    assert [position["entry_price"] for position in response.json()] == [100.0]
+
+
+def test_get_historical_positions_pages_with_cursor(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day in range(1, 6):
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            price=100.0,
+            quantity=1.0,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    for day in range(1, 6):
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=ActionType.SELL,
+            price=100.0 + day,
+            quantity=1.0,
+            execution_timestamp=datetime(2024, 2, day),
+        )
+    url = f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/historic"
+
+    exit_prices = []
+    params = {"order_by": "realized_pl", "limit": 2}
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        exit_prices += [position["exit_price"] for position in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+
+    assert exit_prices == [105.0, 104.0, 103.0, 102.0, 101.0]
+
+
+def test_get_historical_positions_rejects_bad_parameters(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    create_trade_fixture(portfolio_id=portfolio.id, quantity=2.0)
+    create_trade_fixture(
+        portfolio_id=portfolio.id, action=ActionType.SELL, quantity=1.0
+    )
+    url = f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/positions/historic"
+
+    response = client.get(url, params={"order_by": "notes"}, headers=headers)
+    assert response.status_code == 422
+
+    response = client.get(url, params={"after": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.get(url, params={"limit": 1}, headers=headers)
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(
+        url, params={"after": cursor, "order_by": "symbol"}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_get_historical_positions_agree_with_realized_pl(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    # A short sale covered by a later buy, then a long round trip
+    for day, action, price, quantity in [
+        (1, ActionType.SELL, 120.0, 5.0),
+        (3, ActionType.BUY, 100.0, 8.0),
+        (6, ActionType.SELL, 110.0, 3.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    base = f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics"
+
+    response = client.get(
+        f"{base}/positions/historic",
+        params={"order_by": "entry_date", "sort": "asc"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert [
+        (
+            position["quantity"],
+            position["entry_price"],
+            position["exit_price"],
+            position["realized_pl"],
+            position["holding_period_days"],
+        )
+        for position in response.json()
+    ] == [(-5.0, 120.0, 100.0, 100.0, 2), (3.0, 100.0, 110.0, 30.0, 3)]
+
+    response = client.get(f"{base}/realized/", headers=headers)
+    assert [row["realized_pl"] for row in response.json()] == [130.0]
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.trades import ActionType
+
+
+def authenticate_user(client: TestClient, user):
+    """Helper function to authenticate and return headers."""
+    access_token = create_access_token(
+        user.id, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def _trade_round_trip(create_trade_fixture, portfolio, ticker, buy, sell, pl):
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        ticker=ticker,
+        price=100.0,
+        quantity=1.0,
+        execution_timestamp=buy,
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        ticker=ticker,
+        action=ActionType.SELL,
+        price=100.0 + pl,
+        quantity=1.0,
+        execution_timestamp=sell,
+    )
+
+
+def test_get_portfolio_realized_pl(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for ticker, sell, pl in [
+        ("AAPL", datetime(2023, 12, 20), 10.0),
+        ("AAPL", datetime(2024, 2, 10), -5.0),
+        ("MSFT", datetime(2024, 2, 15), 20.0),
+    ]:
+        _trade_round_trip(
+            create_trade_fixture,
+            portfolio,
+            ticker,
+            sell - timedelta(days=30),
+            sell,
+            pl,
+        )
+    url = f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/realized/"
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert [(row["group"], row["realized_pl"]) for row in response.json()] == [
+        ("AAPL", 5.0),
+        ("MSFT", 20.0),
+    ]
+
+    response = client.get(url, params={"group_by": "month"}, headers=headers)
+    assert [
+        (row["group"], row["realized_pl"], row["number_of_lots"])
+        for row in response.json()
+    ] == [("2023-12", 10.0, 1), ("2024-02", 15.0, 2)]
+
+    response = client.get(
+        url,
+        params={"group_by": "year", "start_date": "2024-01-01"},
+        headers=headers,
+    )
+    assert [(row["group"], row["realized_pl"]) for row in response.json()] == [
+        ("2024", 15.0)
+    ]
+
+    response = client.get(url, params={"group_by": "week"}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_get_portfolio_realized_pl_forbidden(
+    client: TestClient, create_user_fixture, create_portfolio_fixture
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=create_user_fixture().id)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/realized/",
+        headers=headers,
+    )
+
+    assert response.status_code == 403
+
+
+def test_read_realized_pl_me_across_portfolios(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    sell = datetime(2024, 2, 10)
+    for owner_id, pl in [
+        (user.id, 10.0),
+        (user.id, 5.0),
+        (create_user_fixture().id, 1.0),
+    ]:
+        portfolio = create_portfolio_fixture(owner_id=owner_id)
+        _trade_round_trip(
+            create_trade_fixture, portfolio, "AAPL", datetime(2024, 1, 1), sell, pl
+        )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/users/me/realized",
+        params={"group_by": "year"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"group": "2024", "realized_pl": 15.0, "quantity": 2.0, "number_of_lots": 2}
+    ]
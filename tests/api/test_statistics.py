@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.trades import ActionType
+
+
+def authenticate_user(client: TestClient, user):
+    """Helper function to authenticate and return headers."""
+    access_token = create_access_token(
+        user.id, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def test_get_trade_metrics_matches_lots_per_ticker(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    for day, action, ticker, price, quantity in [
+        (1, ActionType.BUY, "MSFT", 300.0, 1.0),
+        (2, ActionType.BUY, "AAPL", 100.0, 10.0),
+        (5, ActionType.SELL, "AAPL", 120.0, 4.0),
+        (11, ActionType.SELL, "MSFT", 290.0, 1.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            ticker=ticker,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/statistics/",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    metrics = response.json()
+    assert metrics["average_trade_volume"] == 4.0
+    assert metrics["average_holding_period_days"] == 6.5
+    assert metrics["win_loss_ratio"] == 1.0
+
+
+def test_get_trade_metrics_for_periods(
+    client: TestClient,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    portfolio = create_portfolio_fixture(owner_id=user.id)
+    now = datetime.utcnow()
+    for days_ago, action, price, quantity in [
+        (400, ActionType.BUY, 100.0, 10.0),
+        (300, ActionType.SELL, 90.0, 10.0),
+        (20, ActionType.BUY, 100.0, 2.0),
+        (3, ActionType.SELL, 120.0, 2.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=now - timedelta(days=days_ago),
+        )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/statistics/periods",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    metrics = response.json()
+    assert set(metrics) == {
+        "1D",
+        "1W",
+        "1M",
+        "3M",
+        "6M",
+        "1Y",
+        "3Y",
+        "5Y",
+        "10Y",
+        "YTD",
+        "All",
+    }
+    assert metrics["1D"]["average_trade_volume"] == 0
+    assert metrics["1W"]["average_trade_volume"] == 2.0
+    # The lot bought 20 days ago counts in the week it was sold
+    assert metrics["1W"]["average_holding_period_days"] == 17
+    assert metrics["1W"]["win_loss_ratio"] is None
+    assert metrics["1M"]["average_holding_period_days"] == 17
+    assert metrics["1Y"]["average_holding_period_days"] == 58.5
+    assert metrics["All"]["average_trade_volume"] == 6.0
+    assert metrics["All"]["win_loss_ratio"] == 1.0
+    for period, expected in metrics.items():
+        single = client.get(
+            f"{settings.API_V1_STR}/portfolios/{portfolio.id}/metrics/statistics/",
+            headers=headers,
+            params={"period": period},
+        ).json()
+        assert single == expected
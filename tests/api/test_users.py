@@ -1,10 +1,12 @@
 import uuid
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from fastapi.testclient import TestClient
 
 from app.core.config import settings
 from app.core.security import create_access_token, hash_password
+from app.models.trades import ActionType
+from app.utils import market_data
 
 
 def authenticate_user(client: TestClient, user):
@@ -249,3 +251,64 @@ def test_superuser_delete_user_not_found(client: TestClient, create_user_fixture
 
     assert response.status_code == 404
     assert response.json()["detail"] == "User not found"
+
+
+def test_read_positions_me(
+    client: TestClient,
+    mocker,
+    create_user_fixture,
+    create_portfolio_fixture,
+    create_trade_fixture,
+):
+    user = create_user_fixture()
+    headers = authenticate_user(client, user)
+    first = create_portfolio_fixture(owner_id=user.id)
+    second = create_portfolio_fixture(owner_id=user.id)
+    other = create_portfolio_fixture(owner_id=create_user_fixture().id)
+    for portfolio, ticker, action, price, quantity, day in [
+        (first, "AAPL", ActionType.BUY, 100.0, 10.0, 1),
+        (first, "AAPL", ActionType.SELL, 120.0, 4.0, 3),
+        (second, "AAPL", ActionType.BUY, 130.0, 4.0, 2),
+        (second, "MSFT", ActionType.BUY, 300.0, 1.0, 2),
+        (second, "TSLA", ActionType.BUY, 200.0, 1.0, 2),
+        (second, "TSLA", ActionType.SELL, 210.0, 1.0, 3),
+        (other, "AAPL", ActionType.BUY, 50.0, 100.0, 1),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            ticker=ticker,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    get_quotes = mocker.patch.object(
+        market_data, "get_quotes", return_value={"AAPL": market_data.Quote(150.0)}
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/users/me/positions",
+        params={"breakdown": True},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    aapl, msft = response.json()
+    assert aapl["symbol"] == "AAPL"
+    assert aapl["quantity"] == 10.0
+    assert aapl["entry_price"] == 112.0
+    assert aapl["current_value"] == 1500.0
+    assert aapl["unrealized_pl"] == 380.0
+    assert aapl["entry_date"].startswith("2024-01-01")
+    assert [
+        (share["portfolio_id"], share["quantity"], share["unrealized_pl"])
+        for share in aapl["portfolios"]
+    ] == sorted([(first.id, 6.0, 300.0), (second.id, 4.0, 80.0)])
+    assert msft["symbol"] == "MSFT"
+    assert msft["current_price"] is None
+    # One batch of quotes for every ticker held
+    get_quotes.assert_called_once()
+    assert sorted(get_quotes.call_args.args[0]) == ["AAPL", "MSFT"]
+
+    response = client.get(f"{settings.API_V1_STR}/users/me/positions", headers=headers)
+    assert [position["portfolios"] for position in response.json()] == [None, None]
@@ -12,6 +12,7 @@ from sqlalchemy.pool import StaticPool
 
 import app.crud.users as user_crud
 import app.crud.portfolios as portfolio_crud
+import app.crud.trades as trade_crud
 from app.api.deps import get_db
 from app.core.db import Base
 from app.core.security import hash_password
@@ -21,6 +22,11 @@ from app.models.users import User
 from app.models.portfolios import Portfolio
 from app.models.trades import Trade, ActionType
 from app.models.cash_actions import CashAction, CashActionType
+from app.models.prices import DailyPrice
+from app.models.lots import OpenLot, RealizedLot
+from app.models.snapshots import PositionSnapshot
+from app.models.statistics import DailyTradeStatistics
+from app.models.leases import JobLease
 
 from app.schemas.users import UserCreate
 from app.schemas.portfolios import PortfolioCreate
@@ -77,14 +83,20 @@ def db(db_engine):
 
 
 @pytest.fixture(scope="function")
-def client(db):
+def client(db, monkeypatch):
     """
     Provide a test client for the FastAPI app.
     This fixture overrides the get_db dependency to use the test database session.
+    Background jobs are disabled so tests never reach the real database or network.
     """
     from app.main import app
+    from app.core.config import settings
     from fastapi.testclient import TestClient
 
+    monkeypatch.setattr(settings, "QUOTE_REFRESH_ENABLED", False)
+    monkeypatch.setattr(settings, "SNAPSHOTS_ENABLED", False)
+    monkeypatch.setattr(settings, "STATISTICS_ROLLUP_ENABLED", False)
+
     def override_get_db():
         try:
             yield db
@@ -185,11 +197,8 @@ def create_trade_fixture(db: Session, create_portfolio_fixture):
             "currency": currency,
             "notes": notes,
         }
-        trade = Trade(**trade_data)
-        db.add(trade)
-        db.commit()
-        db.refresh(trade)
-        return trade
+        # Through the crud layer so the portfolio's open lots stay up to date
+        return trade_crud.create_trade(session=db, trade_data=trade_data)
 
     return _create_trade
 
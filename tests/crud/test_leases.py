@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from app.crud.leases import acquire_lease
+
+
+def test_acquire_lease(db: Session):
+    hour = timedelta(hours=1)
+    assert acquire_lease(db, "statistics_rollup", "worker-1", hour)
+    assert not acquire_lease(db, "statistics_rollup", "worker-2", hour)
+    # Renewed by its holder, and independent of other jobs
+    assert acquire_lease(db, "statistics_rollup", "worker-1", hour)
+    assert acquire_lease(db, "snapshot_fill", "worker-2", hour)
+
+
+def test_acquire_expired_lease(db: Session):
+    assert acquire_lease(db, "statistics_rollup", "worker-1", timedelta(seconds=-1))
+    assert acquire_lease(db, "statistics_rollup", "worker-2", timedelta(hours=1))
+    assert not acquire_lease(db, "statistics_rollup", "worker-1", timedelta(hours=1))
@@ -0,0 +1,350 @@
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+
+from app.crud.lots import (
+    get_held_tickers,
+    get_open_lots,
+    get_realized_totals,
+    match_trade,
+    rebuild_lots,
+)
+from app.crud.trades import delete_trade, update_trade
+from app.models.lots import RealizedLot
+from app.models.trades import ActionType
+from app.schemas.metrics import RealizedPLGrouping
+
+
+def _lots(db: Session, portfolio_id: str):
+    return [
+        (lot.ticker, float(lot.quantity), float(lot.price))
+        for lot in get_open_lots(session=db, portfolio_id=uuid.UUID(portfolio_id))
+    ]
+
+
+def test_trades_open_and_close_lots_fifo(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=110.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=12.0,
+        execution_timestamp=datetime(2024, 1, 3),
+    )
+
+    assert _lots(db, portfolio.id) == [("AAPL", 3.0, 110.0)]
+
+
+def test_backdated_trade_rebuilds_lots(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=110.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 1, 3),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+
+    assert _lots(db, portfolio.id) == [("AAPL", 5.0, 100.0), ("AAPL", 5.0, 110.0)]
+
+
+def test_sell_without_open_lots_opens_short_lot(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=4.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    assert _lots(db, portfolio.id) == [("AAPL", -4.0, 120.0)]
+
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+    assert _lots(db, portfolio.id) == [("AAPL", 6.0, 100.0)]
+
+
+def test_update_and_delete_trade_rebuild_lots(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    buy = create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    sell = create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=4.0,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+
+    update_trade(session=db, trade=sell, updates={"quantity": 6.0})
+    assert _lots(db, portfolio.id) == [("AAPL", 4.0, 100.0)]
+
+    update_trade(session=db, trade=buy, updates={"ticker": "MSFT"})
+    assert _lots(db, portfolio.id) == [("AAPL", -6.0, 120.0), ("MSFT", 10.0, 100.0)]
+
+    delete_trade(session=db, trade=sell)
+    assert _lots(db, portfolio.id) == [("MSFT", 10.0, 100.0)]
+
+
+def test_rebuild_lots_is_idempotent(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    for day, action in [(1, ActionType.BUY), (2, ActionType.BUY), (3, ActionType.SELL)]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            quantity=3.0,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+    lots = _lots(db, portfolio.id)
+
+    rebuild_lots(session=db, portfolio_id=portfolio.id, ticker="AAPL")
+
+    assert _lots(db, portfolio.id) == lots == [("AAPL", 3.0, 150.0)]
+
+
+def _realized(db: Session, portfolio_id: str):
+    return sorted(
+        (lot.ticker, float(lot.quantity), float(lot.realized_pl))
+        for lot in db.query(RealizedLot).filter_by(portfolio_id=portfolio_id)
+    )
+
+
+def test_trades_record_realized_lots(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    for day, ticker, action, price, quantity in [
+        (1, "AAPL", ActionType.BUY, 100.0, 10.0),
+        (2, "AAPL", ActionType.BUY, 110.0, 10.0),
+        (3, "AAPL", ActionType.SELL, 120.0, 15.0),
+        (4, "MSFT", ActionType.SELL, 300.0, 2.0),
+        (5, "MSFT", ActionType.BUY, 280.0, 1.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            ticker=ticker,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+
+    assert _realized(db, portfolio.id) == [
+        ("AAPL", 5.0, 50.0),
+        ("AAPL", 10.0, 200.0),
+        # Covering half of a short
+        ("MSFT", -1.0, 20.0),
+    ]
+
+
+def test_match_trade_is_linear_in_lot_count():
+    def trade(i, action, quantity):
+        return SimpleNamespace(
+            id=str(i),
+            portfolio_id="p",
+            ticker="AAPL",
+            action=action,
+            price=100.0,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, 1) + timedelta(minutes=i),
+        )
+
+    trades = [trade(i, ActionType.BUY, 1.0) for i in range(50_000)] + [
+        trade(50_000 + i, ActionType.SELL, 2.0) for i in range(25_000)
+    ]
+    lots = deque()
+    realized = []
+
+    start = time.perf_counter()
+    for t in trades:
+        for lot in match_trade(lots, t, realized):
+            if lot.quantity == 0:
+                lots.remove(lot)
+            else:
+                lots.append(lot)
+    elapsed = time.perf_counter() - start
+
+    assert len(realized) == 50_000 and not lots
+    assert realized[0].holding_period_days == 34
+    assert sum(lot.quantity for lot in realized) == Decimal(50_000)
+    assert elapsed < 10
+
+
+def test_trade_changes_rebuild_realized_lots(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    sell = create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=4.0,
+        execution_timestamp=datetime(2024, 1, 3),
+    )
+    # Backdated before the sell, which now closes this lot first
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=90.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2023, 12, 1),
+    )
+    assert _realized(db, portfolio.id) == [("AAPL", 4.0, 120.0)]
+
+    update_trade(session=db, trade=sell, updates={"quantity": 12.0})
+    assert _realized(db, portfolio.id) == [("AAPL", 2.0, 40.0), ("AAPL", 10.0, 300.0)]
+
+    delete_trade(session=db, trade=sell)
+    assert _realized(db, portfolio.id) == []
+
+
+def test_get_realized_totals_by_period(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    for timestamp, ticker, action, price in [
+        (datetime(2023, 11, 1), "AAPL", ActionType.BUY, 100.0),
+        (datetime(2023, 12, 1), "AAPL", ActionType.SELL, 110.0),
+        (datetime(2024, 1, 1), "MSFT", ActionType.BUY, 100.0),
+        (datetime(2024, 3, 5), "MSFT", ActionType.SELL, 90.0),
+        (datetime(2024, 3, 6), "AAPL", ActionType.BUY, 100.0),
+        (datetime(2024, 3, 7), "AAPL", ActionType.SELL, 130.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            ticker=ticker,
+            action=action,
+            price=price,
+            quantity=1.0,
+            execution_timestamp=timestamp,
+        )
+
+    def totals(group_by, **filters):
+        return [
+            (*group, float(pl), float(quantity), count)
+            for *group, pl, quantity, count in get_realized_totals(
+                db, group_by, portfolio_id=portfolio.id, **filters
+            )
+        ]
+
+    assert totals(RealizedPLGrouping.TICKER) == [
+        ("AAPL", 40.0, 2.0, 2),
+        ("MSFT", -10.0, 1.0, 1),
+    ]
+    assert totals(RealizedPLGrouping.YEAR) == [
+        (2023, 10.0, 1.0, 1),
+        (2024, 20.0, 2.0, 2),
+    ]
+    assert totals(RealizedPLGrouping.MONTH, start=datetime(2024, 1, 1)) == [
+        (2024, 3, 20.0, 2.0, 2)
+    ]
+
+
+def test_get_held_tickers(db: Session, create_portfolio_fixture, create_trade_fixture):
+    portfolio = create_portfolio_fixture()
+    other_portfolio = create_portfolio_fixture()
+    create_trade_fixture(portfolio_id=portfolio.id, ticker="AAPL", quantity=10.0)
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        ticker="AAPL",
+        action=ActionType.SELL,
+        quantity=10.0,
+    )
+    create_trade_fixture(portfolio_id=portfolio.id, ticker="MSFT", quantity=5.0)
+    # A long in one portfolio and a short in another don't cancel out
+    create_trade_fixture(
+        portfolio_id=other_portfolio.id,
+        ticker="MSFT",
+        action=ActionType.SELL,
+        quantity=5.0,
+    )
+    create_trade_fixture(portfolio_id=other_portfolio.id, ticker="GOOGL", quantity=1.0)
+
+    assert sorted(get_held_tickers(session=db)) == ["GOOGL", "MSFT"]
+
+
+def test_trade_changes_lock_portfolio_and_lots(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(portfolio_id=portfolio.id, quantity=10.0)
+    statements = []
+
+    @event.listens_for(db, "do_orm_execute")
+    def record(orm_execute_state):
+        if orm_execute_state.is_select:
+            statements.append(
+                str(orm_execute_state.statement.compile(dialect=mysql.dialect()))
+            )
+
+    # SQLite has no row locks: check the statements MySQL would run
+    create_trade_fixture(
+        portfolio_id=portfolio.id, action=ActionType.SELL, quantity=4.0
+    )
+    event.remove(db, "do_orm_execute", record)
+
+    lock = (
+        "SELECT portfolios.id \nFROM portfolios \nWHERE portfolios.id = %s FOR UPDATE"
+    )
+    reads = [
+        statement
+        for statement in statements
+        if "FROM open_lots" in statement or "count(*)" in statement
+    ]
+    assert statements.index(lock) < statements.index(reads[0])
+    assert len(reads) == 2
+    assert all(statement.endswith("FOR UPDATE") for statement in reads)
@@ -0,0 +1,79 @@
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from app.crud.prices import (
+    get_price_date_range,
+    get_daily_prices,
+    create_daily_prices,
+)
+
+
+def make_bar(ticker: str, day: date, close: float) -> dict:
+    return {
+        "ticker": ticker,
+        "date": day,
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1000,
+    }
+
+
+def test_create_and_get_daily_prices(db: Session):
+    create_daily_prices(
+        session=db,
+        prices_data=[
+            make_bar("AAPL", date(2024, 1, 2), 150.0),
+            make_bar("AAPL", date(2024, 1, 3), 151.0),
+            make_bar("AAPL", date(2024, 1, 4), 152.0),
+            make_bar("MSFT", date(2024, 1, 3), 300.0),
+        ],
+    )
+    prices = get_daily_prices(
+        session=db,
+        ticker="AAPL",
+        start_date=date(2024, 1, 3),
+        end_date=date(2024, 1, 4),
+    )
+    assert [price.date for price in prices] == [date(2024, 1, 3), date(2024, 1, 4)]
+    assert prices[0].close == 151.0
+
+
+def test_get_price_date_range(db: Session):
+    create_daily_prices(
+        session=db,
+        prices_data=[
+            make_bar("AAPL", date(2024, 1, 2), 150.0),
+            make_bar("AAPL", date(2024, 1, 4), 152.0),
+        ],
+    )
+    assert get_price_date_range(session=db, ticker="AAPL") == (
+        date(2024, 1, 2),
+        date(2024, 1, 4),
+    )
+
+
+def test_get_price_date_range_empty(db: Session):
+    assert get_price_date_range(session=db, ticker="AAPL") == (None, None)
+
+
+def test_create_daily_prices_skips_stored_bars(db: Session):
+    create_daily_prices(
+        session=db, prices_data=[make_bar("AAPL", date(2024, 1, 2), 150.0)]
+    )
+    create_daily_prices(
+        session=db,
+        prices_data=[
+            make_bar("AAPL", date(2024, 1, 2), 999.0),
+            make_bar("AAPL", date(2024, 1, 3), 151.0),
+        ],
+    )
+    prices = get_daily_prices(
+        session=db,
+        ticker="AAPL",
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 1, 3),
+    )
+    assert [price.close for price in prices] == [150, 151]
@@ -8,6 +8,8 @@ from app.crud.trades import (
     create_trade,
     update_trade,
     delete_trade,
+    get_position_aggregates,
+    stream_trades,
 )
 from app.models.trades import Trade, ActionType
 
@@ -103,3 +105,59 @@ def test_get_trades_by_portfolio_empty(db: Session, create_portfolio_fixture):
     portfolio = create_portfolio_fixture()
     trades = get_trades_by_portfolio(session=db, portfolio_id=uuid.UUID(portfolio.id))
     assert len(trades) == 0
+
+
+def test_get_position_aggregates(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    for day, action, ticker, price, quantity in [
+        (2, ActionType.BUY, "AAPL", 100.0, 10.0),
+        (3, ActionType.BUY, "AAPL", 130.0, 10.0),
+        (4, ActionType.SELL, "AAPL", 120.0, 15.0),
+        (1, ActionType.BUY, "MSFT", 300.0, 2.0),
+        (5, ActionType.SELL, "MSFT", 310.0, 2.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            ticker=ticker,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day),
+        )
+
+    aggregates = {
+        ticker: (float(quantity), float(buy_value), float(buy_quantity), first_buy)
+        for ticker, quantity, buy_value, buy_quantity, first_buy in (
+            get_position_aggregates(session=db, portfolio_id=uuid.UUID(portfolio.id))
+        )
+    }
+
+    assert aggregates == {
+        "AAPL": (5.0, 2300.0, 20.0, datetime(2024, 1, 2)),
+        "MSFT": (0.0, 600.0, 2.0, datetime(2024, 1, 1)),
+    }
+
+
+def test_stream_trades_in_execution_order(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    sell = create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+    late_buy = create_trade_fixture(
+        portfolio_id=portfolio.id, execution_timestamp=datetime(2024, 1, 3)
+    )
+    same_time_buy = create_trade_fixture(
+        portfolio_id=portfolio.id, execution_timestamp=datetime(2024, 1, 2)
+    )
+
+    rows = list(
+        stream_trades(session=db, portfolio_id=uuid.UUID(portfolio.id), batch_size=2)
+    )
+
+    assert [row.id for row in rows] == [same_time_buy.id, sell.id, late_buy.id]
@@ -3,7 +3,12 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 
 from app.schemas.cash_actions import CashActionCreate, CashActionUpdate
-from app.services.cash_actions import create_cash_action, update_cash_action
+from app.models.trades import ActionType
+from app.services.cash_actions import (
+    calculate_cash_balance,
+    create_cash_action,
+    update_cash_action,
+)
 
 
 def test_create_cash_action_success(db: Session, create_portfolio_fixture):
@@ -49,3 +54,40 @@ def test_update_cash_action_partial(db: Session, create_cash_action_fixture):
 
     assert updated_cash_action.amount == 2000.0  # Amount should remain the same
     assert updated_cash_action.notes == "Withdrawal adjustment"
+
+
+def test_calculate_cash_balance_as_of(
+    db: Session,
+    create_portfolio_fixture,
+    create_cash_action_fixture,
+    create_trade_fixture,
+):
+    portfolio = create_portfolio_fixture()
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        amount=5000.0,
+        execution_timestamp=datetime(2024, 1, 1),
+    )
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        action="withdrawal",
+        amount=500.0,
+        execution_timestamp=datetime(2024, 3, 1),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=10.0,
+        execution_timestamp=datetime(2024, 1, 2),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=120.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 2, 1),
+    )
+
+    assert calculate_cash_balance(db, portfolio.id) == 4100.0
+    assert calculate_cash_balance(db, portfolio.id, datetime(2024, 1, 15)) == 4000.0
+    assert calculate_cash_balance(db, portfolio.id, datetime(2023, 12, 31)) == 0.0
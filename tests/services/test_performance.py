@@ -0,0 +1,309 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.crud.cash_actions import create_cash_action
+from app.models.cash_actions import CashActionType
+from app.models.trades import ActionType
+from app.services import performance as performance_service
+from app.services import prices as price_service
+from app.utils import market_data
+
+# Closes of AAPL on the business days of the first week of 2024
+CLOSES = {
+    date(2024, 1, 2): 100.0,
+    date(2024, 1, 3): 110.0,
+    date(2024, 1, 4): 99.0,
+    date(2024, 1, 5): 121.0,
+}
+
+
+@pytest.fixture(autouse=True)
+def aapl_bars(mocker):
+    def fetch(ticker: str, start_date: date, end_date: date) -> list:
+        return [
+            {
+                "ticker": ticker,
+                "date": day,
+                "open": None,
+                "high": None,
+                "low": None,
+                "close": close,
+                "volume": None,
+            }
+            for day, close in CLOSES.items()
+            if start_date <= day <= end_date
+        ]
+
+    price_service._synced.clear()
+    performance_service.value_series.clear()
+    performance_service.benchmark_returns.clear()
+    yield mocker.patch.object(market_data, "fetch_daily_bars", side_effect=fetch)
+    price_service._synced.clear()
+    performance_service.value_series.clear()
+    performance_service.benchmark_returns.clear()
+
+
+def test_build_value_series(
+    db: Session,
+    create_portfolio_fixture,
+    create_trade_fixture,
+    create_cash_action_fixture,
+):
+    portfolio = create_portfolio_fixture()
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        amount=1000.0,
+        execution_timestamp=datetime(2024, 1, 2, 9),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 1, 2, 10),
+    )
+    # Over the weekend, valued from Monday on
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        amount=500.0,
+        execution_timestamp=datetime(2024, 1, 6, 9),
+    )
+
+    series = performance_service.build_value_series(db, portfolio.id, date(2024, 1, 8))
+
+    assert series.dates.tolist() == [
+        date(2024, 1, 1),
+        date(2024, 1, 2),
+        date(2024, 1, 3),
+        date(2024, 1, 4),
+        date(2024, 1, 5),
+        date(2024, 1, 8),
+    ]
+    assert series.values.tolist() == [0, 1000, 1050, 995, 1105, 1605]
+    assert series.flows.tolist() == [0, 1000, 0, 0, 0, 500]
+
+
+def test_build_value_series_covers_purchases_without_cash(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        price=100.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 1, 2, 10),
+    )
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        price=110.0,
+        quantity=5.0,
+        execution_timestamp=datetime(2024, 1, 3, 10),
+    )
+
+    series = performance_service.build_value_series(db, portfolio.id, date(2024, 1, 4))
+
+    assert series.values.tolist() == [0, 500, 550, 550]
+    assert series.flows.tolist() == [0, 500, 0, 0]
+    dates, returns = performance_service.daily_returns(series)
+    assert dates.tolist() == [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+    assert returns.tolist() == pytest.approx([0.0, 0.1, 0.0])
+
+
+def test_compute_performance():
+    dates = np.arange("2024-01-02", "2024-01-06", dtype="datetime64[D]")
+    returns = np.array([0.1, -0.2, 0.05, 0.1])
+
+    metrics = performance_service.compute_performance(dates, returns)
+
+    assert metrics.start_date == date(2024, 1, 2)
+    assert metrics.end_date == date(2024, 1, 5)
+    assert metrics.trading_days == 4
+    assert metrics.total_return == pytest.approx(1.1 * 0.8 * 1.05 * 1.1 - 1)
+    assert metrics.annualized_return == pytest.approx(
+        (1.1 * 0.8 * 1.05 * 1.1) ** (252 / 4) - 1
+    )
+    assert metrics.volatility == pytest.approx(returns.std(ddof=1) * np.sqrt(252))
+    assert metrics.sharpe_ratio == pytest.approx(
+        returns.mean() / returns.std(ddof=1) * np.sqrt(252)
+    )
+    assert metrics.sortino_ratio == pytest.approx(
+        returns.mean() / np.sqrt(0.2**2 / 4) * np.sqrt(252)
+    )
+    # From the peak after the first day down to the end of the second
+    assert metrics.max_drawdown == pytest.approx(-0.2)
+
+
+def test_compute_performance_without_returns():
+    metrics = performance_service.compute_performance(
+        np.array([], dtype="datetime64[D]"), np.array([])
+    )
+    assert metrics.trading_days == 0
+    assert metrics.sharpe_ratio is None
+
+
+def test_compute_performance_after_losing_everything():
+    dates = np.arange("2024-01-02", "2024-01-05", dtype="datetime64[D]")
+    # A short position losing more than the portfolio was worth
+    returns = np.array([0.5, -1.5, 0.2])
+
+    metrics = performance_service.compute_performance(dates, returns)
+
+    assert metrics.total_return == pytest.approx(1.5 * -0.5 * 1.2 - 1)
+    assert metrics.annualized_return is None
+    assert metrics.sharpe_ratio is not None
+    # Serializes without NaN
+    assert "NaN" not in metrics.model_dump_json()
+
+
+def test_value_series_is_cached_per_version(
+    db: Session, mocker, create_portfolio_fixture, create_cash_action_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_cash_action_fixture(
+        portfolio_id=portfolio.id,
+        execution_timestamp=datetime.utcnow() - timedelta(days=10),
+    )
+    build = mocker.spy(performance_service, "build_value_series")
+
+    db.refresh(portfolio)
+    first = performance_service.get_value_series(db, portfolio)
+    assert performance_service.get_value_series(db, portfolio) is first
+    assert build.call_count == 1
+
+    create_cash_action(
+        db,
+        {
+            "portfolio_id": portfolio.id,
+            "action": CashActionType.DEPOSIT,
+            "amount": 500.0,
+            "execution_timestamp": datetime.utcnow() - timedelta(days=5),
+            "currency": "USD",
+        },
+    )
+    assert portfolio.version == 1
+    assert performance_service.get_value_series(db, portfolio) is not first
+    assert build.call_count == 2
+
+
+def test_value_series_is_cached_once_prices_are_in(
+    db: Session, mocker, aapl_bars, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        execution_timestamp=datetime.utcnow() - timedelta(days=10),
+    )
+    db.refresh(portfolio)
+    build = mocker.spy(performance_service, "build_value_series")
+    fetch = aapl_bars.side_effect
+    aapl_bars.side_effect = ConnectionError("provider down")
+
+    # Valued at the trade price for now, and tried again on the next request
+    first = performance_service.get_value_series(db, portfolio)
+    assert not first.complete
+    aapl_bars.side_effect = fetch
+    second = performance_service.get_value_series(db, portfolio)
+    assert second.complete
+    assert performance_service.get_value_series(db, portfolio) is second
+    assert build.call_count == 2
+
+
+def test_compute_benchmark_metrics():
+    index_returns = np.array([0.01, -0.02, 0.015, 0.005, -0.01])
+    returns = 0.001 + 1.5 * index_returns
+
+    metrics = performance_service.compute_benchmark_metrics(returns, index_returns)
+
+    assert metrics.ticker == "SPY"
+    assert metrics.alpha == pytest.approx(0.001 * 252)
+    assert metrics.beta == pytest.approx(1.5)
+    assert metrics.correlation == pytest.approx(1.0)
+    active = returns - index_returns
+    assert metrics.tracking_error == pytest.approx(active.std(ddof=1) * np.sqrt(252))
+    assert metrics.information_ratio == pytest.approx(
+        active.mean() / active.std(ddof=1) * np.sqrt(252)
+    )
+
+
+def test_compute_benchmark_metrics_without_index_moves():
+    metrics = performance_service.compute_benchmark_metrics(
+        np.array([0.01, 0.02]), np.array([0.0, 0.0])
+    )
+    assert metrics.beta is None
+    assert metrics.tracking_error is None
+
+
+def business_day_bars(ticker: str, start_date: date, end_date: date) -> list:
+    """The same closes for every ticker, so SPY and AAPL move alike."""
+    return [
+        {
+            "ticker": ticker,
+            "date": day,
+            "open": None,
+            "high": None,
+            "low": None,
+            "close": 100.0 + day.toordinal() % 7,
+            "volume": None,
+        }
+        for day in (
+            start_date + timedelta(days=offset)
+            for offset in range((end_date - start_date).days + 1)
+        )
+        if day.weekday() < 5
+    ]
+
+
+def test_get_performance_against_benchmark(
+    db: Session, mocker, create_portfolio_fixture, create_trade_fixture
+):
+    mocker.patch.object(market_data, "fetch_daily_bars", side_effect=business_day_bars)
+    build = mocker.spy(performance_service, "build_benchmark_returns")
+    start_date = datetime.utcnow() - timedelta(days=30)
+    portfolios = [create_portfolio_fixture() for _ in range(2)]
+    for portfolio in portfolios:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            execution_timestamp=datetime.utcnow() - timedelta(days=40),
+        )
+        db.refresh(portfolio)
+        metrics = performance_service.get_performance(db, portfolio, start_date)
+
+        assert metrics.benchmark.beta == pytest.approx(1.0)
+        assert metrics.benchmark.correlation == pytest.approx(1.0)
+        assert metrics.benchmark.alpha == pytest.approx(0.0, abs=1e-9)
+        assert metrics.benchmark.tracking_error == pytest.approx(0.0, abs=1e-9)
+        assert metrics.benchmark.information_ratio is None
+
+    # Shared by both portfolios
+    assert build.call_count == 1
+
+
+def test_benchmark_returns_are_cached_once_up_to_date(db: Session, mocker):
+    end_day = datetime.utcnow().date() - timedelta(days=1)
+    start_day = end_day - timedelta(days=30)
+    last_business_day = np.busday_offset(
+        np.datetime64(end_day, "D"), 0, roll="backward"
+    )
+    key = f"SPY:{end_day.isoformat()}"
+    # The provider lags a week behind
+    stale_day = end_day - timedelta(days=7)
+    mocker.patch.object(
+        market_data,
+        "fetch_daily_bars",
+        side_effect=lambda ticker, start_date, end_date: business_day_bars(
+            ticker, start_date, min(end_date, stale_day)
+        ),
+    )
+
+    dates, _ = performance_service.get_benchmark_returns(db, start_day, end_day)
+    assert dates[-1] <= np.datetime64(stale_day, "D")
+    assert performance_service.benchmark_returns.get(key) is None
+
+    mocker.patch.object(market_data, "fetch_daily_bars", side_effect=business_day_bars)
+    price_service._synced.clear()
+    dates, _ = performance_service.get_benchmark_returns(db, start_day, end_day)
+    assert dates[-1] == last_business_day
+    assert performance_service.benchmark_returns.get(key) is not None
@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.prices import DailyPrice
+from app.services import prices as price_service
+from app.utils import market_data
+
+
+@pytest.fixture(autouse=True)
+def clear_sync_state():
+    price_service._synced.clear()
+    price_service.historical_closes.clear()
+    yield
+    price_service._synced.clear()
+    price_service.historical_closes.clear()
+
+
+def fake_bars(ticker: str, start_date: date, end_date: date) -> list:
+    bars = []
+    day = start_date
+    while day <= end_date:
+        bars.append(
+            {
+                "ticker": ticker,
+                "date": day,
+                "open": 100.0,
+                "high": 100.0,
+                "low": 100.0,
+                "close": 100.0,
+                "volume": 1000,
+            }
+        )
+        day += timedelta(days=1)
+    return bars
+
+
+def test_get_price_history_backfills_store(db: Session, mocker):
+    fetch = mocker.patch.object(market_data, "fetch_daily_bars", side_effect=fake_bars)
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    start_date = yesterday - timedelta(days=9)
+
+    prices = price_service.get_price_history(db, "AAPL", start_date)
+
+    assert len(prices) == 10
+    fetch.assert_called_once_with("AAPL", start_date, yesterday)
+
+
+def test_get_price_history_fetches_only_missing_days(db: Session, mocker):
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    start_date = yesterday - timedelta(days=9)
+    mocker.patch.object(market_data, "fetch_daily_bars", side_effect=fake_bars)
+    price_service.get_price_history(db, "AAPL", start_date)
+    db.query(DailyPrice).filter(
+        DailyPrice.date > yesterday - timedelta(days=3)
+    ).delete()
+    price_service._synced.clear()
+
+    fetch = mocker.patch.object(market_data, "fetch_daily_bars", side_effect=fake_bars)
+    prices = price_service.get_price_history(db, "AAPL", start_date)
+
+    assert len(prices) == 10
+    fetch.assert_called_once_with("AAPL", yesterday - timedelta(days=2), yesterday)
+
+
+def test_get_price_history_repeated_reads_stay_local(db: Session, mocker):
+    fetch = mocker.patch.object(market_data, "fetch_daily_bars", side_effect=fake_bars)
+    start_date = datetime.utcnow().date() - timedelta(days=30)
+
+    price_service.get_price_history(db, "AAPL", start_date)
+    price_service.get_price_history(db, "AAPL", start_date + timedelta(days=5))
+
+    assert fetch.call_count == 1
+
+
+def test_get_closes_on_uses_last_trading_day_and_caches(db: Session, mocker):
+    fetch = mocker.patch.object(market_data, "fetch_daily_bars", return_value=[])
+    db.add(DailyPrice(ticker="AAPL", date=date(2024, 1, 5), close=150.0))
+    db.commit()
+
+    # Sunday: the close is Friday's
+    closes = price_service.get_closes_on(db, ["AAPL", "MSFT"], date(2024, 1, 7))
+    assert closes == {"AAPL": 150.0}
+
+    db.query(DailyPrice).delete()
+    fetch.reset_mock()
+    closes = price_service.get_closes_on(db, ["AAPL"], date(2024, 1, 7))
+    assert closes == {"AAPL": 150.0}
+    fetch.assert_not_called()
+
+
+def test_get_closes_on_with_bars_stored_concurrently(db: Session, mocker):
+    def fetch_after_another_worker(ticker, start_date, end_date):
+        # Another worker stores one of the days while this one downloads
+        db.add(DailyPrice(ticker=ticker, date=end_date, close=100.0))
+        db.commit()
+        return fake_bars(ticker, start_date, end_date)
+
+    mocker.patch.object(
+        market_data, "fetch_daily_bars", side_effect=fetch_after_another_worker
+    )
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+
+    closes = price_service.get_closes_on(db, ["AAPL"], yesterday)
+
+    assert closes == {"AAPL": 100.0}
+    assert (
+        len(price_service.get_price_history(db, "AAPL", yesterday - timedelta(days=7)))
+        == 8
+    )
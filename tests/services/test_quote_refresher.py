@@ -0,0 +1,29 @@
+from sqlalchemy.orm import Session
+
+from app.models.trades import ActionType
+from app.services.quote_refresher import refresh_held_quotes
+from app.utils import market_data
+
+
+def test_refresh_held_quotes(db: Session, mocker, create_trade_fixture):
+    trade = create_trade_fixture(ticker="AAPL", quantity=10.0)
+    create_trade_fixture(
+        portfolio_id=trade.portfolio_id,
+        ticker="MSFT",
+        quantity=10.0,
+    )
+    create_trade_fixture(
+        portfolio_id=trade.portfolio_id,
+        ticker="MSFT",
+        action=ActionType.SELL,
+        quantity=10.0,
+    )
+    fetch = mocker.patch.object(
+        market_data, "_fetch_current_prices", return_value={"AAPL": 150.0}
+    )
+    market_data.quote_cache.clear()
+
+    assert refresh_held_quotes(db) == 1
+
+    fetch.assert_called_once_with(["AAPL"])
+    assert market_data.quote_cache.get("AAPL") == 150.0
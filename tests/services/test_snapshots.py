@@ -0,0 +1,235 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+import app.services.snapshots as snapshot_service
+from app.crud.portfolios import increment_version
+from app.crud.snapshots import get_snapshots
+from app.crud.trades import delete_trade
+from app.models.trades import ActionType
+from app.services import prices as price_service
+from app.services.snapshots import (
+    fill_all_snapshots,
+    fill_snapshots,
+    get_positions_as_of,
+)
+from app.utils import market_data
+
+
+@pytest.fixture(autouse=True)
+def weekday_bars(mocker):
+    """Bars on weekdays only, closing at 100 plus the day of the month."""
+
+    def fetch(ticker: str, start_date: date, end_date: date) -> list:
+        days = (
+            start_date + timedelta(days=n)
+            for n in range((end_date - start_date).days + 1)
+        )
+        return [
+            {
+                "ticker": ticker,
+                "date": day,
+                "open": None,
+                "high": None,
+                "low": None,
+                "close": 100.0 + day.day,
+                "volume": None,
+            }
+            for day in days
+            if day.weekday() < 5
+        ]
+
+    price_service._synced.clear()
+    yield mocker.patch.object(market_data, "fetch_daily_bars", side_effect=fetch)
+    price_service._synced.clear()
+
+
+@pytest.fixture
+def portfolio(create_portfolio_fixture, create_trade_fixture):
+    portfolio = create_portfolio_fixture()
+    for day, action, price, quantity in [
+        (2, ActionType.BUY, 100.0, 10.0),
+        (4, ActionType.BUY, 110.0, 5.0),
+        (5, ActionType.SELL, 120.0, 12.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day, 15),
+        )
+    return portfolio
+
+
+def _snapshots(db: Session, portfolio, day: int):
+    """The snapshot lots of a day summed up per ticker."""
+    positions = {}
+    for s in get_snapshots(db, portfolio.id, date(2024, 1, day)):
+        quantity, cost_basis, _ = positions.get(s.ticker, (0.0, 0.0, None))
+        positions[s.ticker] = (
+            quantity + float(s.quantity),
+            cost_basis + float(s.price * s.quantity),
+            float(s.close_price),
+        )
+    return [(ticker, *position) for ticker, position in positions.items()]
+
+
+def test_fill_snapshots_on_days_with_trades(db: Session, portfolio):
+    # One per open lot on each day with trades
+    assert fill_snapshots(db, portfolio, date(2024, 1, 6)) == 4
+
+    assert get_snapshots(db, portfolio.id, date(2024, 1, 1)) == []
+    assert _snapshots(db, portfolio, 2) == [("AAPL", 10.0, 1000.0, 102.0)]
+    # Unchanged lots are not stored again
+    assert get_snapshots(db, portfolio.id, date(2024, 1, 3)) == []
+    assert _snapshots(db, portfolio, 4) == [("AAPL", 15.0, 1550.0, 104.0)]
+    # FIFO: the sell closed the first lot and 2 of the second
+    assert _snapshots(db, portfolio, 5) == [("AAPL", 3.0, 330.0, 105.0)]
+    assert get_snapshots(db, portfolio.id, date(2024, 1, 6)) == []
+    assert portfolio.snapshots_through == date(2024, 1, 6)
+
+
+def test_fill_snapshots_continues_from_last_day(db: Session, portfolio):
+    fill_snapshots(db, portfolio, date(2024, 1, 3))
+
+    assert fill_snapshots(db, portfolio, date(2024, 1, 3)) == 0
+    assert fill_all_snapshots(db, through=date(2024, 1, 8)) == 3
+    assert _snapshots(db, portfolio, 5) == [("AAPL", 3.0, 330.0, 105.0)]
+    assert portfolio.snapshots_through == date(2024, 1, 8)
+
+
+def test_fill_snapshots_reads_and_writes_in_batches(
+    db: Session, mocker, create_portfolio_fixture, create_trade_fixture
+):
+    mocker.patch.object(snapshot_service, "SNAPSHOT_TRADES_PER_READ", 2)
+    create_snapshots = snapshot_service.snapshot_crud.create_snapshots
+    mocker.patch.object(
+        snapshot_service.snapshot_crud,
+        "create_snapshots",
+        side_effect=lambda *args: create_snapshots(*args, batch_size=3),
+    )
+    portfolio = create_portfolio_fixture()
+    for day in range(1, 6):
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            price=100.0,
+            quantity=1.0,
+            execution_timestamp=datetime(2024, 1, day, 15),
+        )
+
+    # 1 + 2 + ... + 5 lots
+    assert fill_snapshots(db, portfolio, date(2024, 1, 6)) == 15
+    assert _snapshots(db, portfolio, 5) == [("AAPL", 5.0, 500.0, 105.0)]
+    assert [
+        p.quantity for p in get_positions_as_of(db, portfolio.id, date(2024, 1, 6))
+    ] == [5]
+
+
+def test_trade_changes_invalidate_snapshots(
+    db: Session, portfolio, create_trade_fixture
+):
+    fill_snapshots(db, portfolio, date(2024, 1, 6))
+
+    trade = create_trade_fixture(
+        portfolio_id=portfolio.id,
+        ticker="MSFT",
+        price=300.0,
+        quantity=1.0,
+        execution_timestamp=datetime(2024, 1, 3, 15),
+    )
+    db.refresh(portfolio)
+    assert portfolio.snapshots_through == date(2024, 1, 2)
+    assert get_snapshots(db, portfolio.id, date(2024, 1, 3)) == []
+    assert _snapshots(db, portfolio, 2) == [("AAPL", 10.0, 1000.0, 102.0)]
+
+    fill_all_snapshots(db, through=date(2024, 1, 6))
+    assert _snapshots(db, portfolio, 3) == [
+        ("AAPL", 10.0, 1000.0, 103.0),
+        ("MSFT", 1.0, 300.0, 103.0),
+    ]
+    assert _snapshots(db, portfolio, 5) == [
+        ("AAPL", 3.0, 330.0, 105.0),
+        ("MSFT", 1.0, 300.0, 105.0),
+    ]
+
+    delete_trade(db, trade)
+    db.refresh(portfolio)
+    assert portfolio.snapshots_through == date(2024, 1, 2)
+
+
+def test_get_positions_as_of(db: Session, portfolio):
+    without_snapshots = get_positions_as_of(db, portfolio.id, date(2024, 1, 5))
+    fill_snapshots(db, portfolio, date(2024, 1, 6))
+
+    end_of_day = get_positions_as_of(db, portfolio.id, date(2024, 1, 5))
+    assert end_of_day == without_snapshots
+    assert [(p.ticker, p.quantity, p.cost_basis) for p in end_of_day] == [
+        ("AAPL", 3, 330)
+    ]
+    assert end_of_day[0].entry_date == datetime(2024, 1, 4, 15)
+
+    before_sell = get_positions_as_of(db, portfolio.id, datetime(2024, 1, 5, 12))
+    assert [(p.ticker, p.quantity, p.cost_basis) for p in before_sell] == [
+        ("AAPL", 15, 1550)
+    ]
+    # Within a day, sells close the lots of the previous snapshot first-in
+    # first-out
+    after_sell = get_positions_as_of(db, portfolio.id, datetime(2024, 1, 5, 16))
+    assert [(p.ticker, p.quantity, p.cost_basis) for p in after_sell] == [
+        ("AAPL", 3, 330)
+    ]
+    assert after_sell[0].entry_date == datetime(2024, 1, 4, 15)
+
+    assert get_positions_as_of(db, portfolio.id, date(2024, 1, 1)) == []
+
+
+def test_get_positions_as_of_matches_full_replay(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    rng = random.Random(3)
+    for hour in range(0, 24 * 20, 5):
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=rng.choice([ActionType.BUY, ActionType.SELL]),
+            ticker=rng.choice(["AAPL", "MSFT"]),
+            price=float(rng.randint(90, 110)),
+            quantity=float(rng.randint(1, 10)),
+            execution_timestamp=datetime(2024, 1, 1) + timedelta(hours=hour),
+        )
+    times = [
+        datetime(2024, 1, 1) + timedelta(hours=hour) for hour in range(7, 24 * 21, 13)
+    ]
+    replayed = [get_positions_as_of(db, portfolio.id, as_of) for as_of in times]
+
+    # Filled part of the way, then past every trade
+    for through in (date(2024, 1, 9), date(2024, 1, 25)):
+        fill_snapshots(db, portfolio, through)
+        assert [
+            get_positions_as_of(db, portfolio.id, as_of) for as_of in times
+        ] == replayed
+
+
+def test_fill_snapshots_skips_portfolio_changed_meanwhile(
+    db: Session, mocker, portfolio
+):
+    close_lookup = snapshot_service._close_lookup
+
+    def look_up_during_trade_change(*args):
+        increment_version(db, portfolio.id)
+        return close_lookup(*args)
+
+    mocker.patch.object(
+        snapshot_service, "_close_lookup", side_effect=look_up_during_trade_change
+    )
+    # The test's data lives in the transaction a rollback would discard
+    rollback = mocker.patch.object(db, "rollback")
+
+    assert fill_snapshots(db, portfolio, date(2024, 1, 6)) == 0
+    rollback.assert_called_once()
+    db.expire(portfolio)
+    assert portfolio.snapshots_through is None
+    assert get_snapshots(db, portfolio.id, date(2024, 1, 2)) == []
@@ -0,0 +1,165 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+import app.services.statistics as statistics_service
+from app.crud.portfolios import increment_version
+from app.crud.statistics import get_daily_statistics
+from app.models.trades import ActionType
+from app.services.statistics import (
+    fill_all_daily_statistics,
+    fill_daily_statistics,
+    get_trade_metrics,
+)
+
+END = datetime(2024, 3, 1, 12)
+
+
+@pytest.fixture
+def portfolio(create_portfolio_fixture, create_trade_fixture):
+    """Two months of trades in two tickers, flat now and then."""
+    portfolio = create_portfolio_fixture()
+    rng = random.Random(7)
+    held = {"AAPL": 0, "MSFT": 0}
+    for hour in range(0, 24 * 58, 7):
+        ticker = rng.choice(list(held))
+        if held[ticker] and rng.random() < 0.5:
+            action = ActionType.SELL
+            quantity = rng.choice([held[ticker], rng.randint(1, held[ticker])])
+            held[ticker] -= quantity
+        else:
+            action = ActionType.BUY
+            quantity = rng.randint(1, 20)
+            held[ticker] += quantity
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            ticker=ticker,
+            price=float(rng.randint(90, 110)),
+            quantity=float(quantity),
+            execution_timestamp=datetime(2024, 1, 1, 3) + timedelta(hours=hour),
+        )
+    return portfolio
+
+
+START_DATES = {
+    "all": datetime.min,
+    "six_weeks": END - timedelta(weeks=6),
+    "month": END - timedelta(days=30),
+    "week": END - timedelta(weeks=1),
+    "day": END - timedelta(days=1),
+    "hour": END - timedelta(hours=1),
+}
+
+
+def test_get_trade_metrics_without_trades(db: Session, create_portfolio_fixture):
+    portfolio = create_portfolio_fixture()
+    metrics = get_trade_metrics(db, portfolio, {"all": datetime.min}, END)["all"]
+    assert metrics.average_trade_volume == 0
+    assert metrics.trade_frequency_days_per_trade is None
+    assert metrics.trade_frequency_trades_per_day == 0
+    assert metrics.average_holding_period_days is None
+    assert metrics.win_loss_ratio is None
+
+
+def test_get_trade_metrics_counts_lots_closed_in_window(
+    db: Session, create_portfolio_fixture, create_trade_fixture
+):
+    portfolio = create_portfolio_fixture()
+    for day, action, price, quantity in [
+        (1, ActionType.BUY, 100.0, 10.0),
+        (20, ActionType.BUY, 110.0, 10.0),
+        (25, ActionType.SELL, 120.0, 4.0),
+        (27, ActionType.SELL, 90.0, 12.0),
+    ]:
+        create_trade_fixture(
+            portfolio_id=portfolio.id,
+            action=action,
+            price=price,
+            quantity=quantity,
+            execution_timestamp=datetime(2024, 1, day, 12),
+        )
+
+    metrics = get_trade_metrics(
+        db, portfolio, {"week": datetime(2024, 1, 24)}, datetime(2024, 1, 31)
+    )["week"]
+
+    assert metrics.average_trade_volume == 8
+    assert metrics.trade_frequency_days_per_trade == 2
+    # The buy on the 1st is outside the window but its lots closed inside it:
+    # 24 days to the 25th, then 26 and 7 days to the 27th
+    assert metrics.average_holding_period_days == 19
+    assert metrics.win_loss_ratio == 0.5
+
+
+def test_rolled_up_days_give_the_same_metrics(db: Session, portfolio):
+    scanned = get_trade_metrics(db, portfolio, START_DATES, END)
+    assert scanned["all"].average_holding_period_days is not None
+
+    # Rolled up part of the way, then up to the day before the end
+    for through in (date(2024, 1, 20), date(2024, 2, 29)):
+        fill_daily_statistics(db, portfolio, through)
+        assert portfolio.statistics_through == through
+        assert get_trade_metrics(db, portfolio, START_DATES, END) == scanned
+
+
+def test_fill_all_daily_statistics_rolls_up_each_day_once(db: Session, portfolio):
+    stored = fill_all_daily_statistics(db, through=date(2024, 2, 10))
+    assert stored == len(
+        get_daily_statistics(db, portfolio.id, date(2024, 1, 1), date(2024, 2, 10))
+    )
+    assert fill_all_daily_statistics(db, through=date(2024, 2, 10)) == 0
+
+
+def test_trade_changes_invalidate_daily_statistics(
+    db: Session, portfolio, create_trade_fixture
+):
+    fill_daily_statistics(db, portfolio, date(2024, 2, 29))
+
+    create_trade_fixture(
+        portfolio_id=portfolio.id,
+        action=ActionType.SELL,
+        ticker="AAPL",
+        quantity=1.0,
+        execution_timestamp=datetime(2024, 2, 10, 10),
+    )
+
+    db.refresh(portfolio)
+    assert portfolio.statistics_through == date(2024, 2, 9)
+    assert not get_daily_statistics(
+        db, portfolio.id, date(2024, 2, 10), date(2024, 2, 29)
+    )
+    scanned = get_trade_metrics(db, portfolio, START_DATES, END)
+    fill_daily_statistics(db, portfolio, date(2024, 2, 29))
+    assert get_trade_metrics(db, portfolio, START_DATES, END) == scanned
+
+
+def test_fill_daily_statistics_skips_portfolio_changed_meanwhile(
+    db: Session, mocker, portfolio
+):
+    scan_days = statistics_service._scan_days
+
+    def scan_during_trade_change(*args):
+        days = scan_days(*args)
+        increment_version(db, portfolio.id)
+        return days
+
+    mocker.patch.object(
+        statistics_service, "_scan_days", side_effect=scan_during_trade_change
+    )
+    # The test's data lives in the transaction a rollback would discard
+    rollback = mocker.patch.object(db, "rollback")
+
+    assert fill_daily_statistics(db, portfolio, date(2024, 2, 10)) == 0
+    rollback.assert_called_once()
+    db.expire(portfolio)
+    assert portfolio.statistics_through is None
+    assert not get_daily_statistics(
+        db, portfolio.id, date(2024, 1, 1), date(2024, 2, 10)
+    )
+
+    mocker.stopall()
+    assert fill_daily_statistics(db, portfolio, date(2024, 2, 10)) > 0
+    assert portfolio.statistics_through == date(2024, 2, 10)
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+from typing import Dict
+
+# Dependencies only needed for market data and analytics. They must be imported
+# on first use so that workers serving login or CRUD routes boot quickly.
+HEAVY_MODULES = {"numpy", "pandas", "yfinance", "requests"}
+
+
+def _import_times(module: str) -> Dict[str, int]:
+    """
+    Import a module in a fresh interpreter with `-X importtime` and return the
+    cumulative import time, in microseconds, of every module it loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_app_import_does_not_load_heavy_dependencies():
+    times = _import_times("app.main")
+    loaded = sorted(HEAVY_MODULES & set(times))
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:15]
+    report = "\n".join(f"{us / 1000:10.1f} ms  {name}" for name, us in slowest)
+    assert not loaded, (
+        f"app.main imports {', '.join(loaded)} at start-up. Slowest imports:\n"
+        f"{report}"
+    )
@@ -0,0 +1,47 @@
+import time
+
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_circuit_allows_single_trial_after_cooldown():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert not breaker.allow_request()
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.utils.market_calendar import (
+    LSE,
+    NYSE,
+    get_exchange,
+    next_market_open,
+    nyse_holidays,
+)
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def test_nyse_holidays_2024():
+    assert nyse_holidays(2024) == {
+        date(2024, 1, 1),
+        date(2024, 1, 15),
+        date(2024, 2, 19),
+        date(2024, 3, 29),
+        date(2024, 5, 27),
+        date(2024, 6, 19),
+        date(2024, 7, 4),
+        date(2024, 9, 2),
+        date(2024, 11, 28),
+        date(2024, 12, 25),
+    }
+
+
+def test_nyse_holidays_observed_on_weekdays():
+    # July 4th 2026 is a Saturday, Christmas 2022 a Sunday
+    assert date(2026, 7, 3) in nyse_holidays(2026)
+    assert date(2022, 12, 26) in nyse_holidays(2022)
+    # New Year's Day on a Saturday is not observed on the Friday before
+    assert date(2021, 12, 31) not in nyse_holidays(2021)
+
+
+@pytest.mark.parametrize(
+    "ticker, exchange",
+    [
+        ("AAPL", NYSE),
+        ("BRK-B", NYSE),
+        ("VOD.L", LSE),
+        ("BTC-USD", None),
+        ("EURUSD=X", None),
+        ("^GSPC", None),
+        ("XYZ.UNKNOWN", None),
+    ],
+)
+def test_get_exchange(ticker, exchange):
+    assert get_exchange(ticker) == exchange
+
+
+def test_next_market_open_while_market_is_open():
+    now = datetime(2024, 3, 5, 11, 0, tzinfo=NEW_YORK)
+    assert next_market_open("AAPL", now) is None
+
+
+def test_next_market_open_before_open():
+    now = datetime(2024, 3, 5, 7, 0, tzinfo=NEW_YORK)
+    assert next_market_open("AAPL", now) == datetime(
+        2024, 3, 5, 9, 30, tzinfo=NEW_YORK
+    ).astimezone(timezone.utc)
+
+
+def test_next_market_open_waits_for_close_to_settle():
+    settling = datetime(2024, 3, 5, 16, 5, tzinfo=NEW_YORK)
+    assert next_market_open("AAPL", settling) is None
+    assert next_market_open(
+        "AAPL", datetime(2024, 3, 5, 16, 30, tzinfo=NEW_YORK)
+    ) == datetime(2024, 3, 6, 9, 30, tzinfo=NEW_YORK)
+
+
+def test_next_market_open_skips_weekend_and_holiday():
+    # Good Friday 2024 followed by a weekend
+    now = datetime(2024, 3, 28, 20, 0, tzinfo=NEW_YORK)
+    assert next_market_open("AAPL", now) == datetime(
+        2024, 4, 1, 9, 30, tzinfo=NEW_YORK
+    )
+
+
+def test_next_market_open_unknown_hours():
+    now = datetime(2024, 3, 30, 12, 0, tzinfo=timezone.utc)
+    assert next_market_open("BTC-USD", now) is None
@@ -0,0 +1,269 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+import yfinance
+
+from app.utils import market_data
+from app.utils.market_data_providers import FileMarketDataProvider, YFinanceProvider
+from app.utils.quote_cache import QuoteCache, SQLiteQuoteCache
+
+
+@pytest.fixture(autouse=True)
+def clear_quote_cache():
+    market_data.quote_cache.clear()
+    market_data.circuit_breaker.reset()
+    yield
+    market_data.quote_cache.clear()
+    market_data.circuit_breaker.reset()
+
+
+def test_quote_cache_expires_entries():
+    cache = QuoteCache(ttl_seconds=60, max_size=10)
+    cache.set("AAPL", 150.0, ttl_seconds=0)
+    assert cache.get("AAPL") is None
+
+
+def test_quote_cache_evicts_least_recently_used():
+    cache = QuoteCache(ttl_seconds=60, max_size=2)
+    cache.set("AAPL", 150.0)
+    cache.set("MSFT", 300.0)
+    cache.get("AAPL")  # AAPL becomes most recently used
+    cache.set("GOOGL", 2500.0)
+    assert cache.get("MSFT") is None
+    assert cache.get("AAPL") == 150.0
+    assert cache.get("GOOGL") == 2500.0
+
+
+def test_get_current_price_uses_cache(mocker):
+    fetch = mocker.patch.object(market_data, "_fetch_current_price", return_value=150.0)
+    assert market_data.get_current_price("AAPL") == 150.0
+    assert market_data.get_current_price("AAPL") == 150.0
+    fetch.assert_called_once_with("AAPL")
+
+
+def test_get_current_price_coalesces_concurrent_requests(mocker):
+    def slow_fetch(ticker):
+        time.sleep(0.2)
+        return 150.0
+
+    fetch = mocker.patch.object(
+        market_data, "_fetch_current_price", side_effect=slow_fetch
+    )
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(market_data.get_current_price("AAPL"))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [150.0] * 5
+    assert fetch.call_count == 1
+
+
+def test_get_current_price_propagates_errors(mocker):
+    mocker.patch.object(
+        market_data, "_fetch_current_price", side_effect=ValueError("No data")
+    )
+    with pytest.raises(ValueError):
+        market_data.get_current_price("INVALID")
+    assert market_data.quote_cache.get("INVALID") is None
+
+
+def test_get_current_prices_downloads_in_batches(mocker):
+    mocker.patch.object(market_data.settings, "QUOTE_BATCH_SIZE", 2)
+    fetch = mocker.patch.object(
+        market_data,
+        "_iter_current_prices",
+        side_effect=lambda batch: [(ticker, 100.0) for ticker in batch],
+    )
+    market_data.quote_cache.set("AAPL", 150.0)
+
+    prices = market_data.get_current_prices(["AAPL", "MSFT", "GOOGL", "TSLA", "MSFT"])
+
+    assert prices == {"AAPL": 150.0, "MSFT": 100.0, "GOOGL": 100.0, "TSLA": 100.0}
+    assert sorted(call.args[0] for call in fetch.call_args_list) == [
+        ["MSFT", "GOOGL"],
+        ["TSLA"],
+    ]
+    assert market_data.quote_cache.get("TSLA") == 100.0
+
+
+def test_get_current_prices_omits_tickers_without_data(mocker):
+    mocker.patch.object(
+        market_data, "_iter_current_prices", return_value=[("AAPL", 150.0)]
+    )
+    prices = market_data.get_current_prices(["AAPL", "INVALID"])
+    assert prices == {"AAPL": 150.0}
+
+
+def test_get_current_prices_returns_partial_results_on_timeout(mocker):
+    release = threading.Event()
+
+    def fetch(batch):
+        for ticker in batch:
+            if ticker == "SLOW":
+                release.wait(5)
+            yield ticker, 100.0
+
+    mocker.patch.object(market_data, "_iter_current_prices", side_effect=fetch)
+
+    start = time.perf_counter()
+    prices = market_data.get_current_prices(["AAPL", "SLOW"], timeout=0.2)
+    elapsed = time.perf_counter() - start
+
+    assert prices == {"AAPL": 100.0}
+    assert elapsed < 2
+
+    # The slow download keeps running and fills the cache once it completes
+    release.set()
+    assert market_data.get_current_prices(["SLOW"], timeout=2) == {"SLOW": 100.0}
+
+
+def test_get_current_prices_is_not_held_up_by_a_slow_symbol(mocker):
+    release = threading.Event()
+
+    def history(symbol):
+        def get(**kwargs):
+            if symbol == "SLOW":
+                release.wait(3)
+            return pd.DataFrame({"Close": [100.0]})
+
+        return mocker.Mock(history=mocker.Mock(side_effect=get))
+
+    mocker.patch.object(yfinance, "Ticker", side_effect=history)
+    mocker.patch.object(market_data, "provider", YFinanceProvider(timeout=5))
+    tickers = [f"T{i}" for i in range(30)] + ["SLOW"]
+    assert len(tickers) < market_data.settings.QUOTE_BATCH_SIZE
+
+    try:
+        prices = market_data.get_current_prices(tickers, timeout=1)
+    finally:
+        release.set()
+
+    assert len(prices) == 30
+    assert "SLOW" not in prices
+
+
+def test_get_current_prices_waits_for_other_worker(mocker, tmp_path):
+    path = str(tmp_path / "quotes.sqlite3")
+    shared_cache = SQLiteQuoteCache(path, ttl_seconds=60, max_size=10)
+    other_worker = SQLiteQuoteCache(path, ttl_seconds=60, max_size=10)
+    mocker.patch.object(market_data, "quote_cache", shared_cache)
+    fetch = mocker.patch.object(market_data, "_iter_current_prices")
+
+    # Another worker process is already refreshing AAPL
+    other_worker.acquire_refresh(["AAPL"], lease_seconds=30)
+    threading.Timer(0.1, other_worker.set, args=("AAPL", 150.0)).start()
+
+    prices = market_data.get_current_prices(["AAPL"], timeout=2)
+
+    assert prices == {"AAPL": 150.0}
+    fetch.assert_not_called()
+
+
+def test_other_workers_quotes_are_awaited_on_the_request_thread(mocker, tmp_path):
+    path = str(tmp_path / "quotes.sqlite3")
+    shared_cache = SQLiteQuoteCache(path, ttl_seconds=60, max_size=10)
+    other_worker = SQLiteQuoteCache(path, ttl_seconds=60, max_size=10)
+    mocker.patch.object(market_data, "quote_cache", shared_cache)
+    mocker.patch.object(
+        market_data, "_iter_current_prices", return_value=[("MSFT", 300.0)]
+    )
+    polled_from = set()
+    get_many = shared_cache.get_many
+
+    def poll(tickers):
+        polled_from.add(threading.current_thread().name)
+        return get_many(tickers)
+
+    mocker.patch.object(shared_cache, "get_many", side_effect=poll)
+    other_worker.acquire_refresh(["AAPL"], lease_seconds=30)
+    threading.Timer(0.1, other_worker.set, args=("AAPL", 150.0)).start()
+
+    prices = market_data.get_current_prices(["AAPL", "MSFT"], timeout=2)
+
+    assert prices == {"AAPL": 150.0, "MSFT": 300.0}
+    assert polled_from == {threading.current_thread().name}
+
+
+def test_get_quotes_serves_stale_quote_while_revalidating(mocker):
+    refreshed = threading.Event()
+
+    def fetch(batch):
+        refreshed.set()
+        return [(ticker, 155.0) for ticker in batch]
+
+    mocker.patch.object(market_data, "_iter_current_prices", side_effect=fetch)
+    market_data.quote_cache.set("AAPL", 150.0, ttl_seconds=0)
+
+    quotes = market_data.get_quotes(["AAPL"])
+
+    assert quotes == {"AAPL": market_data.Quote(150.0, stale=True)}
+    assert refreshed.wait(2)
+    time.sleep(0.05)
+    assert market_data.get_quotes(["AAPL"]) == {"AAPL": market_data.Quote(155.0)}
+
+
+def test_get_quotes_stops_calling_failing_provider(mocker):
+    mocker.patch.object(market_data.circuit_breaker, "failure_threshold", 2)
+    fetch = mocker.patch.object(
+        market_data, "_iter_current_prices", side_effect=ConnectionError("down")
+    )
+
+    for _ in range(5):
+        assert market_data.get_quotes(["AAPL"], timeout=1) == {}
+
+    assert fetch.call_count == 2
+    assert market_data.circuit_breaker.is_open
+
+
+def test_get_quotes_from_file_provider(mocker, tmp_path):
+    path = tmp_path / "bars.csv"
+    path.write_text(
+        "ticker,date,open,high,low,close,volume\n"
+        "AAPL,2024-03-04,150,152,149,151,1000\n"
+        "AAPL,2024-03-05,151,153,150,152,1200\n"
+    )
+    mocker.patch.object(market_data, "provider", FileMarketDataProvider(str(path)))
+    assert market_data.get_quotes(["AAPL", "MSFT"]) == {
+        "AAPL": market_data.Quote(152.0)
+    }
+
+
+def test_quotes_stay_cached_until_market_opens(mocker):
+    now = datetime.now(timezone.utc)
+    mocker.patch.object(
+        market_data.market_calendar,
+        "next_market_open",
+        return_value=now + timedelta(hours=60),
+    )
+    assert market_data._quote_ttl_seconds("AAPL") > 59 * 60 * 60
+
+
+def test_refresh_quotes_skips_closed_markets(mocker):
+    mocker.patch.object(
+        market_data.market_calendar,
+        "next_market_open",
+        side_effect=lambda ticker, now=None: (
+            None if ticker == "BTC-USD" else datetime.now(timezone.utc)
+        ),
+    )
+    fetch = mocker.patch.object(
+        market_data,
+        "_fetch_current_prices",
+        side_effect=lambda batch: {ticker: 1.0 for ticker in batch},
+    )
+    market_data.quote_cache.set("AAPL", 150.0)
+    market_data.quote_cache.set("BTC-USD", 60000.0)
+
+    market_data.refresh_quotes(["AAPL", "BTC-USD", "MSFT"])
+
+    fetch.assert_called_once_with(["BTC-USD", "MSFT"])
@@ -0,0 +1,116 @@
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+import yfinance
+
+from app.utils.market_data_providers import FileMarketDataProvider, YFinanceProvider
+
+BARS_CSV = (
+    "ticker,date,open,high,low,close,volume\n"
+    "MSFT,2024-03-05,400,405,398,404,\n"
+    "AAPL,2024-03-05,151,153,150,152,1200\n"
+    "AAPL,2024-03-04,150,152,149,151,1000\n"
+)
+
+
+@pytest.fixture
+def file_provider(tmp_path):
+    path = tmp_path / "bars.csv"
+    path.write_text(BARS_CSV)
+    return FileMarketDataProvider(str(path))
+
+
+def test_yfinance_provider_current_prices(mocker):
+    histories = {
+        "AAPL": pd.DataFrame({"Close": [150.0, 151.0]}),
+        "MSFT": pd.DataFrame({"Close": [301.0, None]}),
+        "INVALID": pd.DataFrame({"Close": []}),
+    }
+
+    def ticker(symbol):
+        mock = mocker.Mock()
+        mock.history.return_value = histories[symbol]
+        return mock
+
+    mocker.patch.object(yfinance, "Ticker", side_effect=ticker)
+    download = mocker.patch.object(yfinance, "download")
+
+    provider = YFinanceProvider(timeout=1)
+    prices = provider.get_current_prices(["AAPL", "MSFT", "INVALID"])
+
+    assert prices == {"AAPL": 151.0, "MSFT": 301.0}
+    download.assert_not_called()
+
+
+def test_yfinance_provider_drops_symbols_past_the_timeout(mocker):
+    release = threading.Event()
+
+    def ticker(symbol):
+        def history(**kwargs):
+            if symbol == "SLOW":
+                release.wait(3)
+            return pd.DataFrame({"Close": [100.0]})
+
+        return mocker.Mock(history=mocker.Mock(side_effect=history))
+
+    mocker.patch.object(yfinance, "Ticker", side_effect=ticker)
+
+    start = time.perf_counter()
+    try:
+        prices = YFinanceProvider(timeout=0.5).get_current_prices(
+            ["AAPL", "SLOW", "MSFT"]
+        )
+    finally:
+        release.set()
+
+    assert prices == {"AAPL": 100.0, "MSFT": 100.0}
+    assert time.perf_counter() - start < 2
+
+
+def test_yfinance_provider_current_prices_without_data(mocker):
+    mocker.patch.object(yfinance, "Ticker", side_effect=RuntimeError("offline"))
+
+    with pytest.raises(ValueError):
+        YFinanceProvider(timeout=1).get_current_prices(["AAPL"])
+
+
+def test_file_provider_current_prices(file_provider):
+    assert file_provider.get_current_price("AAPL") == 152.0
+    assert file_provider.get_current_prices(["AAPL", "MSFT", "TSLA"]) == {
+        "AAPL": 152.0,
+        "MSFT": 404.0,
+    }
+    with pytest.raises(ValueError):
+        file_provider.get_current_price("TSLA")
+
+
+def test_file_provider_daily_bars(file_provider):
+    bars = file_provider.get_daily_bars("AAPL", date(2024, 3, 5), date(2024, 3, 8))
+    assert bars == [
+        {
+            "ticker": "AAPL",
+            "date": date(2024, 3, 5),
+            "open": 151.0,
+            "high": 153.0,
+            "low": 150.0,
+            "close": 152.0,
+            "volume": 1200,
+        }
+    ]
+    msft_bars = file_provider.get_daily_bars(
+        "MSFT", date(2024, 1, 1), date(2024, 12, 31)
+    )
+    assert msft_bars[0]["volume"] is None
+    assert (
+        file_provider.get_daily_bars("TSLA", date(2024, 1, 1), date(2024, 12, 31)) == []
+    )
+
+
+def test_file_provider_rejects_missing_columns(tmp_path):
+    path = tmp_path / "bars.csv"
+    path.write_text("ticker,date,close\nAAPL,2024-03-05,152\n")
+    with pytest.raises(ValueError, match="missing columns"):
+        FileMarketDataProvider(str(path)).get_current_price("AAPL")
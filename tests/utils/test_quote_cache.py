@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.utils.quote_cache import SQLiteQuoteCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "quotes.sqlite3")
+
+
+def test_sqlite_quote_cache_is_shared_between_instances(cache_path):
+    worker_a = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+    worker_b = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+
+    worker_a.set("AAPL", 150.0)
+
+    assert worker_b.get("AAPL") == 150.0
+    assert worker_b.get_many(["AAPL", "MSFT"]) == {"AAPL": 150.0}
+
+
+def test_sqlite_quote_cache_expires_entries(cache_path):
+    cache = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+    cache.set("AAPL", 150.0, ttl_seconds=0)
+    assert cache.get("AAPL") is None
+
+
+def test_sqlite_quote_cache_evicts_entries_expiring_first(cache_path):
+    cache = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=2)
+    cache.set("AAPL", 150.0)
+    cache.set("MSFT", 300.0, ttl_seconds=30)
+    cache.set("GOOGL", 2500.0)
+    assert cache.get("MSFT") is None
+    assert cache.get_many(["AAPL", "GOOGL"]) == {"AAPL": 150.0, "GOOGL": 2500.0}
+    assert len(cache) == 2
+
+
+def test_sqlite_quote_cache_reads_while_another_worker_writes(cache_path):
+    cache = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+    cache.set("AAPL", 150.0)
+    writer = sqlite3.connect(cache_path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+
+    try:
+        start = time.perf_counter()
+        assert cache.get_many(["AAPL"]) == {"AAPL": 150.0}
+        assert time.perf_counter() - start < 1
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+def test_sqlite_quote_cache_grants_each_lease_once(cache_path):
+    worker_a = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+    worker_b = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+
+    assert worker_a.acquire_refresh(["AAPL", "MSFT"], lease_seconds=30) == [
+        "AAPL",
+        "MSFT",
+    ]
+    assert worker_b.acquire_refresh(["AAPL", "GOOGL"], lease_seconds=30) == ["GOOGL"]
+
+    worker_a.release_refresh(["AAPL"])
+    assert worker_b.acquire_refresh(["AAPL"], lease_seconds=30) == ["AAPL"]
+
+
+def test_sqlite_quote_cache_expired_lease_can_be_taken_over(cache_path):
+    worker_a = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+    worker_b = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=10)
+
+    worker_a.acquire_refresh(["AAPL"], lease_seconds=0)
+
+    assert worker_b.acquire_refresh(["AAPL"], lease_seconds=30) == ["AAPL"]
+
+
+def test_sqlite_quote_cache_across_threads(cache_path):
+    cache = SQLiteQuoteCache(cache_path, ttl_seconds=60, max_size=100)
+    threads = [
+        threading.Thread(target=cache.set, args=(f"T{i}", float(i))) for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 10